@@ -0,0 +1,196 @@
+"""
+Offline / bulk regeneration of reports.
+
+    python batch.py audio data/audio --out data/reports
+    python batch.py transcripts data/transcripts --out data/reports
+
+Walks the input directory, runs transcribe → generate → render with bounded
+concurrency per stage, and records every finished item in <out>/manifest.jsonl.
+Re-running the same command resumes: items whose (content hash, prompt version,
+model) is already in the manifest are skipped.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from dataclasses import dataclass
+
+import xxhash
+
+from config.settings import TEMP_DIR, REPORT_DIR, TRANSCRIPT_DIR, LLM_MODEL, RENDER_WORKERS
+from core.speech_to_text import atranscribe_audio
+from core.langchain_pipeline import agenerate_report, PROMPT_VERSION
+from core.render_service import RenderService
+from core.transcript_cache import hash_audio_file
+from core.storage import ZSTD_SUFFIX, read_text
+
+AUDIO_EXTS = (".mp3", ".wav", ".m4a", ".ogg")
+TRANSCRIPT_EXTS = (".txt", ".txt.zst")
+MANIFEST_NAME = "manifest.jsonl"
+
+
+@dataclass
+class Item:
+    source: str
+    key: str
+    base: str
+
+
+def _walk(root: str, exts, skip_dirs=()):
+    skip = {os.path.abspath(d) for d in skip_dirs}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) not in skip)
+        for name in sorted(filenames):
+            if name.lower().endswith(exts):
+                yield os.path.join(dirpath, name)
+
+
+def _hash_text_file(path: str) -> str:
+    # hash the text, not the file, so compressing a transcript keeps its manifest key
+    return xxhash.xxh3_128(read_text(path).encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: str) -> dict:
+    """{ key: record } for items that finished successfully."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line after a crash
+            if rec.get("status") == "done":
+                done[rec["key"]] = rec
+    return done
+
+
+class Progress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    def tick(self, ok: bool, label: str) -> None:
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+        finished = self.done + self.failed
+        elapsed = time.perf_counter() - self.started
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - finished) / rate if rate > 0 else 0.0
+        print(
+            f"[{finished}/{self.total}] {'ok ' if ok else 'ERR'} {label}  "
+            f"{rate * 60:.1f} items/min  ETA {eta:.0f}s",
+            flush=True,
+        )
+
+
+async def run_batch(
+    mode: str,
+    input_dir: str,
+    out_dir: str,
+    stt_concurrency: int = 4,
+    llm_concurrency: int = 4,
+    render_workers: int = 2,
+    force: bool = False,
+) -> Progress:
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    done = {} if force else load_manifest(manifest_path)
+
+    if mode == "audio":
+        paths = list(_walk(input_dir, AUDIO_EXTS))
+        hash_file = hash_audio_file
+    else:
+        paths = list(_walk(input_dir, TRANSCRIPT_EXTS, skip_dirs=[os.path.join(input_dir, "cache")]))
+        hash_file = _hash_text_file
+
+    items = []
+    skipped = 0
+    for p in paths:
+        key = f"{hash_file(p)}:{PROMPT_VERSION}:{LLM_MODEL}"
+        if key in done and os.path.exists(done[key].get("report", "")):
+            skipped += 1
+            continue
+        name = os.path.basename(p)
+        if name.endswith(ZSTD_SUFFIX):
+            name = name[: -len(ZSTD_SUFFIX)]
+        items.append(Item(p, key, os.path.splitext(name)[0]))
+    print(f"{len(paths)} files found, {skipped} already complete, {len(items)} to process", flush=True)
+
+    progress = Progress(len(items))
+    stt_sem = asyncio.Semaphore(max(1, stt_concurrency))
+    llm_sem = asyncio.Semaphore(max(1, llm_concurrency))
+    renderer = RenderService(workers=render_workers)
+    await renderer.start()
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        async def _one(item: Item) -> None:
+            record = {"key": item.key, "source": item.source}
+            try:
+                if mode == "audio":
+                    async with stt_sem:
+                        transcript = await atranscribe_audio(item.source)
+                else:
+                    transcript = read_text(item.source)
+                async with llm_sem:
+                    report = await agenerate_report(transcript)
+                report_path = os.path.join(out_dir, f"{item.base}.docx")
+                await renderer.render(report, report_path, author_name="batch")
+                record.update(status="done", report=report_path)
+                ok = True
+            except Exception as e:
+                record.update(status="error", error=str(e))
+                ok = False
+            record["ts"] = time.time()
+            manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            progress.tick(ok, item.source)
+
+        try:
+            await asyncio.gather(*(_one(it) for it in items))
+        finally:
+            renderer.shutdown(wait=True)
+    return progress
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk (re)generation of consultation reports.")
+    parser.add_argument("mode", choices=["audio", "transcripts"])
+    parser.add_argument("input_dir", nargs="?", help="defaults to TEMP_DIR / TRANSCRIPT_DIR")
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--stt-concurrency", type=int, default=4)
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--render-workers", type=int, default=RENDER_WORKERS)
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and redo everything")
+    args = parser.parse_args(argv)
+
+    input_dir = args.input_dir
+    if input_dir is None:
+        input_dir = TEMP_DIR if args.mode == "audio" else TRANSCRIPT_DIR
+
+    progress = asyncio.run(run_batch(
+        args.mode,
+        input_dir,
+        args.out,
+        stt_concurrency=args.stt_concurrency,
+        llm_concurrency=args.llm_concurrency,
+        render_workers=args.render_workers,
+        force=args.force,
+    ))
+    elapsed = time.perf_counter() - progress.started
+    print(f"done: {progress.done} ok, {progress.failed} failed in {elapsed:.1f}s", flush=True)
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# benchmarks/bench_normalizer.py
+"""
+Microbenchmark: single-pass normalize_report_text vs the original regex chain
+(frozen in benchmarks.reference_normalizer).
+
+    python -m benchmarks.bench_normalizer
+"""
+import random
+import timeit
+
+from benchmarks.reference_normalizer import reference_normalize as _reference
+from core.normalizer import SECTIONS, normalize_report_text
+
+
+def synthetic_llm_output(n_lines: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = ["<|begin_of_sentence|>"]
+    for i in range(n_lines):
+        if i % 25 == 0:
+            lines.append(rng.choice(SECTIONS))
+        lines.append(rng.choice([
+            "- Persistent dry cough for three days, worse at night.",
+            "• **Paracetamol** 500 mg every 8 hours as needed.",
+            "Patient name: Example",
+            "- Follow up in one week if no improvement.",
+            "*Mild* dehydration noted on examination.",
+        ]))
+    return "\n".join(lines)
+
+
+def main() -> None:
+    for n_lines in (100, 1_000, 10_000):
+        text = synthetic_llm_output(n_lines)
+        assert normalize_report_text(text) == _reference(text)
+        number = max(1, 2000 // n_lines)
+        old = min(timeit.repeat(lambda: _reference(text), number=number, repeat=5)) / number
+        new = min(timeit.repeat(lambda: normalize_report_text(text), number=number, repeat=5)) / number
+        print(
+            f"{len(text) / 1024:8.1f} KB  reference {old * 1e3:8.2f} ms  "
+            f"single-pass {new * 1e3:8.2f} ms  speedup {old / new:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_startup.py
+"""
+Import-time report for bot startup (CI-friendly).
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --module bot --budget-ms 800 --top 20
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter, prints
+the slowest modules by cumulative time and the total, and exits 1 when the total
+exceeds --budget-ms or when a module that must stay lazy (provider SDKs, DOCX,
+numpy) was imported eagerly.
+"""
+from __future__ import annotations
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use / by the cog's warm-up task, never at import time
+LAZY_MODULES = ("langchain_openai", "langchain_core", "openai", "assemblyai", "docx", "lxml", "numpy", "tiktoken")
+
+
+def import_times(module: str) -> Dict[str, Tuple[int, int]]:
+    """{ module: (self_us, cumulative_us) } for a cold `import module`."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    times: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        times[parts[2].strip()] = (self_us, cum_us)
+    return times
+
+
+def eager_heavy_modules(times: Dict[str, Tuple[int, int]]) -> List[str]:
+    return sorted({name.split(".")[0] for name in times} & set(LAZY_MODULES))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time report for bot startup.")
+    parser.add_argument("--module", default="cogs.consultation")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=0.0, help="fail above this total (0 = no budget)")
+    args = parser.parse_args(argv)
+
+    times = import_times(args.module)
+    total_ms = times.get(args.module, (0, 0))[1] / 1000
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, (self_us, cum_us) in sorted(times.items(), key=lambda kv: kv[1][1], reverse=True)[:args.top]:
+        print(f"{cum_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+    print(f"total import time for {args.module}: {total_ms:.1f} ms ({len(times)} modules)")
+
+    failed = False
+    eager = eager_heavy_modules(times)
+    if eager:
+        print(f"FAIL: imported eagerly (should load on first use): {', '.join(eager)}")
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
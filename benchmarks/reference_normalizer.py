@@ -0,0 +1,78 @@
+# benchmarks/reference_normalizer.py
+"""
+Frozen copy of the regex chain the pipeline used before the single-pass parser
+(core.normalizer). The normalizer benchmark times against it and the tests
+check byte-identity with it, so it must not import from the pipeline or be
+"fixed": the pipeline's own helpers now delegate to the new parser.
+
+    from benchmarks.reference_normalizer import reference_normalize
+"""
+import re
+
+_REF_SECTIONS = [
+    "Symptoms", "Diagnosis", "Prescription / Treatment Plan", "Doctor's Notes",
+    "Assessment", "Plan", "Red Flags", "Disclaimer",
+]
+_REF_CENSOR_PATTERNS = [
+    r"^\s*(patient\s*name|nama\s*pasien)\s*[:=].*$",
+    r"^\s*(patient\s*id|id\s*pasien|mrn|rekam\s*medis)\s*[:=].*$",
+    r"^\s*(dob|tanggal\s*lahir|age|umur)\s*[:=].*$",
+    r"^\s*(date\s*of\s*consultation|tanggal\s*konsultasi)\s*[:=].*$",
+    r"^\s*(alamat|address|phone|telepon)\s*[:=].*$",
+]
+
+
+def _ref_strip_markdown(text):
+    text = re.sub(r"```[\s\S]*?```", lambda m: m.group(0).strip("`\n"), text)
+    text = re.sub(r"^\s*#+\s*", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
+    text = re.sub(r"\*(.*?)\*", r"\1", text)
+    return text.strip()
+
+
+def _ref_strip_tokens(text):
+    text = re.sub(r"[.\s]*<\s*[|｜]\s*[^|｜>]+?\s*[|｜]\s*>[.\s]*", "", text)
+    return re.sub(r"</?think>", "", text, flags=re.IGNORECASE)
+
+
+def _ref_censor(text):
+    kept = [ln.rstrip() for ln in text.splitlines()
+            if not any(re.search(p, ln.rstrip(), flags=re.IGNORECASE) for p in _REF_CENSOR_PATTERNS)]
+    return "\n".join(kept).strip()
+
+
+def _ref_section_order(text):
+    def _pattern_for(h):
+        return re.escape(h).replace(r"\ /\/\ ", r"\s*/\s*").replace(r"\/", r"\s*/\s*")
+    header_re = re.compile(r"^(%s)\s*:?\s*$" % "|".join(_pattern_for(s) for s in _REF_SECTIONS), re.IGNORECASE)
+    current = None
+    buckets = {s: [] for s in _REF_SECTIONS}
+    for raw in text.splitlines():
+        line = _ref_strip_tokens(raw.strip())
+        if not line:
+            continue
+        m = header_re.match(line)
+        if m:
+            current = next(s for s in _REF_SECTIONS
+                           if re.fullmatch(_pattern_for(s), m.group(1), flags=re.IGNORECASE))
+            continue
+        if current is None:
+            current = "Doctor's Notes"
+        buckets[current].append(line)
+    out = []
+    for s in _REF_SECTIONS:
+        out.append(s)
+        if not buckets[s]:
+            out.append("- None reported.")
+        for ln in buckets[s]:
+            ln = _ref_strip_tokens(ln)
+            if re.match(r"^[\-•]\s+", ln):
+                ln = re.sub(r"^[\-•]\s+", "- ", ln)
+            out.append(ln)
+        out.append("")
+    return "\n".join(out).strip() + "\n"
+
+
+def reference_normalize(text: str) -> str:
+    """The old strip_markdown → strip_tokens → censor → section-order chain."""
+    return _ref_section_order(_ref_censor(_ref_strip_tokens(_ref_strip_markdown(text))))
@@ -0,0 +1,306 @@
+# benchmarks/suite.py
+"""
+Reproducible benchmarks for the text and DOCX hot paths.
+
+    python -m benchmarks.suite                    # run, compare against the baseline
+    python -m benchmarks.suite --save             # run and (re)write the baseline
+    python -m benchmarks.suite --sizes 1 10 --only ensure_section_order
+
+Inputs are synthetic (seeded) LLM outputs and transcripts from 1 KB to 1 MB.
+For every case we record time per call, throughput (MB/s), tracemalloc peak and
+the net number of memory blocks left allocated by one call. Results are compared
+with benchmarks/baseline.json; the run exits non-zero when any case is slower or
+peaks higher than baseline * (1 + threshold).
+
+Baselines are machine specific: record them on the host that runs the comparison.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.bench_normalizer import synthetic_llm_output
+from core.normalizer import SECTIONS, normalize_report_text
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES_KB = (1, 10, 100, 1024)
+DEFAULT_THRESHOLD = 0.25
+_TIME_BUDGET_S = 0.5  # per case, spread over the timing repeats
+
+_TRANSCRIPT_LINES = [
+    "Doctor: Good morning, what brings you in today?",
+    "Patient: I've had a dry cough for about three days, um, mostly at night.",
+    "Doctor: Any fever? Patient name: Example Person",
+    "Patient: Yes, around 38 degrees yesterday evening.",
+    "Doctor: I'll prescribe paracetamol 500 mg every eight hours as needed.",
+    "Patient: Okay, okay. Should I come back if it gets worse?",
+    "Doctor: Yes, follow up in one week if there is no improvement.",
+]
+
+
+# ---------------------- inputs ----------------------
+
+def llm_output_of_size(size_bytes: int, seed: int = 0) -> str:
+    """Synthetic raw LLM report of exactly size_bytes (lines average ~43 bytes)."""
+    text = synthetic_llm_output(max(1, size_bytes // 30), seed)
+    while len(text) < size_bytes:
+        text += "\n" + text
+    return text[:size_bytes]
+
+
+def transcript_of_size(size_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out: List[str] = []
+    used = 0
+    while used < size_bytes:
+        line = rng.choice(_TRANSCRIPT_LINES)
+        out.append(line)
+        used += len(line) + 1
+    return "\n".join(out)[:size_bytes]
+
+
+# ---------------------- cases ----------------------
+
+def _case_ensure_section_order(size: int) -> Callable[[], object]:
+    from core.langchain_pipeline import _ensure_section_order
+    text = llm_output_of_size(size)
+    return lambda: _ensure_section_order(text)
+
+
+def _case_canonical_section(size: int) -> Callable[[], object]:
+    from core.docx_renderer import _canonical_section
+    lines = llm_output_of_size(size).splitlines()
+    return lambda: [_canonical_section(ln, SECTIONS) for ln in lines]
+
+
+def _case_censor_patient_lines(size: int) -> Callable[[], object]:
+    from core.langchain_pipeline import _censor_patient_lines
+    text = transcript_of_size(size)
+    return lambda: _censor_patient_lines(text)
+
+
+def _case_parse_structured_report(size: int) -> Callable[[], object]:
+    """The LLM_OUTPUT_FORMAT=json counterpart of normalize_report_text (same content)."""
+    from core.report import SECTION_SLOTS, parse_report
+    from core.structured_output import parse_structured_report
+    report = parse_report(llm_output_of_size(size))
+    text = json.dumps({SECTION_SLOTS[s]: lines for s, lines in report.items()})
+    return lambda: parse_structured_report(text)
+
+
+def _case_compact_transcript(size: int) -> Callable[[], object]:
+    from core.compaction import compact_transcript
+    text = transcript_of_size(size)
+    return lambda: compact_transcript(text, 6000)
+
+
+def _case_normalize_report_text(size: int) -> Callable[[], object]:
+    text = llm_output_of_size(size)
+    return lambda: normalize_report_text(text)
+
+
+def _case_save_tidy_docx(size: int, workdir: str) -> Callable[[], object]:
+    from core.docx_renderer import save_tidy_docx
+    text = llm_output_of_size(size)
+    path = os.path.join(workdir, "Report_bench_20250101_000000.docx")
+    return lambda: save_tidy_docx(text, path, "bench", "Bench Patient", "P-0")
+
+
+def _case_end_to_end(size: int, workdir: str) -> Callable[[], object]:
+    """Transcript -> generate_medical_report (fake LLM from tests/conftest) -> DOCX."""
+    import core.langchain_pipeline as lp
+    from core.docx_renderer import save_tidy_docx
+    from tests.conftest import FakeChatOpenAI
+
+    transcript = transcript_of_size(size)
+    path = os.path.join(workdir, "Report_e2e_20250101_000000.docx")
+
+    def run():
+        saved = lp.ChatOpenAI, lp._LLM_CLIENTS, lp.REPORT_CACHE
+        lp.ChatOpenAI, lp._LLM_CLIENTS, lp.REPORT_CACHE = FakeChatOpenAI, {}, None
+        try:
+            report = lp.generate_medical_report(transcript)
+        finally:
+            lp.ChatOpenAI, lp._LLM_CLIENTS, lp.REPORT_CACHE = saved
+        save_tidy_docx(report, path, "bench")
+
+    return run
+
+
+CASES: Dict[str, Callable[..., Callable[[], object]]] = {
+    "ensure_section_order": _case_ensure_section_order,
+    "canonical_section": _case_canonical_section,
+    "censor_patient_lines": _case_censor_patient_lines,
+    "normalize_report_text": _case_normalize_report_text,
+    "parse_structured_report": _case_parse_structured_report,
+    "compact_transcript": _case_compact_transcript,
+    "save_tidy_docx": _case_save_tidy_docx,
+    "end_to_end": _case_end_to_end,
+}
+_NEEDS_WORKDIR = {"save_tidy_docx", "end_to_end"}
+
+
+# ---------------------- measurement ----------------------
+
+def calibrate(rounds: int = 5) -> float:
+    """Seconds for a fixed pure-Python workload; used to scale timings between runs."""
+    text = llm_output_of_size(16 * 1024, seed=1)
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(20):
+            sorted(ln.lower().split() for ln in text.splitlines())
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def measure(fn: Callable[[], object], size: int, budget_s: float = _TIME_BUDGET_S) -> dict:
+    """Best-of-N seconds per call plus tracemalloc peak / net blocks for one call."""
+    t0 = time.perf_counter()
+    fn()  # warm-up (imports, template parse, regex caches)
+    first = time.perf_counter() - t0
+
+    # timeit-style: batch fast calls so each repeat lasts >= ~budget/5, keep the best
+    number = max(1, int(budget_s / 5 / max(first, 1e-7)))
+    repeats = 5 if first * number * 5 <= budget_s * 4 else 3
+    best = first
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(s.count_diff for s in after.compare_to(before, "filename"))
+
+    return {
+        "bytes": size,
+        "seconds": best,
+        "mb_per_s": (size / (1024 * 1024)) / best if best > 0 else 0.0,
+        "peak_kib": peak / 1024,
+        "net_blocks": blocks,
+    }
+
+
+def run_suite(sizes_kb=DEFAULT_SIZES_KB, only: Optional[List[str]] = None,
+              budget_s: float = _TIME_BUDGET_S, log=print) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    workdir = tempfile.mkdtemp(prefix="medbot-bench-")
+    try:
+        for name, factory in CASES.items():
+            if only and name not in only:
+                continue
+            for kb in sizes_kb:
+                size = int(kb * 1024)
+                fn = factory(size, workdir) if name in _NEEDS_WORKDIR else factory(size)
+                res = measure(fn, size, budget_s)
+                key = f"{name}@{kb}KB"
+                results[key] = res
+                log(
+                    f"{key:32s} {res['seconds'] * 1e3:10.3f} ms  {res['mb_per_s']:8.2f} MB/s  "
+                    f"peak {res['peak_kib']:10.1f} KiB  blocks {res['net_blocks']:+d}"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            speed_ratio: float = 1.0) -> List[str]:
+    """
+    Return one message per regression (time or memory peak beyond the threshold).
+    speed_ratio = current calibrate() / baseline calibrate(); baseline times are
+    scaled by it so a busier or slower host does not read as a code regression.
+    """
+    regressions: List[str] = []
+    for key, res in sorted(results.items()):
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in ("seconds", "peak_kib"):
+            old, new = base.get(metric, 0.0), res[metric]
+            if metric == "seconds":
+                old *= speed_ratio
+            if old > 0 and new > old * (1 + threshold):
+                regressions.append(f"{key}: {metric} {old:.6g} -> {new:.6g} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def load_baseline(path: str) -> dict:
+    """{"calibration_s": float, "results": {case@size: {...}}} or {} when missing."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, dict], calibration_s: float) -> None:
+    data = {
+        "python": sys.version.split()[0],
+        "created": time.time(),
+        "calibration_s": calibration_s,
+        "results": results,
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks for the text and DOCX hot paths.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=list(DEFAULT_SIZES_KB), help="input sizes in KB")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) if float(s).is_integer() else s for s in args.sizes]
+    cal_before = calibrate()
+    results = run_suite(sizes, args.only)
+    cal = min(cal_before, calibrate())
+    baseline = load_baseline(args.baseline)
+
+    if args.save:
+        # keep cases that were not re-run; timings are rescaled to this run's calibration
+        ratio = cal / baseline["calibration_s"] if baseline.get("calibration_s") else 1.0
+        merged = {}
+        for key, res in baseline.get("results", {}).items():
+            merged[key] = {**res, "seconds": res["seconds"] * ratio}
+        merged.update(results)
+        save_baseline(args.baseline, merged, cal)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not baseline.get("results"):
+        print(f"no baseline at {args.baseline}; run with --save first")
+        return 0
+    ratio = cal / baseline["calibration_s"] if baseline.get("calibration_s") else 1.0
+    print(f"host speed vs baseline: x{1 / ratio:.2f}")
+    regressions = compare(results, baseline["results"], args.threshold, ratio)
+    for msg in regressions:
+        print("REGRESSION", msg)
+    if regressions:
+        return 1
+    print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,72 @@
-import os
-from dotenv import load_dotenv
+import sys
+import time
+import argparse
 import discord
 from discord.ext import commands
 from config.settings import DISCORD_TOKEN 
 
+_STARTED = time.perf_counter()
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.messages = True
-intents.guilds = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+def _intents() -> discord.Intents:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.messages = True
+    intents.guilds = True
+    return intents
 
-@bot.event
-async def on_ready():
-    print(f"Bot logged in as {bot.user} (ID: {bot.user.id})")
-    await bot.load_extension("cogs.consultation")
-    print("Consultation cog loaded.")
 
-@bot.command()
-async def ping(ctx):
-    await ctx.send("pong")
+def create_bot(sharded: bool = False, shard_count=None, shard_ids=None) -> commands.Bot:
+    """
+    Plain Bot by default. sharded=True gives an AutoShardedBot running shard_ids
+    out of shard_count in this process (both None: Discord picks the count).
+    """
+    if sharded:
+        bot = commands.AutoShardedBot(
+            command_prefix="!", intents=_intents(), shard_count=shard_count, shard_ids=shard_ids
+        )
+    else:
+        bot = commands.Bot(command_prefix="!", intents=_intents())
 
-if __name__ == "__main__":
+    @bot.event
+    async def on_ready():
+        # on_ready fires again after reconnects; the cog is loaded once
+        if "cogs.consultation" not in bot.extensions:
+            t0 = time.perf_counter()
+            await bot.load_extension("cogs.consultation")
+            # LLM/STT SDKs and DOCX render workers keep warming up in the background
+            print(f"Consultation cog loaded in {time.perf_counter() - t0:.2f}s "
+                  f"({time.perf_counter() - _STARTED:.2f}s since start).")
+        # Only AutoShardedBot has shard_ids; a plain Bot runs a single shard
+        shards = getattr(bot, "shard_ids", None) or [bot.shard_id or 0]
+        print(f"Bot logged in as {bot.user} (ID: {bot.user.id}) shards={shards}")
+
+    @bot.command()
+    async def ping(ctx):
+        await ctx.send("pong")
+
+    return bot
+
+
+def run_shards(shard_ids, shard_count) -> None:
+    """Entry point of one shard-group process (see launcher.py)."""
+    create_bot(sharded=True, shard_count=shard_count, shard_ids=list(shard_ids)).run(DISCORD_TOKEN)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Medical report Discord bot.")
+    parser.add_argument("--shards", default=None, help='"auto" for AutoShardedBot, or a shard count')
+    args = parser.parse_args(argv)
+
+    if args.shards is None:
+        bot = create_bot()
+    elif args.shards == "auto":
+        bot = create_bot(sharded=True)
+    else:
+        bot = create_bot(sharded=True, shard_count=int(args.shards))
     bot.run(DISCORD_TOKEN)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,192 +1,149 @@
+import io
 import os
 import re
 import json
+import asyncio
+import functools
 import aiohttp
 import discord
 from discord.ext import commands
 from datetime import datetime
-from docx import Document
-from docx.shared import Pt, Cm
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-
-from config.settings import TEMP_DIR, REPORT_DIR
-from core.speech_to_text import transcribe_audio
-from core.langchain_pipeline import generate_medical_report
-
-# NOTE: Removed SESSION_TTL_MINUTES – patient info is one-time use per voice file
-
-# ---------- style helpers ----------
-
-def _set_page_margins(doc: Document, cm=2.0):
-    for section in doc.sections:
-        section.top_margin = Cm(cm)
-        section.bottom_margin = Cm(cm)
-        section.left_margin = Cm(cm)
-        section.right_margin = Cm(cm)
-
-
-def _set_global_font(doc: Document, name="Times New Roman", size=12):
-    style = doc.styles["Normal"]
-    style.font.name = name
-    style.font.size = Pt(size)
-    if style.paragraph_format.line_spacing is None:
-        style.paragraph_format.line_spacing = 1.15
-    style.paragraph_format.space_after = Pt(4)
-    style.paragraph_format.space_before = Pt(0)
-
-
-def _set_cell_borders(cell, top="single", left="single", bottom="single", right="single", sz=12, color="000000"):
-    """Set border untuk sebuah cell tabel."""
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    tcBorders = tcPr.first_child_found_in("w:tcBorders")
-    if tcBorders is None:
-        tcBorders = OxmlElement('w:tcBorders')
-        tcPr.append(tcBorders)
-
-    def _edge(tag, val):
-        el = tcBorders.find(qn(f"w:{tag}"))
-        if el is None:
-            el = OxmlElement(f"w:{tag}")
-            tcBorders.append(el)
-        el.set(qn("w:val"), val)
-        el.set(qn("w:sz"), str(sz))
-        el.set(qn("w:color"), color)
-
-    if top: _edge("top", top)
-    if left: _edge("left", left)
-    if bottom: _edge("bottom", bottom)
-    if right: _edge("right", right)
-
-
-def _shade_cell(cell, fill="EDEDED"):
-    """Shading halus pada cell header (hex tanpa #)."""
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    shd = OxmlElement('w:shd')
-    shd.set(qn('w:val'), 'clear')
-    shd.set(qn('w:color'), 'auto')
-    shd.set(qn('w:fill'), fill)
-    tcPr.append(shd)
-
-
-def _add_title(doc: Document, text: str):
-    p = doc.add_paragraph()
-    r = p.add_run(text)
-    r.bold = True
-    r.font.size = Pt(18)
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-
-def _add_section_box(doc: Document, title: str, lines: int = 6, page_width_cm: float = 16.0):
-    """
-   Create a box with a bold title at the top and lines for writing.
-It is made using a single-column table: the first row is the header (with shading), and the remaining rows have bottom borders (for writing lines).
-    """
-    table = doc.add_table(rows=1 + lines, cols=1)
-    table.autofit = False
-    for row in table.rows:
-        row.cells[0].width = Cm(page_width_cm)
-
-    # Header
-    hdr = table.cell(0, 0)
-    _set_cell_borders(hdr, top="single", left="single", bottom="single", right="single", sz=16)
-    _shade_cell(hdr)
-    p = hdr.paragraphs[0]
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p.paragraph_format.space_after = Pt(2)
-    run = p.add_run(title)
-    run.bold = True
-    run.font.size = Pt(12)
-
-    # Garis isi
-    for i in range(1, 1 + lines):
-        c = table.cell(i, 0)
-        _set_cell_borders(
-            c,
-            top="nil",
-            left="single",
-            bottom="single",
-            right="single",
-            sz=8
-        )
-        c.paragraphs[0].paragraph_format.space_after = Pt(0)
-        c.paragraphs[0].add_run(" ")
-
-    doc.add_paragraph().paragraph_format.space_after = Pt(8)
-
-
-def _add_report_section_table(doc: Document, title: str, lines: list[str],
-                              min_rows: int = 6, page_width_cm: float = 16.0):
-    """A section box containing a header and rows with bottom borders."""
-    total_rows = max(min_rows, max(1, len(lines)))
-    table = doc.add_table(rows=1 + total_rows, cols=1)
-    table.autofit = False
-    for row in table.rows:
-        row.cells[0].width = Cm(page_width_cm)
-
-    # Header
-    hdr = table.cell(0, 0)
-    _set_cell_borders(hdr, top="single", left="single", bottom="single", right="single", sz=16)
-    _shade_cell(hdr)
-    p = hdr.paragraphs[0]
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p.paragraph_format.space_after = Pt(2)
-    run = p.add_run(title)
-    run.bold = True
-    run.font.size = Pt(12)
-
-    # Rows (garis bawah)
-    for i in range(total_rows):
-        c = table.cell(1 + i, 0)
-        _set_cell_borders(c, top="nil", left="single", bottom="single", right="single", sz=8)
-        para = c.paragraphs[0]
-        para.paragraph_format.space_after = Pt(0)
-        if i < len(lines) and lines[i]:
-            txt = re.sub(r"^[\-•]\s+", "", lines[i]).strip()
-            para.add_run(txt)
-        else:
-            para.add_run(" ")
-
-    doc.add_paragraph().paragraph_format.space_after = Pt(8)
-
-# ---------------------- template generator ----------------------
-
-
-def save_consultation_template_with_boxes(path: str):
-    """Create a .docx template file with outlines/boxes for each section."""
-    doc = Document()
-    _set_page_margins(doc, cm=2.0)
-    _set_global_font(doc, size=12)
-
-    _add_title(doc, "Medical Consultation Report")
-    doc.add_paragraph()
-
-    sections = [
-        ("Symptoms", 6),
-        ("Diagnosis", 4),
-        ("Prescription / Treatment Plan", 8),
-        ("Doctor's Notes", 6),
-        ("Assessment", 4),
-        ("Plan", 5),
-        ("Red Flags", 4),
-        ("Disclaimer", 3),
-    ]
-
-    for name, nlines in sections:
-        _add_section_box(doc, name, lines=nlines)
-
-    p = doc.add_paragraph()
-    r = p.add_run(
-        "Note: This document is generated from a clinician–patient consultation. "
-        "It is intended for clinical use only and may contain transcription or inference errors."
-    )
-    r.italic = True
-    r.font.size = Pt(10)
-
-    doc.save(path)
+from typing import Optional
+
+from config.settings import (
+    TEMP_DIR,
+    REPORT_DIR,
+    TRANSCRIPT_DIR,
+    SCHED_MAX_QUEUE,
+    SCHED_GLOBAL_CONCURRENCY,
+    SCHED_PER_USER_CONCURRENCY,
+    SCHED_DOWNLOAD_WORKERS,
+    SCHED_STT_WORKERS,
+    SCHED_LLM_WORKERS,
+    SCHED_RENDER_WORKERS,
+    DOWNLOAD_MAX_MB,
+    DOWNLOAD_CHUNK_KB,
+    RENDER_WORKERS,
+    RENDER_TIMEOUT_SECONDS,
+    LLM_STREAMING_ENABLED,
+    PROGRESS_EDIT_INTERVAL_SECONDS,
+    SESSION_STORE_BACKEND,
+    SESSION_STORE_PATH,
+    SESSION_TTL_MINUTES,
+    SESSION_MAX_ENTRIES,
+    PIPELINE_MODE,
+    REPORT_PERSIST,
+    WORK_QUEUE_PATH,
+    WORK_QUEUE_POLL_SECONDS,
+    WORK_QUEUE_LEASE_SECONDS,
+    WORK_QUEUE_MAX_ATTEMPTS,
+    WORK_QUEUE_JOB_TIMEOUT_SECONDS,
+    TRANSCRIPT_CACHE_DIR,
+    STORAGE_SHARDING_ENABLED,
+    TRANSCRIPT_COMPRESSION_LEVEL,
+    AUDIO_RETENTION_DAYS,
+    TRANSCRIPT_RETENTION_DAYS,
+    REPORT_RETENTION_DAYS,
+    STORAGE_SWEEP_INTERVAL_MINUTES,
+    CATALOG_PATH,
+    CATALOG_BATCH_SIZE,
+    CATALOG_FLUSH_SECONDS,
+)
+from core.download import stream_download, DownloadError, DownloadTooLarge
+from core.speech_to_text import atranscribe_audio, aclose_stt_client
+from core.langchain_pipeline import agenerate_report, astream_report, aclose_llm_clients
+from core.scheduler import ConsultationScheduler, SchedulerFull
+from core.render_service import RenderService
+from core.metrics import REGISTRY, span, profile_job
+from core.report import SECTIONS
+from core.session_store import make_session_store
+from core.storage import StorageManager, write_bytes
+from core.catalog import ConsultationCatalog, ConsultationRecord
+from core.work_queue import CONSULTATION_JOB, SQLiteWorkQueue
+import core.langchain_pipeline as _pipeline
+import core.speech_to_text as _stt
+import core.tokens as _tokens
+
+# DOCX renderer lives in core.docx_renderer; re-exported here for existing imports.
+# Resolved on first access so importing the cog does not load python-docx/lxml.
+_DOCX_REEXPORTS = (
+    "SECTION_ALIASES",
+    "_canonical_section",
+    "_looks_like_patient_info",
+    "save_consultation_template_with_boxes",
+    "save_tidy_docx",
+)
+
+
+def __getattr__(name):
+    if name in _DOCX_REEXPORTS:
+        import core.docx_renderer
+        return getattr(core.docx_renderer, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _warm_imports():
+    """Load the provider SDKs that the pipeline imports lazily (runs in a thread)."""
+    _pipeline.warm_up()
+    _stt._aai()
+    _tokens._encoding()
+    import core.audio_chunking  # noqa: F401  (numpy)
+
+
+def _save_report_file(path: str, data: bytes) -> None:
+    """Persist an uploaded DOCX (runs in a thread)."""
+    with span("report_persist"):
+        write_bytes(path, data)
+
+# NOTE: patient info is one-time use per voice file; SESSION_TTL_MINUTES only drops
+# sessions that were never followed by audio
+
+# ---------------------- progress message ----------------------
+
+_GENERATING = "Generating structured medical report..."
+
+
+class _ProgressMessage:
+    """A single status message edited in place, at most once per `interval` seconds."""
+
+    def __init__(self, channel, interval: float, total: int):
+        self.channel = channel
+        self.interval = interval
+        self.total = total
+        self.message = None
+        self._shown = None
+        self._latest = []
+        self._last_edit = 0.0
+
+    def _render(self, sections) -> str:
+        if not sections:
+            return _GENERATING
+        done = "\n".join(f"✓ {s}" for s in sections)
+        return f"{_GENERATING} ({len(sections)}/{self.total} sections)\n{done}"
+
+    async def start(self):
+        self.message = await self.channel.send(_GENERATING)
+        self._shown = _GENERATING
+        self._last_edit = asyncio.get_running_loop().time()
+
+    async def update(self, sections):
+        self._latest = list(sections)
+        if asyncio.get_running_loop().time() - self._last_edit >= self.interval:
+            await self._edit()
+
+    async def flush(self):
+        await self._edit()
+
+    async def _edit(self):
+        content = self._render(self._latest)
+        if self.message is None or content == self._shown:
+            return
+        self._last_edit = asyncio.get_running_loop().time()
+        try:
+            await self.message.edit(content=content)
+            self._shown = content
+        except discord.HTTPException:
+            pass  # progress is best-effort; never fail the job over it
 
 # ---------------------- bot cog ----------------------
 
@@ -197,18 +154,142 @@ Flow:
 1) The user sends the patient's name and ID (using !patient ... or a formatted text message).
 2)The user sends one audio file (mp3/wav/m4a/ogg) — the patient info is used once and then deleted.
 3)The bot: downloads → transcribes → generates the report (.docx) → sends the file.
+   Jobs go through a bounded, per-user fair scheduler; each stage has its own worker cap.
     """
     def __init__(self, bot):
         self.bot = bot
         self.audio_dir = TEMP_DIR
-        self.transcript_dir = "data/transcripts"
+        self.transcript_dir = TRANSCRIPT_DIR
         self.report_dir = REPORT_DIR
-        os.makedirs(self.audio_dir, exist_ok=True)
-        os.makedirs(self.transcript_dir, exist_ok=True)
-        os.makedirs(self.report_dir, exist_ok=True)
+        # Date/hash-sharded layout, zstd transcripts, per-kind retention (swept in the background)
+        self.storage = StorageManager(
+            self.audio_dir,
+            self.transcript_dir,
+            self.report_dir,
+            audio_retention_s=AUDIO_RETENTION_DAYS * 86400,
+            transcript_retention_s=TRANSCRIPT_RETENTION_DAYS * 86400,
+            report_retention_s=REPORT_RETENTION_DAYS * 86400,
+            compression_level=TRANSCRIPT_COMPRESSION_LEVEL,
+            sharded=STORAGE_SHARDING_ENABLED,
+            skip_dirs=(TRANSCRIPT_CACHE_DIR,),
+        )
+        # Indexed record of finished consultations (!history / !resend), batched writes
+        self.catalog = ConsultationCatalog(CATALOG_PATH, batch_size=CATALOG_BATCH_SIZE)
+
+        # One-time use: { user_id: {"name": str, "id": str} }, TTL + LRU bounded
+        self.sessions = make_session_store(
+            SESSION_STORE_BACKEND,
+            SESSION_STORE_PATH,
+            ttl_s=SESSION_TTL_MINUTES * 60,
+            max_entries=SESSION_MAX_ENTRIES,
+        )
 
-        # In-memory, one-time use: { user_id: {"name": str, "id": str} }
-        self.session_patients = {}
+        self.scheduler = ConsultationScheduler(
+            max_queue=SCHED_MAX_QUEUE,
+            global_limit=SCHED_GLOBAL_CONCURRENCY,
+            per_user_limit=SCHED_PER_USER_CONCURRENCY,
+            stage_workers={
+                "download": SCHED_DOWNLOAD_WORKERS,
+                "stt": SCHED_STT_WORKERS,
+                "llm": SCHED_LLM_WORKERS,
+                "render": SCHED_RENDER_WORKERS,
+            },
+        )
+
+        # One HTTP session for the cog's lifetime (created on the bot loop in cog_load)
+        self.http_session: aiohttp.ClientSession | None = None
+        self.max_download_bytes = DOWNLOAD_MAX_MB * 1024 * 1024
+
+        # CPU-bound DOCX rendering runs in warm worker processes, off the gateway loop
+        self.renderer = RenderService(workers=RENDER_WORKERS, timeout_s=RENDER_TIMEOUT_SECONDS)
+
+        # Sharded deployment: STT/LLM/DOCX run in worker.py processes fed by a shared queue
+        self.work_queue = None
+        if PIPELINE_MODE == "queue":
+            self.work_queue = SQLiteWorkQueue(
+                WORK_QUEUE_PATH, lease_s=WORK_QUEUE_LEASE_SECONDS, max_attempts=WORK_QUEUE_MAX_ATTEMPTS
+            )
+
+        # Opt-in single-job profiling: { user_id: "cpu" | "mem" }
+        self._profile_next = {}
+        self._profiling = False
+        self._warmup_task = None
+        self._session_purge_task = None
+        self._storage_sweep_task = None
+        self._catalog_flush_task = None
+        # Background DOCX writes (REPORT_PERSIST=async), drained on unload
+        self._persist_tasks = set()
+
+    async def cog_load(self):
+        self.http_session = aiohttp.ClientSession()
+        self.scheduler.start()
+        # Heavy imports and render workers warm up in the background so the cog
+        # loads immediately; a job arriving earlier just loads them on first use.
+        self._warmup_task = asyncio.create_task(self._warm_up())
+        self._session_purge_task = asyncio.create_task(self._purge_sessions())
+        self._storage_sweep_task = asyncio.create_task(self._sweep_storage())
+        self._catalog_flush_task = asyncio.create_task(self._flush_catalog())
+
+    async def _warm_up(self):
+        await self.bot.wait_until_ready()
+        if self.work_queue is not None:
+            return  # queue mode: the pipeline runs in worker.py processes
+        t0 = asyncio.get_running_loop().time()
+        try:
+            await asyncio.to_thread(_warm_imports)
+            await self.renderer.start()
+        except Exception as e:
+            print(f"Warm-up failed (will load on first use): {e}")
+            return
+        REGISTRY.observe("warm_up", asyncio.get_running_loop().time() - t0)
+
+    async def _purge_sessions(self):
+        """Drop expired sessions every few minutes (LRU already caps the size)."""
+        interval = min(300.0, max(30.0, SESSION_TTL_MINUTES * 60 / 2))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.sessions.purge_expired)
+            except Exception as e:
+                print(f"Session purge failed: {e}")
+
+    async def _sweep_storage(self):
+        """Apply file retention and compress stray transcripts (first pass right after load)."""
+        interval = max(60.0, STORAGE_SWEEP_INTERVAL_MINUTES * 60)
+        while True:
+            try:
+                await asyncio.to_thread(self.storage.sweep)
+            except Exception as e:
+                print(f"Storage sweep failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def _flush_catalog(self):
+        """Commit buffered catalogue records (a full batch is committed right away)."""
+        while True:
+            await asyncio.sleep(max(0.5, CATALOG_FLUSH_SECONDS))
+            try:
+                await asyncio.to_thread(self.catalog.flush)
+            except Exception as e:
+                print(f"Catalog flush failed: {e}")
+
+    async def cog_unload(self):
+        for task in (self._warmup_task, self._session_purge_task, self._storage_sweep_task,
+                     self._catalog_flush_task):
+            if task is not None:
+                task.cancel()
+        await self.scheduler.stop()
+        self.renderer.shutdown()
+        if self.http_session is not None:
+            await self.http_session.close()
+        # Shared provider connection pools are bound to the bot loop
+        await aclose_stt_client()
+        await aclose_llm_clients()
+        if self._persist_tasks:
+            await asyncio.gather(*self._persist_tasks, return_exceptions=True)
+        self.sessions.close()
+        self.catalog.close()
+        if self.work_queue is not None:
+            self.work_queue.close()
 
     # ---------------------- Helpers ----------------------
 
@@ -235,18 +316,21 @@ Flow:
 
         return name, pid
 
-    def _set_session_patient(self, user_id: int, name: str, pid: str):
-        # No TTL; will be cleared after one successful audio processing
-        self.session_patients[user_id] = {
+    # The session store may be a shared SQLite file (sharded deployment), so every
+    # call runs in a thread instead of blocking the gateway loop on its lock.
+
+    async def _set_session_patient(self, user_id: int, name: str, pid: str):
+        # Cleared after one successful audio processing (or when the TTL runs out)
+        await asyncio.to_thread(self.sessions.set, user_id, {
             "name": name.strip(),
             "id": pid.strip(),
-        }
+        })
 
-    def _pop_session_patient(self, user_id: int):
-        return self.session_patients.pop(user_id, None)
+    async def _pop_session_patient(self, user_id: int):
+        return await asyncio.to_thread(self.sessions.pop, user_id)
 
-    def _get_session_patient(self, user_id: int):
-        return self.session_patients.get(user_id)
+    async def _get_session_patient(self, user_id: int):
+        return await asyncio.to_thread(self.sessions.get, user_id)
 
     # ---------------------- Set patient via command (opsional) ----------------------
 
@@ -265,13 +349,72 @@ Flow:
                 "atau\n`!patient name=\"Kusuma\" id=P-00123`"
             )
 
-        self._set_session_patient(ctx.author.id, name, pid)
+        await self._set_session_patient(ctx.author.id, name, pid)
         await ctx.send(
             f"Patient set for **{ctx.author.display_name}** (one-time use)\n"
             f"- Name: **{name}**\n- ID: **{pid}**\n"
             f"Send **one** file audio (mp3/wav/m4a/ogg);"
         )
 
+    # ---------------------- History / re-delivery (catalogue) ----------------------
+
+    @commands.command(name="history")
+    async def cmd_history(self, ctx, patient_id: str):
+        """Your past consultations for a patient ID, newest first."""
+        rows = await asyncio.to_thread(self.catalog.history, patient_id.strip(), str(ctx.author.id))
+        if not rows:
+            return await ctx.send(f"No consultations found for patient ID **{patient_id}**.")
+        lines = [
+            f"`#{r.id}` {datetime.fromtimestamp(r.created_at):%d %b %Y %H:%M}"
+            + ("" if os.path.exists(r.report_path) else " (report no longer stored)")
+            for r in rows
+        ]
+        await ctx.send(
+            f"Consultations for patient ID **{patient_id}** (newest first):\n" + "\n".join(lines)
+            + "\nUse `!resend <number>` to get a report again."
+        )
+
+    @commands.command(name="resend")
+    async def cmd_resend(self, ctx, consultation_id: int = None):
+        """Send a stored report again (default: your latest) without regenerating it."""
+        if consultation_id is None:
+            rec = await asyncio.to_thread(self.catalog.latest, str(ctx.author.id))
+        else:
+            rec = await asyncio.to_thread(self.catalog.get, consultation_id)
+        if rec is None or rec.clinician_id != str(ctx.author.id):
+            return await ctx.send("No such consultation of yours was found.")
+        if not os.path.exists(rec.report_path):
+            return await ctx.send(f"The report for consultation `#{rec.id}` is no longer stored.")
+        await ctx.send(
+            f"Report for consultation `#{rec.id}` (patient ID **{rec.patient_id}**, "
+            f"{datetime.fromtimestamp(rec.created_at):%d %b %Y %H:%M})",
+            file=discord.File(rec.report_path),
+        )
+
+    # ---------------------- Admin: metrics ----------------------
+
+    @commands.command(name="stats")
+    @commands.has_permissions(administrator=True)
+    async def cmd_stats(self, ctx, fmt: str = "json"):
+        """Per-stage latency (p50/p95/p99), in-flight counts and queue gauges."""
+        if fmt.lower() in ("prom", "prometheus"):
+            body, name = REGISTRY.to_prometheus(), "stats.prom"
+        else:
+            body, name = REGISTRY.to_json(), "stats.json"
+        if len(body) <= 1900:
+            return await ctx.send(f"```\n{body}```")
+        await ctx.send(file=discord.File(io.BytesIO(body.encode("utf-8")), filename=name))
+
+    @commands.command(name="profile")
+    @commands.has_permissions(administrator=True)
+    async def cmd_profile(self, ctx, kind: str = "cpu"):
+        """Profile your next consultation with cProfile ("cpu") or tracemalloc ("mem")."""
+        kind = kind.lower()
+        if kind not in ("cpu", "mem"):
+            return await ctx.send("Usage: `!profile cpu` or `!profile mem`")
+        self._profile_next[ctx.author.id] = kind
+        await ctx.send(f"Your next audio consultation will be profiled ({kind}).")
+
     # ---------------------- Listener ----------------------
 
     @commands.Cog.listener()
@@ -283,7 +426,7 @@ Flow:
         if not message.attachments and (message.content and message.content.strip()):
             name, pid = self._parse_patient_info(message.content)
             if name and pid:
-                self._set_session_patient(message.author.id, name, pid)
+                await self._set_session_patient(message.author.id, name, pid)
                 return await message.channel.send(
                     "Patient info saved (one-time use).\n"
                     f"- Name: **{name}**\n- ID: **{pid}**\n"
@@ -301,7 +444,7 @@ Flow:
         if not audio_attachments:
             return
 
-        patient = self._get_session_patient(message.author.id)
+        patient = await self._get_session_patient(message.author.id)
         if not patient:
             return await message.channel.send(
                 "**Patient info is required before sending audio.**\n"
@@ -316,214 +459,231 @@ Flow:
             await message.channel.send("Multiple audio files detected. Only the **first** file will be processed according to the one-time policy.")
         attachment = audio_attachments[0]
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_name = f"{message.author.name}_{timestamp}_{attachment.filename}"
-        audio_path = os.path.join(self.audio_dir, safe_name)
+        if attachment.size and attachment.size > self.max_download_bytes:
+            return await message.channel.send(
+                f"Audio `{attachment.filename}` is too large "
+                f"({attachment.size / (1024 * 1024):.1f} MB, limit {DOWNLOAD_MAX_MB} MB)."
+            )
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(attachment.url) as resp:
-                if resp.status == 200:
-                    with open(audio_path, "wb") as f:
-                        f.write(await resp.read())
+        try:
+            position = await self.scheduler.submit(
+                message.author.id,
+                lambda: self._process_consultation(message, attachment, dict(patient)),
+            )
+        except SchedulerFull:
+            return await message.channel.send(
+                "The consultation queue is full right now. Please resend the audio in a few minutes."
+            )
+        if position:
+            await message.channel.send(f"Audio `{attachment.filename}` queued, position {position}.")
 
+    async def _process_consultation(self, message: discord.Message, attachment, patient: dict):
+        """Run one job, timed as the "job" stage; optionally profiled when armed via !profile."""
+        kind = self._profile_next.pop(message.author.id, None)
+        if kind is None or self._profiling:
+            with span("job"):
+                return await self._run_consultation(message, attachment, patient)
+
+        self._profiling = True
+        try:
+            with profile_job(kind) as prof, span("job"):
+                await self._run_consultation(message, attachment, patient)
+        finally:
+            self._profiling = False
         await message.channel.send(
-            f"Audio received: `{attachment.filename}`\n"
-            f"Patient: **{patient['name']}**  |  ID: **{patient['id']}**\n"
-            f"Transcribing..."
+            f"Profile ({kind}) for `{attachment.filename}`:",
+            file=discord.File(io.BytesIO(prof["report"].encode("utf-8")), filename=f"profile_{kind}.txt"),
         )
 
-        # Transcribe
+    async def _run_local(self, message: discord.Message, audio_path: str, base: str,
+                         report_docx_path: str, patient: dict,
+                         job: ConsultationRecord) -> Optional[discord.File]:
+        """STT → LLM → DOCX in this process; returns the DOCX to upload, or None after replying with the error."""
+        # Transcribe (native asyncio, no executor thread held during remote I/O)
         try:
-            transcript_text = await self.bot.loop.run_in_executor(
-                None, transcribe_audio, audio_path
-            )
+            async with self.scheduler.stage("stt"), span("stt") as timer:
+                transcript_text = await atranscribe_audio(audio_path, audio_hash=job.audio_hash or None)
+            job.timings["stt"] = timer.seconds
         except Exception as e:
-            return await message.channel.send(f"Transcription failed: {e}")
+            await message.channel.send(f"Transcription failed: {e}")
+            return None
 
         # Simpan transcript
-        base = os.path.splitext(safe_name)[0]
-        transcript_path = os.path.join(self.transcript_dir, f"{base}.txt")
         try:
-            with open(transcript_path, "w", encoding="utf-8") as f:
-                f.write(transcript_text)
+            with span("transcript_write"):
+                job.transcript_path = await asyncio.to_thread(self.storage.write_transcript, base, transcript_text)
         except Exception as e:
-            return await message.channel.send(f"Saving transcript failed: {e}")
+            await message.channel.send(f"Saving transcript failed: {e}")
+            return None
 
-        await message.channel.send("Generating structured medical report...")
-
-        # Generate medical report
+        # Generate medical report (streamed: one progress message edited as sections finish)
         try:
-            report_text = await self.bot.loop.run_in_executor(
-                None, generate_medical_report, transcript_text
-            )
+            async with self.scheduler.stage("llm"), span("llm") as timer:
+                if LLM_STREAMING_ENABLED:
+                    progress = _ProgressMessage(message.channel, PROGRESS_EDIT_INTERVAL_SECONDS, len(SECTIONS))
+                    await progress.start()
+                    report = await astream_report(transcript_text, on_progress=progress.update)
+                    await progress.flush()
+                else:
+                    await message.channel.send(_GENERATING)
+                    report = await agenerate_report(transcript_text)
+            job.timings["llm"] = timer.seconds
         except Exception as e:
-            return await message.channel.send(f"Report generation failed: {e}")
+            await message.channel.send(f"Report generation failed: {e}")
+            return None
 
-    
-        report_docx_path = os.path.join(self.report_dir, f"{base}.docx")
+        # DOCX rendering is CPU-bound: handed to the render worker processes (the parsed
+        # Report is pickled as is, so the renderer does not parse the text again). The
+        # document comes back as bytes and is uploaded from memory; saving it to
+        # REPORT_DIR follows REPORT_PERSIST and is off the critical path by default.
         try:
-            save_tidy_docx(
-                report_text=report_text,
-                report_path=report_docx_path,
-                author_name=message.author.display_name,
-                patient_name=patient["name"],
-                patient_id=patient["id"],
+            async with self.scheduler.stage("render"), span("render") as timer:
+                docx_bytes = await self.renderer.render(
+                    report_text=report,
+                    report_path=report_docx_path,
+                    author_name=message.author.display_name,
+                    patient_name=patient["name"],
+                    patient_id=patient["id"],
+                    consulted_at=datetime.fromtimestamp(job.created_at),
+                    as_bytes=True,
+                )
+            job.timings["render"] = timer.seconds
+        except asyncio.TimeoutError:
+            await message.channel.send("Saving DOCX failed: rendering timed out.")
+            return None
+        except Exception as e:
+            await message.channel.send(f"Saving DOCX failed: {e}")
+            return None
+        save_error = await self._persist_report(report_docx_path, docx_bytes, job)
+        if save_error is not None:
+            # The document exists in memory: still deliver it, only !resend loses it
+            await message.channel.send(
+                f"Saving DOCX to disk failed ({save_error}); the report below is not stored for !resend."
             )
+        return discord.File(io.BytesIO(docx_bytes), filename=os.path.basename(report_docx_path))
+
+    async def _persist_report(self, report_docx_path: str, docx_bytes: bytes,
+                              job: ConsultationRecord) -> Optional[Exception]:
+        """
+        Save the rendered DOCX per REPORT_PERSIST ("async" returns before the write is done).
+        Returns the error of a failed "sync" write; a failed write always clears
+        job.report_path (also in the catalogue) so !resend does not point at nothing.
+        """
+        if REPORT_PERSIST == "off":
+            job.report_path = ""  # nothing for !resend to send
+            return None
+        write = asyncio.to_thread(_save_report_file, report_docx_path, docx_bytes)
+        if REPORT_PERSIST == "sync":
+            try:
+                await write
+            except Exception as e:
+                job.report_path = ""  # not in the catalogue yet
+                return e
+            return None
+        task = asyncio.create_task(write)
+        self._persist_tasks.add(task)
+        task.add_done_callback(functools.partial(self._report_persisted, job))
+        return None
+
+    def _report_persisted(self, job: ConsultationRecord, task: asyncio.Task):
+        self._persist_tasks.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        print(f"Saving DOCX to disk failed: {task.exception()}")
+        # The record may already be buffered or written; the catalogue clears it either way
+        forget = asyncio.create_task(asyncio.to_thread(self.catalog.forget_report, job))
+        self._persist_tasks.add(forget)
+        forget.add_done_callback(self._persist_tasks.discard)
+
+    async def _run_on_workers(self, message: discord.Message, audio_path: str, base: str,
+                              report_docx_path: str, patient: dict,
+                              job: ConsultationRecord) -> Optional[discord.File]:
+        """PIPELINE_MODE=queue: hand STT → LLM → DOCX to worker.py processes and wait (they save the file)."""
+        payload = {
+            "audio_path": os.path.abspath(audio_path),
+            "transcript_path": os.path.abspath(self.storage.transcript_path(base)),
+            "consulted_at": datetime.fromtimestamp(job.created_at).isoformat(),
+            "report_path": os.path.abspath(report_docx_path),
+            "author_name": message.author.display_name,
+            "patient_name": patient["name"],
+            "patient_id": patient["id"],
+            "audio_hash": job.audio_hash,
+        }
+        try:
+            job_id = await asyncio.to_thread(self.work_queue.enqueue, CONSULTATION_JOB, payload)
+            await message.channel.send(_GENERATING)
+            async with span("worker_job") as timer:
+                result = await self.work_queue.wait(
+                    job_id, poll_s=WORK_QUEUE_POLL_SECONDS, timeout_s=WORK_QUEUE_JOB_TIMEOUT_SECONDS
+                )
+            job.timings["worker_job"] = timer.seconds
+            job.transcript_path = result.get("transcript_path", payload["transcript_path"])
+            job.timings.update(result.get("timings", {}))
+        except asyncio.TimeoutError:
+            # Nobody is waiting any more: keep a worker from picking it up (or finishing it) later
+            await asyncio.to_thread(self.work_queue.cancel, job_id, "timed out waiting for a worker")
+            await message.channel.send("Report generation failed: timed out waiting for a worker.")
+            return None
         except Exception as e:
-            return await message.channel.send(f"Saving DOCX failed: {e}")
+            await message.channel.send(f"Report generation failed: {e}")
+            return None
+        return discord.File(report_docx_path)
+
+    async def _run_consultation(self, message: discord.Message, attachment, patient: dict):
+        """Run one job: download → transcribe → report → DOCX, each inside its scheduler stage."""
+        started = datetime.now()
+        timestamp = started.strftime("%Y%m%d_%H%M%S")
+        safe_name = f"{message.author.name}_{timestamp}_{attachment.filename}"
+        audio_path = self.storage.path_for("audio", safe_name)
 
-        # One-time use: clear immediately after successful generation
-        self._pop_session_patient(message.author.id)
+        try:
+            async with self.scheduler.stage("download"), span("download") as timer:
+                dl = await stream_download(
+                    self.http_session,
+                    attachment.url,
+                    audio_path,
+                    max_bytes=self.max_download_bytes,
+                    chunk_size=DOWNLOAD_CHUNK_KB * 1024,
+                )
+        except DownloadTooLarge as e:
+            return await message.channel.send(f"Audio rejected: {e}")
+        except (DownloadError, aiohttp.ClientError, OSError) as e:
+            return await message.channel.send(f"Download failed: {e}")
 
         await message.channel.send(
-            "Report generated successfully! (patient info cleared)",
-            file=discord.File(report_docx_path)
+            f"Audio received: `{attachment.filename}` "
+            f"({dl.bytes / (1024 * 1024):.1f} MB @ {dl.mb_per_s:.1f} MB/s)\n"
+            f"Patient: **{patient['name']}**  |  ID: **{patient['id']}**\n"
+            f"Transcribing..."
         )
 
-# ---------------------- DOCX Renderer ----------------------
-
-
-def _looks_like_patient_info(line: str) -> bool:
-    """A filter to prevent model content containing patient identity information from being rewritten in the body."""
-    patterns = [
-        r"^\s*(patient\s*name|nama\s*pasien)\s*[:=]",
-        r"^\s*(patient\s*id|id\s*pasien|mrn|rekam\s*medis)\s*[:=]",
-        r"^\s*(dob|tanggal\s*lahir|age|umur)\s*[:=]",
-        r"^\s*(date\s*of\s*consultation|tanggal\s*konsultasi)\s*[:=]",
-        r"^\s*(alamat|address|phone|telepon)\s*[:=]",
-    ]
-    for p in patterns:
-        if re.search(p, line, flags=re.IGNORECASE):
-            return True
-    return False
-
-
-def _add_divider(doc: Document):
-    p = doc.add_paragraph()
-    run = p.add_run("\u2500" * 60)  # garis tipis
-    run.font.size = Pt(8)
-
-# ---- robust section header matching ----
-SECTION_ALIASES = {
-    "Symptoms": r"symptoms?",
-    "Diagnosis": r"(diagnosis|dx)",
-    "Prescription / Treatment Plan": r"(prescription|rx|treatment\s*/?\s*plan|management\s*plan)",
-    "Doctor's Notes": r"(doctor'?s?\s*notes?|clinical\s*notes?)",
-    "Assessment": r"(assessment|impression)",
-    "Plan": r"plan(?:\s*of\s*care)?",
-    "Red Flags": r"(red\s*flags?|warning\s*signs?)",
-    "Disclaimer": r"(disclaimer|note)",
-}
-
-
-def _canonical_section(line: str, sections: list[str]) -> str | None:
-    """ChatGPT said:
-
-Return the canonical section name if the line matches the header."""
-    if not line:
-        return None
-    norm = re.sub(r"\s+", " ", line.strip()).rstrip(":").lower()
-    norm = re.sub(r"\s*/\s*", "/", norm)  # standardize ' / '
-
-    # Exact match vs canonical header (with normalized '/')
-    for s in sections:
-        s_norm = re.sub(r"\s*/\s*", "/", s.lower())
-        if norm == s_norm:
-            return s
-
-    # Alias match
-    for canonical, pat in SECTION_ALIASES.items():
-        if re.fullmatch(pat, norm, flags=re.IGNORECASE):
-            return canonical
-    return None
-
-
-def save_tidy_docx(
-    report_text: str,
-    report_path: str,
-    author_name: str = "Unknown",
-    patient_name: str = "Unknown",
-    patient_id: str = "Unknown",
-):
-    """
-  Generate a clean, professional medical report in Times New Roman (.docx).
- -Inserts the patient's Name and ID only at the top (without duplication in the body).
- -Detects the consultation date from the filename (YYYYMMDD) if available.
- -BODY: each section is rendered as a bordered box like a form.
-    """
-    # Extract date from filename if possible (…_YYYYMMDD_HHMMSS_…)
-    m = re.search(r"(\d{8})_\d{6}", report_path)
-    if m:
-        raw = m.group(1)
-        try:
-            consultation_date = datetime.strptime(raw, "%Y%m%d").strftime("%d %B %Y")
-        except ValueError:
-            consultation_date = "[Date not available]"
-    else:
-        consultation_date = "[Date not available]"
-
-    doc = Document()
-    _set_page_margins(doc, cm=2.0)
-    _set_global_font(doc, size=12)
-
-    # Title
-    _add_title(doc, "Medical Consultation Report")
-    doc.add_paragraph()
-
-    # Header info (patient + date)
-    header = doc.add_paragraph()
-    header.alignment = WD_ALIGN_PARAGRAPH.LEFT
-    header.runs.append(header.add_run(f"Patient Name: {patient_name}\n"))
-    header.runs.append(header.add_run(f"Patient ID: {patient_id}\n"))
-    header.runs.append(header.add_run(f"Date of Consultation: {consultation_date}\n"))
-    header.runs.append(header.add_run(f"Generated by: {author_name}\n"))
-
-    _add_divider(doc)
-
-    # Definisi section yang dikenali
-    sections = [
-        "Symptoms",
-        "Diagnosis",
-        "Prescription / Treatment Plan",
-        "Doctor's Notes",
-        "Assessment",
-        "Plan",
-        "Red Flags",
-        "Disclaimer",
-    ]
-
-    buckets = {s: [] for s in sections}
-    current = None
-    for raw in [ln.strip() for ln in report_text.splitlines() if ln.strip()]:
-        maybe = _canonical_section(raw, sections)
-        if maybe:
-            current = maybe
-            continue
-        if current is None:
-            current = "Doctor's Notes"
-        if _looks_like_patient_info(raw):
-            continue
-        line = re.sub(r"^[\-•]\s+", "- ", raw)
-        buckets[current].append(line)
-
-    # Render tiap section sebagai kotak bergaris
-    MIN_ROWS = {
-        "Symptoms": 6,
-        "Diagnosis": 4,
-        "Prescription / Treatment Plan": 8,
-        "Doctor's Notes": 6,
-        "Assessment": 4,
-        "Plan": 5,
-        "Red Flags": 4,
-        "Disclaimer": 3,
-    }
-
-    for s in sections:
-        content = buckets.get(s) or ["- None reported."]
-        _add_report_section_table(doc, s, content, min_rows=MIN_ROWS.get(s, 5))
-
-    doc.save(report_path)
+        base = os.path.splitext(safe_name)[0]
+        report_docx_path = self.storage.path_for("report", f"{base}.docx")
+        job = ConsultationRecord(
+            created_at=started.timestamp(),
+            clinician_id=str(message.author.id),
+            clinician=message.author.display_name,
+            patient_id=patient["id"],
+            audio_hash=dl.xxh3,
+            audio_path=audio_path,
+            report_path=report_docx_path,
+            timings={"download": timer.seconds},
+        )
+        if self.work_queue is not None:
+            report_file = await self._run_on_workers(message, audio_path, base, report_docx_path, patient, job)
+        else:
+            report_file = await self._run_local(message, audio_path, base, report_docx_path, patient, job)
+        if report_file is None:
+            return
+        await asyncio.to_thread(self.catalog.add, job)  # may commit a full batch
 
+        # One-time use: clear immediately after successful generation
+        await self._pop_session_patient(message.author.id)
+
+        await message.channel.send(
+            "Report generated successfully! (patient info cleared)",
+            file=report_file,
+        )
 
 async def setup(bot):
     await bot.add_cog(Consultation(bot))
@@ -8,4 +8,125 @@ ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
 TEMP_DIR = os.getenv("TEMP_DIR", "data/audio")
-REPORT_DIR = os.getenv("REPORT_DIR", "data/reports")
\ No newline at end of file
+REPORT_DIR = os.getenv("REPORT_DIR", "data/reports")
+
+# ---- LLM (OpenRouter) ----
+LLM_MODEL = os.getenv("LLM_MODEL", "deepseek/deepseek-chat-v3.1:free")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))
+
+# Shared keep-alive HTTP pool used by every LLM client
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+LLM_POOL_KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+# ---- Report output format: "text" (plain sections, parsed) | "json" (structured, falls back to text) ----
+LLM_OUTPUT_FORMAT = os.getenv("LLM_OUTPUT_FORMAT", "text").strip().lower()
+
+# ---- LLM routing: ordered failover, retries, circuit breakers, hedging ----
+# Comma-separated "model[@base_url][#API_KEY_ENV]"; the first entry is the primary.
+LLM_ROUTES = os.getenv("LLM_ROUTES", LLM_MODEL)
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+LLM_RETRY_BACKOFF_BASE = float(os.getenv("LLM_RETRY_BACKOFF_BASE", "0.5"))
+LLM_RETRY_BACKOFF_MAX = float(os.getenv("LLM_RETRY_BACKOFF_MAX", "8"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))  # 0 = no hedging
+
+# ---- Speech-to-text (AssemblyAI REST, used by the asyncio path) ----
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com")
+ASSEMBLYAI_POLL_INTERVAL = float(os.getenv("ASSEMBLYAI_POLL_INTERVAL", "3"))
+ASSEMBLYAI_TIMEOUT = float(os.getenv("ASSEMBLYAI_TIMEOUT", "60"))
+# Give up on a transcript still queued/processing after this long (seconds, 0 = wait forever)
+ASSEMBLYAI_MAX_WAIT = float(os.getenv("ASSEMBLYAI_MAX_WAIT", "1800"))
+
+# ---- Consultation job scheduler ----
+SCHED_MAX_QUEUE = int(os.getenv("SCHED_MAX_QUEUE", "100"))
+SCHED_GLOBAL_CONCURRENCY = int(os.getenv("SCHED_GLOBAL_CONCURRENCY", "8"))
+SCHED_PER_USER_CONCURRENCY = int(os.getenv("SCHED_PER_USER_CONCURRENCY", "1"))
+SCHED_DOWNLOAD_WORKERS = int(os.getenv("SCHED_DOWNLOAD_WORKERS", "4"))
+SCHED_STT_WORKERS = int(os.getenv("SCHED_STT_WORKERS", "4"))
+SCHED_LLM_WORKERS = int(os.getenv("SCHED_LLM_WORKERS", "4"))
+SCHED_RENDER_WORKERS = int(os.getenv("SCHED_RENDER_WORKERS", "2"))
+
+# ---- Transcript cache (keyed by audio hash + speech model) ----
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "data/transcripts")
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "1") == "1"
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(TRANSCRIPT_DIR, "cache"))
+TRANSCRIPT_CACHE_MAX_MB = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512"))
+TRANSCRIPT_CACHE_MAX_AGE_DAYS = float(os.getenv("TRANSCRIPT_CACHE_MAX_AGE_DAYS", "30"))
+TRANSCRIPT_CACHE_MEMORY_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MEMORY_ENTRIES", "256"))
+
+# ---- Storage layout + retention (audio / transcripts / reports) ----
+# Files go to <dir>/YYYY/MM/DD/<hash shard>/; transcripts are zstd-compressed (level 0 = plain .txt).
+# Retention in days, 0 = keep forever; the sweeper runs every STORAGE_SWEEP_INTERVAL_MINUTES.
+STORAGE_SHARDING_ENABLED = os.getenv("STORAGE_SHARDING_ENABLED", "1") == "1"
+TRANSCRIPT_COMPRESSION_LEVEL = int(os.getenv("TRANSCRIPT_COMPRESSION_LEVEL", "3"))
+AUDIO_RETENTION_DAYS = float(os.getenv("AUDIO_RETENTION_DAYS", "7"))
+TRANSCRIPT_RETENTION_DAYS = float(os.getenv("TRANSCRIPT_RETENTION_DAYS", "0"))
+REPORT_RETENTION_DAYS = float(os.getenv("REPORT_RETENTION_DAYS", "0"))
+STORAGE_SWEEP_INTERVAL_MINUTES = float(os.getenv("STORAGE_SWEEP_INTERVAL_MINUTES", "60"))
+
+# ---- Consultation catalogue (SQLite index behind !history / !resend) ----
+# Records are buffered and committed in batches of CATALOG_BATCH_SIZE or every CATALOG_FLUSH_SECONDS.
+CATALOG_PATH = os.getenv("CATALOG_PATH", "data/catalog.sqlite3")
+CATALOG_BATCH_SIZE = int(os.getenv("CATALOG_BATCH_SIZE", "32"))
+CATALOG_FLUSH_SECONDS = float(os.getenv("CATALOG_FLUSH_SECONDS", "5"))
+
+# ---- Report memoization ("none" | "memory" | "sqlite") ----
+REPORT_CACHE_BACKEND = os.getenv("REPORT_CACHE_BACKEND", "none")
+REPORT_CACHE_PATH = os.getenv("REPORT_CACHE_PATH", "data/cache/reports.sqlite3")
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "512"))
+
+# ---- Pending patient sessions (memory | sqlite; sqlite is shared by shards) ----
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory")
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "data/sessions.sqlite3")
+SESSION_TTL_MINUTES = float(os.getenv("SESSION_TTL_MINUTES", "60"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+# ---- Attachment download ----
+DOWNLOAD_MAX_MB = int(os.getenv("DOWNLOAD_MAX_MB", "100"))
+DOWNLOAD_CHUNK_KB = int(os.getenv("DOWNLOAD_CHUNK_KB", "256"))
+
+# ---- Long-audio chunked transcription (WAV input) ----
+STT_CHUNKING_ENABLED = os.getenv("STT_CHUNKING_ENABLED", "1") == "1"
+STT_CHUNK_SECONDS = float(os.getenv("STT_CHUNK_SECONDS", "300"))
+STT_CHUNK_OVERLAP_SECONDS = float(os.getenv("STT_CHUNK_OVERLAP_SECONDS", "2"))
+STT_CHUNK_FANOUT = int(os.getenv("STT_CHUNK_FANOUT", "4"))
+
+# ---- Map-reduce report generation for long transcripts ----
+MAP_REDUCE_THRESHOLD_TOKENS = int(os.getenv("MAP_REDUCE_THRESHOLD_TOKENS", "6000"))
+MAP_REDUCE_CHUNK_TOKENS = int(os.getenv("MAP_REDUCE_CHUNK_TOKENS", "3000"))
+MAP_REDUCE_CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+
+# ---- Transcript compaction before the LLM call ----
+# Fillers and repeats are always removed when enabled; above the budget, small talk and
+# other non-clinical sentences are trimmed (0 = no budget)
+TRANSCRIPT_COMPACTION_ENABLED = os.getenv("TRANSCRIPT_COMPACTION_ENABLED", "1") == "1"
+# 0 = clean only. A budget drops sentences (lossy) before map-reduce sees the transcript,
+# so leave it at 0 or set it above MAP_REDUCE_THRESHOLD_TOKENS to cap very long ones
+TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "0"))
+
+# ---- DOCX rendering process pool ----
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_TIMEOUT_SECONDS = float(os.getenv("RENDER_TIMEOUT_SECONDS", "60"))
+
+# ---- Report delivery: the DOCX is rendered in memory and uploaded from there ----
+# REPORT_PERSIST: "async" (saved to REPORT_DIR after the upload) | "sync" (saved before it) | "off" (never saved)
+REPORT_PERSIST = os.getenv("REPORT_PERSIST", "async").strip().lower()
+
+# ---- Streaming generation + Discord progress message ----
+LLM_STREAMING_ENABLED = os.getenv("LLM_STREAMING_ENABLED", "1") == "1"
+PROGRESS_EDIT_INTERVAL_SECONDS = float(os.getenv("PROGRESS_EDIT_INTERVAL_SECONDS", "1.5"))
+
+# ---- Sharded deployment: local work queue + worker processes ----
+# PIPELINE_MODE=local runs every stage in the bot process; "queue" hands STT/LLM/DOCX to worker.py
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "local")
+WORK_QUEUE_PATH = os.getenv("WORK_QUEUE_PATH", "data/queue.sqlite3")
+WORK_QUEUE_POLL_SECONDS = float(os.getenv("WORK_QUEUE_POLL_SECONDS", "0.5"))
+WORK_QUEUE_LEASE_SECONDS = float(os.getenv("WORK_QUEUE_LEASE_SECONDS", "300"))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "2"))
+WORK_QUEUE_JOB_TIMEOUT_SECONDS = float(os.getenv("WORK_QUEUE_JOB_TIMEOUT_SECONDS", "1800"))
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
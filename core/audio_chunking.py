@@ -0,0 +1,248 @@
+# core/audio_chunking.py
+"""
+Long-audio mode for speech-to-text.
+
+1) Decode PCM: 16-bit WAV via the stdlib `wave` module; anything else (Discord
+   voice messages are ogg/opus, uploads often mp3/m4a) through the `ffmpeg`
+   binary as 16 kHz mono. Without ffmpeg on PATH those files are not split and
+   go to the provider in one request.
+2) Pick split points at the quietest stretch near every `chunk_s` boundary.
+3) Write overlapping segments and transcribe them concurrently (bounded fan-out).
+4) Stitch the texts back in order, dropping words repeated inside the overlaps.
+
+The transcriber is injected, so tests can use a local fake instead of AssemblyAI.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import wave
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+import numpy as np
+
+Transcriber = Callable[[str], Awaitable[str]]
+
+_WORD_RE = re.compile(r"[\w']+")
+_LEADING_PUNCT_RE = re.compile(r"^[\s,.;:!?]+")
+# Non-WAV input is decoded to this (plenty for speech, 32 KB per second in memory)
+_FFMPEG_RATE = 16000
+_FFMPEG_TIMEOUT_S = 300
+
+
+@dataclass
+class Pcm:
+    samples: np.ndarray  # int16, interleaved when channels > 1
+    rate: int
+    channels: int
+    sampwidth: int
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.samples) // self.channels
+
+    @property
+    def duration_s(self) -> float:
+        return self.n_frames / float(self.rate)
+
+
+def _ffmpeg_pcm(path: str) -> Optional[Pcm]:
+    """Any container ffmpeg understands -> 16 kHz mono PCM; None without ffmpeg or on failure."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    try:
+        proc = subprocess.run(
+            [ffmpeg, "-nostdin", "-v", "error", "-i", path,
+             "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(_FFMPEG_RATE), "-"],
+            capture_output=True,
+            timeout=_FFMPEG_TIMEOUT_S,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0 or not proc.stdout:
+        return None
+    raw = proc.stdout[: len(proc.stdout) // 2 * 2]
+    return Pcm(np.frombuffer(raw, dtype="<i2"), _FFMPEG_RATE, 1, 2)
+
+
+def load_pcm(path: str) -> Optional[Pcm]:
+    """Decode audio for splitting; returns None for anything we cannot split."""
+    if not path.lower().endswith(".wav"):
+        return _ffmpeg_pcm(path)
+    try:
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != 2:
+                return None
+            raw = w.readframes(w.getnframes())
+            return Pcm(np.frombuffer(raw, dtype="<i2"), w.getframerate(), w.getnchannels(), 2)
+    except (wave.Error, EOFError):
+        return None
+
+
+def _window_rms(pcm: Pcm, window_s: float) -> Tuple[np.ndarray, int]:
+    win = max(1, int(pcm.rate * window_s))
+    mono = pcm.samples.reshape(-1, pcm.channels).astype(np.float32).mean(axis=1)
+    n = len(mono) // win
+    if n == 0:
+        return np.zeros(0, dtype=np.float32), win
+    frames = mono[: n * win].reshape(n, win)
+    return np.sqrt((frames * frames).mean(axis=1)), win
+
+
+def find_split_points(
+    pcm: Pcm,
+    chunk_s: float,
+    window_s: float = 0.05,
+    search_s: Optional[float] = None,
+    silence_db: float = -35.0,
+) -> List[int]:
+    """
+    Return frame offsets where the audio should be cut, one near each multiple of
+    chunk_s. Each cut lands in the middle of the longest silent run within
+    ±search_s of the target, or on the quietest window if nothing is silent.
+    """
+    rms, win = _window_rms(pcm, window_s)
+    if len(rms) == 0 or pcm.duration_s <= chunk_s:
+        return []
+    search_s = chunk_s * 0.2 if search_s is None else search_s
+    peak = float(rms.max()) or 1.0
+    silent = rms <= peak * (10 ** (silence_db / 20.0))
+
+    cuts: List[int] = []
+    last_w = 0
+    target_s = chunk_s
+    while target_s < pcm.duration_s - window_s:
+        lo = max(last_w + 1, int((target_s - search_s) / window_s))
+        hi = min(len(rms), int((target_s + search_s) / window_s) + 1)
+        if lo >= hi:
+            break
+        best = None
+        run_start = None
+        for i in range(lo, hi + 1):
+            if i < hi and silent[i]:
+                if run_start is None:
+                    run_start = i
+                continue
+            if run_start is not None:
+                if best is None or (i - run_start) > (best[1] - best[0]):
+                    best = (run_start, i)
+                run_start = None
+        if best is not None:
+            cut_w = (best[0] + best[1]) // 2
+        else:
+            cut_w = lo + int(np.argmin(rms[lo:hi]))
+        cuts.append(cut_w * win)
+        last_w = cut_w
+        target_s = cut_w * window_s + chunk_s
+    return cuts
+
+
+def _write_wav(path: str, pcm: Pcm, start: int, end: int) -> None:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(pcm.channels)
+        w.setsampwidth(pcm.sampwidth)
+        w.setframerate(pcm.rate)
+        w.writeframes(pcm.samples[start * pcm.channels: end * pcm.channels].tobytes())
+
+
+def split_audio(pcm: Pcm, out_dir: str, chunk_s: float, overlap_s: float) -> List[str]:
+    """Write overlapping segment WAVs into out_dir and return their paths in order."""
+    cuts = find_split_points(pcm, chunk_s)
+    bounds = [0] + cuts + [pcm.n_frames]
+    pad = int(overlap_s * pcm.rate)
+    paths = []
+    for i in range(len(bounds) - 1):
+        start = max(0, bounds[i] - pad)
+        end = min(pcm.n_frames, bounds[i + 1] + pad)
+        path = os.path.join(out_dir, f"segment_{i:04d}.wav")
+        _write_wav(path, pcm, start, end)
+        paths.append(path)
+    return paths
+
+
+def _norm_words(text: str) -> Tuple[List[str], List[int]]:
+    """Lower-cased words with punctuation dropped, and where each one ends in `text`."""
+    matches = list(_WORD_RE.finditer(text))
+    return [m.group().lower() for m in matches], [m.end() for m in matches]
+
+
+def merge_overlap(prev: str, nxt: str, max_words: int = 30, min_words: int = 2) -> str:
+    """
+    Drop the leading words of `nxt` that repeat the tail of `prev`.
+    Words are compared without case or punctuation ("fever," == "Fever") and the
+    cut is made at the source offset of the last repeated word, so the rest of
+    `nxt` keeps its original punctuation. Tolerates one clipped word at either
+    edge of the overlap. At least `min_words` words must match: a single shared
+    word at a boundary is as likely to be said twice as to be overlap.
+    """
+    a, _ = _norm_words(prev)
+    b, ends = _norm_words(nxt)
+    if not a or not b:
+        return nxt.strip()
+    limit = min(max_words, len(a), len(b))
+    for k in range(limit, max(1, min_words) - 1, -1):
+        # (words to skip at the end of prev, words to skip at the start of next)
+        for skip_a, skip_b in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            if k + skip_a > len(a) or k + skip_b > len(b):
+                continue
+            tail = a[len(a) - skip_a - k: len(a) - skip_a]
+            head = b[skip_b: skip_b + k]
+            if tail == head:
+                return _LEADING_PUNCT_RE.sub("", nxt[ends[skip_b + k - 1]:]).rstrip()
+    return nxt.strip()
+
+
+# How much of the stitched text each part is compared with (well over max_words words)
+_STITCH_TAIL_CHARS = 2000
+
+
+def stitch_transcripts(parts: List[str]) -> str:
+    """Join parts in order; each one is de-duplicated against the text stitched so far
+    (not only the previous part, which may itself have been cut down to a word or two)."""
+    text = ""
+    for part in parts:
+        part = (part or "").strip()
+        if not part:
+            continue
+        if text:
+            part = merge_overlap(text[-_STITCH_TAIL_CHARS:], part)
+            if not part:
+                continue
+            text += " "
+        text += part
+    return text
+
+
+async def atranscribe_chunked(
+    file_path: str,
+    transcriber: Transcriber,
+    chunk_s: float = 300.0,
+    overlap_s: float = 2.0,
+    fan_out: int = 4,
+) -> Optional[str]:
+    """
+    Transcribe a long recording as concurrent overlapping segments (written as WAV).
+    Returns None when the file cannot be decoded (non-WAV input needs ffmpeg on
+    PATH) or is short enough for one job, so the caller can fall back to a single request.
+    """
+    pcm = await asyncio.to_thread(load_pcm, file_path)
+    if pcm is None or pcm.duration_s <= chunk_s * 1.5:
+        return None
+
+    tmp_dir = tempfile.mkdtemp(prefix="stt-chunks-")
+    try:
+        paths = await asyncio.to_thread(split_audio, pcm, tmp_dir, chunk_s, overlap_s)
+        sem = asyncio.Semaphore(max(1, fan_out))
+
+        async def _one(path: str) -> str:
+            async with sem:
+                return await transcriber(path)
+
+        parts = await asyncio.gather(*(_one(p) for p in paths))
+        return stitch_transcripts(list(parts))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
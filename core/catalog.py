@@ -0,0 +1,179 @@
+# core/catalog.py
+"""
+Indexed catalogue of finished consultations (SQLite, WAL), so past reports are
+found by patient or clinician without scanning REPORT_DIR file names.
+
+    catalog = ConsultationCatalog("data/catalog.sqlite3")
+    catalog.add(ConsultationRecord(created_at=time.time(), clinician_id="42", ...))
+    catalog.history("P-00123", clinician_id="42")   # newest first
+    catalog.latest("42")                            # for !resend
+
+Writes are buffered and committed in batches: add() only appends to a list, and
+the buffer is written in one transaction (executemany) once batch_size records
+are pending, on flush() (the cog calls it periodically), before every read and
+on close(). Readers therefore always see their own writes. The buffer has its
+own lock, so add() never waits for a commit in progress; only the add() that
+fills a batch writes (callers on an event loop should use asyncio.to_thread).
+
+Patient names are not stored; the patient ID, clinician, audio hash, artifact
+paths and per-stage timings are.
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from core.metrics import REGISTRY, span
+
+_COLUMNS = (
+    "created_at", "clinician_id", "clinician", "patient_id", "audio_hash",
+    "audio_path", "transcript_path", "report_path", "timings",
+)
+
+
+@dataclass
+class ConsultationRecord:
+    created_at: float
+    clinician_id: str
+    clinician: str
+    patient_id: str
+    audio_hash: str = ""
+    audio_path: str = ""
+    transcript_path: str = ""
+    report_path: str = ""
+    timings: Dict[str, float] = field(default_factory=dict)  # stage -> seconds
+    id: Optional[int] = None  # assigned when the batch is written
+
+    def _row(self) -> tuple:
+        return (
+            self.created_at, str(self.clinician_id), self.clinician, self.patient_id, self.audio_hash,
+            self.audio_path, self.transcript_path, self.report_path,
+            json.dumps({k: round(v, 4) for k, v in self.timings.items()}),
+        )
+
+    @classmethod
+    def _from_row(cls, row: tuple) -> "ConsultationRecord":
+        rec = cls(*row[1:])
+        rec.id = row[0]
+        rec.timings = json.loads(rec.timings or "{}")
+        return rec
+
+
+class ConsultationCatalog:
+    def __init__(self, path: str, batch_size: int = 32):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.batch_size = max(1, batch_size)
+        self._pending: List[ConsultationRecord] = []
+        self._pending_lock = threading.Lock()  # buffer only, never held during SQLite I/O
+        self._lock = threading.Lock()  # the connection
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS consultations ("
+            " id INTEGER PRIMARY KEY, created_at REAL NOT NULL,"
+            " clinician_id TEXT NOT NULL, clinician TEXT NOT NULL, patient_id TEXT NOT NULL,"
+            " audio_hash TEXT NOT NULL, audio_path TEXT NOT NULL, transcript_path TEXT NOT NULL,"
+            " report_path TEXT NOT NULL, timings TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_consultations_patient ON consultations(patient_id, created_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_consultations_clinician ON consultations(clinician_id, created_at)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_consultations_audio ON consultations(audio_hash)")
+
+    # ---------------------- writes ----------------------
+
+    def add(self, record: ConsultationRecord) -> None:
+        """Buffer one record; the batch is written once batch_size records are pending."""
+        with self._pending_lock:
+            self._pending.append(record)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every pending record in one transaction; returns how many were written."""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        with span("catalog_flush"):
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                first = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM consultations").fetchone()[0]
+                self._conn.executemany(
+                    f"INSERT INTO consultations ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    [r._row() for r in batch],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                with self._pending_lock:
+                    self._pending[:0] = batch  # keep them for the next flush
+                raise
+        # BEGIN IMMEDIATE holds the write lock, so the batch got consecutive ids
+        for i, r in enumerate(batch, start=first + 1):
+            r.id = i
+        REGISTRY.add_gauge("catalog_records_written_total", len(batch))
+        return len(batch)
+
+    def forget_report(self, record: ConsultationRecord) -> None:
+        """The report file was never stored: clear report_path, whether the record is
+        still buffered (the batch picks it up) or was already written."""
+        with self._lock:
+            record.report_path = ""
+            if record.id is not None:
+                self._conn.execute("UPDATE consultations SET report_path = '' WHERE id = ?", (record.id,))
+
+    # ---------------------- reads ----------------------
+
+    def _select(self, where: str, args: tuple, limit: int) -> List[ConsultationRecord]:
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(_COLUMNS)} FROM consultations WHERE {where}"
+                " ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*args, limit),
+            ).fetchall()
+        return [ConsultationRecord._from_row(r) for r in rows]
+
+    def history(
+        self, patient_id: str, clinician_id: Optional[str] = None, limit: int = 10
+    ) -> List[ConsultationRecord]:
+        """Consultations for a patient, newest first (optionally only one clinician's)."""
+        if clinician_id is None:
+            return self._select("patient_id = ?", (patient_id,), limit)
+        return self._select("patient_id = ? AND clinician_id = ?", (patient_id, str(clinician_id)), limit)
+
+    def latest(self, clinician_id: str) -> Optional[ConsultationRecord]:
+        rows = self._select("clinician_id = ?", (str(clinician_id),), 1)
+        return rows[0] if rows else None
+
+    def get(self, consultation_id: int) -> Optional[ConsultationRecord]:
+        rows = self._select("id = ?", (consultation_id,), 1)
+        return rows[0] if rows else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute("SELECT COUNT(*) FROM consultations").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._flush_locked()
+            finally:
+                self._conn.close()
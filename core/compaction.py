@@ -0,0 +1,183 @@
+# core/compaction.py
+"""
+Transcript compaction before the LLM call.
+
+    result = compact_transcript(text, budget_tokens=4000)
+    result.text, result.tokens_before, result.tokens_after, result.saved
+
+1) Disfluencies: fillers (um, uh, erm, hmm, ...), comma-delimited "you know" /
+   "I mean" / "like" and stuttered function words ("I I think", "a a cough")
+   are removed; repeated content words ("no no", "twice twice") are kept.
+2) Exact repeats: a sentence identical to the one before it is dropped, and so
+   is any later copy of a sentence of 3+ words (short answers such as "Yes."
+   legitimately repeat).
+3) Budget: while the text is above budget_tokens, sentences are dropped by
+   priority — small talk first, then the longest general sentences. Sentences
+   with clinical content (symptoms, drugs, numbers, ...) are never dropped;
+   anything still too long is left to map-reduce.
+
+Line breaks (speaker turns) are kept; only whitespace inside a line is collapsed.
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import List
+
+from core.tokens import count_tokens
+
+# Priorities used by the budget pass (lowest is dropped first)
+SMALL_TALK, GENERAL, CLINICAL = 0, 1, 2
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_FILLER_RE = re.compile(
+    r"(?<![\w'-])(?:u+h+m*|u+m+|e+r+m+|a+h+|h+m+)(?![\w'-])[,.]?\s*", re.IGNORECASE
+)
+_DISCOURSE_RE = re.compile(r",\s*(?:you know|I mean|like)\s*,\s*", re.IGNORECASE)
+# "Doctor:" / "Speaker A:" turn labels are kept but ignored when comparing sentences;
+# only speaker roles count, so "BP:" or "Allergies:" stay part of the sentence
+_SPEAKER_RE = re.compile(
+    r"^((?:Dr\.?|Doctor|Dokter|Physician|Clinician|Nurse|Perawat|Patient|Pasien|Caregiver"
+    r"|Parent|Mother|Father|Family|Interpreter|Speaker)(?: [\w.'-]{1,20})?:)\s+",
+    re.IGNORECASE,
+)
+# stutters of short function words only: "no no" / "twice twice" may be deliberate
+# corrections, and digits are left alone ("10 10" may be a reading)
+_STUTTER_RE = re.compile(
+    r"\b(i|a|an|the|and|but|so|it|it's|i'm|i've|is|was|to|of|in|on|at|my|me|he|she|we|they"
+    r"|you|that|this|have|had|has|do|did)(?:[,\s]+\1\b)+",
+    re.IGNORECASE,
+)
+_SPACES_RE = re.compile(r"[ \t]+")
+_DANGLING_RE = re.compile(r"^[,;\s]+|\s+(?=[,.!?;])|,(?=\s*[,.!?])")
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+_SMALL_TALK_RE = re.compile(
+    r"^(?:(?:so|well|and|oh)\s+)?"
+    r"(?:hi|hello|hey|good (?:morning|afternoon|evening)|thanks?(?: you)?(?: (?:so|very) much)?"
+    r"|you'?re welcome|ok(?:ay)?|alright|all right|right|sure|great|perfect|cool|bye|goodbye"
+    r"|see you(?: soon| later)?|nice to (?:meet|see) you|how are you(?: doing)?(?: today)?"
+    r"|i'?m (?:fine|good|well|ok(?:ay)?)(?: thanks?(?: you)?)?|have a (?:good|nice|great) (?:day|one))"
+    r"(?: (?:doctor|doc))?$"
+)
+_CLINICAL_RE = re.compile(
+    r"\d|\b(?:pain|ache|hurt|sore|fever|cough|nause|vomit|diarrh|constipat|rash|itch|swell|swollen"
+    r"|bleed|blood|dizz|faint|headache|migraine|breath|chest|heart|pressure|sugar|glucose|insulin"
+    r"|allerg|medic|drug|mg|dose|tablet|pill|capsule|inhaler|prescri|antibiot|diagnos|symptom"
+    r"|history|surgery|operat|test|scan|x-ray|xray|ultrasound|lab|pregnan|smok|alcohol|weight"
+    r"|temperature|infect|tired|fatigue|sleep|appetite|urin|stool|numb|tingl|vision|injur|fractur"
+    r"|since|day|week|month|year)",
+    re.IGNORECASE,
+)
+_ANSWER_RE = re.compile(r"^(?:yes|yeah|yep|no|nope|not really|i do|i don'?t|i did|i didn'?t)\b", re.IGNORECASE)
+
+
+@dataclass
+class Compaction:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    trimmed_sentences: int
+
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+@dataclass
+class _Sentence:
+    line: int
+    text: str
+    priority: int
+    speaker: str = ""
+    tokens: int = 0
+    kept: bool = True
+
+
+def remove_disfluencies(sentence: str) -> str:
+    s = _FILLER_RE.sub("", sentence)
+    s = _DISCOURSE_RE.sub(" ", s)
+    s = _STUTTER_RE.sub(r"\1", s)
+    s = _SPACES_RE.sub(" ", s).strip()
+    s = _DANGLING_RE.sub("", s)
+    return s[:1].upper() + s[1:] if s else s
+
+
+def _key(sentence: str) -> str:
+    return " ".join(_WORD_RE.findall(sentence.lower()))
+
+
+def _priority(key: str, sentence: str, previous: int) -> int:
+    if _CLINICAL_RE.search(sentence):
+        return CLINICAL
+    if _ANSWER_RE.match(key) and len(key.split()) <= 4:
+        # a bare yes/no is as important as the question it answers
+        return max(GENERAL, previous)
+    if _SMALL_TALK_RE.match(key):
+        return SMALL_TALK
+    return GENERAL
+
+
+def _sentences(text: str) -> List[_Sentence]:
+    out: List[_Sentence] = []
+    seen = set()
+    last_key = None
+    previous = GENERAL
+    for line_no, line in enumerate(text.splitlines()):
+        line = line.strip()
+        m = _SPEAKER_RE.match(line)
+        if m:
+            line = line[m.end():]
+        for raw in _SENTENCE_RE.split(line):
+            sentence = remove_disfluencies(raw)
+            key = _key(sentence)
+            if not key:
+                continue
+            if key == last_key or (key in seen and len(key.split()) >= 3):
+                continue
+            seen.add(key)
+            last_key = key
+            previous = _priority(key, sentence, previous)
+            out.append(_Sentence(line_no, sentence, previous, m.group(1) if m else ""))
+    return out
+
+
+def _join(sentences: List[_Sentence]) -> str:
+    lines: List[str] = []
+    current = None
+    for s in sentences:
+        if not s.kept:
+            continue
+        if s.line != current:
+            lines.append(f"{s.speaker} {s.text}" if s.speaker else s.text)
+            current = s.line
+        else:
+            lines[-1] += " " + s.text
+    return "\n".join(lines)
+
+
+def compact_transcript(text: str, budget_tokens: int = 0) -> Compaction:
+    """Clean `text` and, when budget_tokens > 0, trim it towards that many tokens."""
+    before = count_tokens(text)
+    sentences = _sentences(text)
+    compacted = _join(sentences)
+    after = count_tokens(compacted)
+
+    if budget_tokens > 0 and after > budget_tokens:
+        for s in sentences:
+            s.tokens = count_tokens(s.text) + 1
+        # lowest priority first; within a priority, longest first (fewest cuts)
+        droppable = sorted(
+            (s for s in sentences if s.priority < CLINICAL),
+            key=lambda s: (s.priority, -s.tokens),
+        )
+        estimate = after
+        for s in droppable:
+            if estimate <= budget_tokens:
+                break
+            s.kept = False
+            estimate -= s.tokens
+        compacted = _join(sentences)
+        after = count_tokens(compacted)
+
+    trimmed = sum(1 for s in sentences if not s.kept)
+    return Compaction(compacted, before, after, trimmed)
@@ -0,0 +1,368 @@
+# core/docx_renderer.py
+"""
+DOCX rendering for consultation reports (python-docx / lxml only, no bot imports),
+so it can run in worker processes as well as in the cog.
+"""
+import io
+import os
+import re
+import copy
+import threading
+from datetime import datetime
+from typing import Optional, Union
+from docx import Document
+from docx.shared import Pt, Cm
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from core.report import (
+    SECTIONS, SECTION_ALIASES, Report, canonical_header, looks_like_patient_info, parse_report, strip_bullet,
+)
+
+# ---------- style helpers ----------
+
+def _set_page_margins(doc: Document, cm=2.0):
+    for section in doc.sections:
+        section.top_margin = Cm(cm)
+        section.bottom_margin = Cm(cm)
+        section.left_margin = Cm(cm)
+        section.right_margin = Cm(cm)
+
+
+def _set_global_font(doc: Document, name="Times New Roman", size=12):
+    style = doc.styles["Normal"]
+    style.font.name = name
+    style.font.size = Pt(size)
+    if style.paragraph_format.line_spacing is None:
+        style.paragraph_format.line_spacing = 1.15
+    style.paragraph_format.space_after = Pt(4)
+    style.paragraph_format.space_before = Pt(0)
+
+
+def _set_cell_borders(cell, top="single", left="single", bottom="single", right="single", sz=12, color="000000"):
+    """Set border untuk sebuah cell tabel."""
+    tc = cell._tc
+    tcPr = tc.get_or_add_tcPr()
+    tcBorders = tcPr.first_child_found_in("w:tcBorders")
+    if tcBorders is None:
+        tcBorders = OxmlElement('w:tcBorders')
+        tcPr.append(tcBorders)
+
+    def _edge(tag, val):
+        el = tcBorders.find(qn(f"w:{tag}"))
+        if el is None:
+            el = OxmlElement(f"w:{tag}")
+            tcBorders.append(el)
+        el.set(qn("w:val"), val)
+        el.set(qn("w:sz"), str(sz))
+        el.set(qn("w:color"), color)
+
+    if top: _edge("top", top)
+    if left: _edge("left", left)
+    if bottom: _edge("bottom", bottom)
+    if right: _edge("right", right)
+
+
+def _shade_cell(cell, fill="EDEDED"):
+    """Shading halus pada cell header (hex tanpa #)."""
+    tc = cell._tc
+    tcPr = tc.get_or_add_tcPr()
+    shd = OxmlElement('w:shd')
+    shd.set(qn('w:val'), 'clear')
+    shd.set(qn('w:color'), 'auto')
+    shd.set(qn('w:fill'), fill)
+    tcPr.append(shd)
+
+
+def _add_title(doc: Document, text: str):
+    p = doc.add_paragraph()
+    r = p.add_run(text)
+    r.bold = True
+    r.font.size = Pt(18)
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+
+def _add_section_box(doc: Document, title: str, lines: int = 6, page_width_cm: float = 16.0):
+    """
+   Create a box with a bold title at the top and lines for writing.
+It is made using a single-column table: the first row is the header (with shading), and the remaining rows have bottom borders (for writing lines).
+    """
+    table = doc.add_table(rows=1 + lines, cols=1)
+    table.autofit = False
+    for row in table.rows:
+        row.cells[0].width = Cm(page_width_cm)
+
+    # Header
+    hdr = table.cell(0, 0)
+    _set_cell_borders(hdr, top="single", left="single", bottom="single", right="single", sz=16)
+    _shade_cell(hdr)
+    p = hdr.paragraphs[0]
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    p.paragraph_format.space_after = Pt(2)
+    run = p.add_run(title)
+    run.bold = True
+    run.font.size = Pt(12)
+
+    # Garis isi
+    for i in range(1, 1 + lines):
+        c = table.cell(i, 0)
+        _set_cell_borders(
+            c,
+            top="nil",
+            left="single",
+            bottom="single",
+            right="single",
+            sz=8
+        )
+        c.paragraphs[0].paragraph_format.space_after = Pt(0)
+        c.paragraphs[0].add_run(" ")
+
+    doc.add_paragraph().paragraph_format.space_after = Pt(8)
+
+
+def _add_report_section_table(doc: Document, title: str, lines: list[str],
+                              min_rows: int = 6, page_width_cm: float = 16.0):
+    """A section box containing a header and rows with bottom borders."""
+    total_rows = max(min_rows, max(1, len(lines)))
+    table = doc.add_table(rows=1 + total_rows, cols=1)
+    table.autofit = False
+    for row in table.rows:
+        row.cells[0].width = Cm(page_width_cm)
+
+    # Header
+    hdr = table.cell(0, 0)
+    _set_cell_borders(hdr, top="single", left="single", bottom="single", right="single", sz=16)
+    _shade_cell(hdr)
+    p = hdr.paragraphs[0]
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    p.paragraph_format.space_after = Pt(2)
+    run = p.add_run(title)
+    run.bold = True
+    run.font.size = Pt(12)
+
+    # Rows (garis bawah)
+    for i in range(total_rows):
+        c = table.cell(1 + i, 0)
+        _set_cell_borders(c, top="nil", left="single", bottom="single", right="single", sz=8)
+        para = c.paragraphs[0]
+        para.paragraph_format.space_after = Pt(0)
+        if i < len(lines) and lines[i]:
+            para.add_run(strip_bullet(lines[i]))
+        else:
+            para.add_run(" ")
+
+    doc.add_paragraph().paragraph_format.space_after = Pt(8)
+
+# ---------------------- template generator ----------------------
+
+
+def save_consultation_template_with_boxes(path: str):
+    """Create a .docx template file with outlines/boxes for each section."""
+    doc = Document()
+    _set_page_margins(doc, cm=2.0)
+    _set_global_font(doc, size=12)
+
+    _add_title(doc, "Medical Consultation Report")
+    doc.add_paragraph()
+
+    for name, nlines in REPORT_MIN_ROWS.items():
+        _add_section_box(doc, name, lines=nlines)
+
+    p = doc.add_paragraph()
+    r = p.add_run(
+        "Note: This document is generated from a clinician–patient consultation. "
+        "It is intended for clinical use only and may contain transcription or inference errors."
+    )
+    r.italic = True
+    r.font.size = Pt(10)
+
+    doc.save(path)
+
+# ---------------------- DOCX Renderer ----------------------
+
+
+def _looks_like_patient_info(line: str) -> bool:
+    """A filter to prevent model content containing patient identity information from being rewritten in the body."""
+    return looks_like_patient_info(line)
+
+
+def _add_divider(doc: Document):
+    p = doc.add_paragraph()
+    run = p.add_run("\u2500" * 60)  # garis tipis
+    run.font.size = Pt(8)
+
+# ---- robust section header matching (alias table in core.report) ----
+
+def _canonical_section(line: str, sections: list[str] = SECTIONS) -> str | None:
+    """Return the canonical section name if the line matches the header."""
+    section = canonical_header(line.strip()) if line else None
+    return section if section in sections else None
+
+
+# ---- prebuilt report template (built once, cloned per report) ----
+
+# Section order (core.report.SECTIONS) + minimum number of ruled rows in each box
+REPORT_MIN_ROWS = {
+    "Symptoms": 6,
+    "Diagnosis": 4,
+    "Prescription / Treatment Plan": 8,
+    "Doctor's Notes": 6,
+    "Assessment": 4,
+    "Plan": 5,
+    "Red Flags": 4,
+    "Disclaimer": 3,
+}
+_HEADER_PARAGRAPH_INDEX = 2  # title, blank line, header
+_TEMPLATE_LOCK = threading.Lock()
+_TEMPLATE_BYTES: bytes | None = None
+_TEMPLATE_LOCAL = threading.local()
+
+
+def _build_report_template() -> bytes:
+    """Full report layout with empty rows: margins, fonts, borders and shading set once."""
+    doc = Document()
+    _set_page_margins(doc, cm=2.0)
+    _set_global_font(doc, size=12)
+
+    # Title
+    _add_title(doc, "Medical Consultation Report")
+    doc.add_paragraph()
+
+    # Header info (patient + date), filled per report
+    header = doc.add_paragraph()
+    header.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    for label in ("Patient Name", "Patient ID", "Date of Consultation", "Generated by"):
+        header.add_run(f"{label}: \n")
+
+    _add_divider(doc)
+
+    for s, min_rows in REPORT_MIN_ROWS.items():
+        _add_report_section_table(doc, s, [], min_rows=min_rows)
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def report_template_bytes() -> bytes:
+    """The serialized base template, built on first use and cached in memory."""
+    global _TEMPLATE_BYTES
+    if _TEMPLATE_BYTES is None:
+        with _TEMPLATE_LOCK:
+            if _TEMPLATE_BYTES is None:
+                _TEMPLATE_BYTES = _build_report_template()
+    return _TEMPLATE_BYTES
+
+
+def _fresh_report_document() -> Document:
+    """
+    Per-thread template Document whose body is reset to a deep copy of the pristine
+    template body, so each report skips both package parsing and table building.
+    """
+    state = _TEMPLATE_LOCAL
+    if getattr(state, "doc", None) is None:
+        state.doc = Document(io.BytesIO(report_template_bytes()))
+        state.pristine = copy.deepcopy(state.doc.element.body)
+    body = state.doc.element.body
+    for child in list(body):
+        body.remove(child)
+    body.extend(copy.deepcopy(child) for child in state.pristine)
+    return state.doc
+
+
+def _fill_section_table(table, lines: list[str]):
+    """Write lines into the template rows, cloning the last ruled row when more are needed."""
+    tbl = table._tbl
+    rows = tbl.tr_lst
+    for _ in range(len(lines) - (len(rows) - 1)):
+        tbl.append(copy.deepcopy(rows[-1]))
+    rows = tbl.tr_lst
+    for i, line in enumerate(lines):
+        if not line:
+            continue
+        run = rows[1 + i].tc_lst[0].p_lst[0].r_lst[0]
+        run.text = strip_bullet(line)
+
+
+_REPORT_DATE_RE = re.compile(r"(\d{8})_\d{6}")
+
+
+def _consultation_date(name: str, consulted_at: Optional[datetime] = None) -> str:
+    if consulted_at is not None:
+        return consulted_at.strftime("%d %B %Y")
+    # Extract date from filename if possible (…_YYYYMMDD_HHMMSS_…)
+    m = _REPORT_DATE_RE.search(name)
+    if m:
+        raw = m.group(1)
+        try:
+            return datetime.strptime(raw, "%Y%m%d").strftime("%d %B %Y")
+        except ValueError:
+            return "[Date not available]"
+    return "[Date not available]"
+
+
+def _render_report_document(
+    report: Union[str, Report],
+    consultation_date: str,
+    author_name: str,
+    patient_name: str,
+    patient_id: str,
+) -> Document:
+    # Text is parsed here only when the caller did not already hand us a Report
+    if not isinstance(report, Report):
+        report = parse_report(report)
+
+    # Clone the prebuilt template and fill only the cell text
+    doc = _fresh_report_document()
+
+    header = doc.paragraphs[_HEADER_PARAGRAPH_INDEX]
+    for run, text in zip(header.runs, (
+        f"Patient Name: {patient_name}\n",
+        f"Patient ID: {patient_id}\n",
+        f"Date of Consultation: {consultation_date}\n",
+        f"Generated by: {author_name}\n",
+    )):
+        run.text = text
+
+    for table, s in zip(doc.tables, REPORT_MIN_ROWS):
+        _fill_section_table(table, report.lines(s))
+    return doc
+
+
+def save_tidy_docx(
+    report_text: Union[str, Report],
+    report_path: str,
+    author_name: str = "Unknown",
+    patient_name: str = "Unknown",
+    patient_id: str = "Unknown",
+    consulted_at: Optional[datetime] = None,
+):
+    """
+  Generate a clean, professional medical report in Times New Roman (.docx).
+ -Inserts the patient's Name and ID only at the top (without duplication in the body).
+ -Uses consulted_at as the consultation date, else detects it from the filename (YYYYMMDD).
+ -BODY: each section is rendered as a bordered box like a form.
+ -report_text may be raw/normalized text or an already parsed core.report.Report.
+    """
+    consultation_date = _consultation_date(report_path, consulted_at)
+    doc = _render_report_document(report_text, consultation_date, author_name, patient_name, patient_id)
+    parent = os.path.dirname(report_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    doc.save(report_path)
+
+
+def render_tidy_docx_bytes(
+    report_text: Union[str, Report],
+    report_name: str,
+    author_name: str = "Unknown",
+    patient_name: str = "Unknown",
+    patient_id: str = "Unknown",
+    consulted_at: Optional[datetime] = None,
+) -> bytes:
+    """Same document as save_tidy_docx, returned as bytes (date from consulted_at or report_name)."""
+    consultation_date = _consultation_date(report_name, consulted_at)
+    doc = _render_report_document(report_text, consultation_date, author_name, patient_name, patient_id)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
@@ -0,0 +1,86 @@
+# core/download.py
+"""
+Streaming attachment download: fixed-size chunks to a temp file, atomic rename
+on success, hard size cap, and throughput reporting. Disk writes are batched
+(up to write_batch bytes) and run in a thread, so the event loop never waits on
+the disk. The content hash (same xxh3-128 as
+core.transcript_cache.hash_audio_file) is computed while streaming; pass it to
+speech_to_text.atranscribe_audio(audio_hash=...) so the file is not re-read.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+import aiohttp
+import xxhash
+
+
+class DownloadError(Exception):
+    """Raised when the remote file cannot be fetched."""
+
+
+class DownloadTooLarge(DownloadError):
+    """Raised when the remote file exceeds the configured size cap."""
+
+
+@dataclass
+class DownloadStats:
+    path: str
+    bytes: int
+    seconds: float
+    xxh3: str = ""
+
+    @property
+    def mb_per_s(self) -> float:
+        return (self.bytes / (1024 * 1024)) / self.seconds if self.seconds > 0 else 0.0
+
+
+async def stream_download(
+    session: aiohttp.ClientSession,
+    url: str,
+    dest_path: str,
+    max_bytes: int,
+    chunk_size: int = 256 * 1024,
+    write_batch: int = 1024 * 1024,
+) -> DownloadStats:
+    """Download `url` into `dest_path` without buffering the whole body in memory."""
+    part_path = f"{dest_path}.part"
+    parent = os.path.dirname(dest_path)
+    if parent:
+        await asyncio.to_thread(os.makedirs, parent, exist_ok=True)
+    started = time.perf_counter()
+    written = 0
+    digest = xxhash.xxh3_128()
+    try:
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                raise DownloadError(f"HTTP {resp.status} while downloading attachment")
+            if resp.content_length is not None and resp.content_length > max_bytes:
+                raise DownloadTooLarge(
+                    f"file is {resp.content_length} bytes, limit is {max_bytes} bytes"
+                )
+            f = await asyncio.to_thread(open, part_path, "wb")
+            try:
+                pending = bytearray()
+                async for chunk in resp.content.iter_chunked(chunk_size):
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise DownloadTooLarge(f"file exceeds the {max_bytes} byte limit")
+                    digest.update(chunk)
+                    pending += chunk
+                    if len(pending) >= write_batch:
+                        await asyncio.to_thread(f.write, bytes(pending))
+                        pending.clear()
+                if pending:
+                    await asyncio.to_thread(f.write, bytes(pending))
+            finally:
+                await asyncio.to_thread(f.close)
+        await asyncio.to_thread(os.replace, part_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(part_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return DownloadStats(dest_path, written, time.perf_counter() - started, digest.hexdigest())
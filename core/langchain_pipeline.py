@@ -1,31 +1,54 @@
 # core/langchain_pipeline.py (cleaner structure for DOCX rendering + more tolerant header regex)
 from __future__ import annotations
 import re
-from typing import List
-from config.settings import OPENROUTER_API_KEY
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-
-# Target sections expected by the DOCX renderer
-SECTIONS: List[str] = [
-    "Symptoms",
-    "Diagnosis",
-    "Prescription / Treatment Plan",
-    "Doctor's Notes",
-    "Assessment",
-    "Plan",
-    "Red Flags",
-    "Disclaimer",
-]
-
-_CENSOR_PATTERNS = [
-    r"^\s*(patient\s*name|nama\s*pasien)\s*[:=].*$",
-    r"^\s*(patient\s*id|id\s*pasien|mrn|rekam\s*medis)\s*[:=].*$",
-    r"^\s*(dob|tanggal\s*lahir|age|umur)\s*[:=].*$",
-    r"^\s*(date\s*of\s*consultation|tanggal\s*konsultasi)\s*[:=].*$",
-    r"^\s*(alamat|address|phone|telepon)\s*[:=].*$",
-]
+import asyncio
+import contextlib
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
+from config.settings import (
+    OPENROUTER_API_KEY,
+    LLM_MODEL,
+    LLM_BASE_URL,
+    LLM_TEMPERATURE,
+    LLM_OUTPUT_FORMAT,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_MAX_KEEPALIVE,
+    LLM_POOL_KEEPALIVE_EXPIRY,
+    LLM_TIMEOUT,
+    LLM_ROUTES,
+    LLM_RETRY_ATTEMPTS,
+    LLM_RETRY_BACKOFF_BASE,
+    LLM_RETRY_BACKOFF_MAX,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_SECONDS,
+    LLM_HEDGE_AFTER_SECONDS,
+    REPORT_CACHE_BACKEND,
+    REPORT_CACHE_PATH,
+    REPORT_CACHE_MAX_ENTRIES,
+    MAP_REDUCE_THRESHOLD_TOKENS,
+    MAP_REDUCE_CHUNK_TOKENS,
+    MAP_REDUCE_CONCURRENCY,
+    TRANSCRIPT_COMPACTION_ENABLED,
+    TRANSCRIPT_TOKEN_BUDGET,
+)
+import xxhash
+from core.report_cache import ReportCache, make_report_cache, make_report_key
+from core.tokens import count_tokens, split_by_tokens
+from core.metrics import REGISTRY, span
+from core.compaction import compact_transcript
+from core.llm_router import Endpoint, LLMRouter, parse_routes
+# SECTIONS: target sections expected by the DOCX renderer
+from core.report import (
+    SECTIONS, CENSOR_PATTERNS as _CENSOR_PATTERNS, PLACEHOLDER as _PLACEHOLDER,
+    Report, ReportBuilder, looks_like_patient_info, parse_report, strip_tokens,
+)
+from core.normalizer import StreamingNormalizer
+
+log = logging.getLogger(__name__)
 
 def _strip_markdown(text: str) -> str:
     """Remove Markdown artifacts (#, **, code fences) and trim whitespace."""
@@ -44,89 +67,68 @@ def _strip_llm_special_tokens(text: str) -> str:
       - optional leading/trailing dots and spaces around the token
       - <think> ... </think> wrappers (defensive)
     """
-    # Remove tokens enclosed by <|...|> or <｜...｜>, allow any inner text (non-greedy)
-    text = re.sub(r"[.\s]*<\s*[|｜]\s*[^|｜>]+?\s*[|｜]\s*>[.\s]*", "", text)
-    # Remove <think> wrappers if a model emits them
-    text = re.sub(r"</?think>", "", text, flags=re.IGNORECASE)
-    return text
+    return strip_tokens(text)
 
 def _censor_patient_lines(text: str) -> str:
     lines = [ln.rstrip() for ln in text.splitlines()]
-    kept = []
-    for ln in lines:
-        if any(re.search(p, ln, flags=re.IGNORECASE) for p in _CENSOR_PATTERNS):
-            continue
-        kept.append(ln)
-    return "\n".join(kept).strip()
+    return "\n".join(ln for ln in lines if not looks_like_patient_info(ln)).strip()
 
 def _ensure_section_order(text: str) -> str:
     """Best-effort normalize to our exact section headers and order.
     If a section is missing, insert a placeholder line.
+    (Header aliases and bullet cleanup as in core.report; no censoring.)
     """
-    # Build tolerant pattern for exact headers (allow trailing colon and flexible ' / ')
-    def _pattern_for(h: str) -> str:
-        # escape then relax the slash spacing
-        pat = re.escape(h)
-        pat = pat.replace(r"\ /\/\ ", r"\s*/\s*").replace(r"\/", r"\s*/\s*")
-        return pat
-
-    header_re = re.compile(
-        r"^(%s)\s*:?\s*$" % "|".join([_pattern_for(s) for s in SECTIONS]),
-        re.IGNORECASE
-    )
+    return ReportBuilder(censor=False).extend(text.splitlines()).build().to_text()
 
-    current = None
-    buckets = {s: [] for s in SECTIONS}
-
-    for raw in text.splitlines():
-        # NEW: strip special tokens BEFORE matching headers / collecting lines
-        line = _strip_llm_special_tokens(raw.strip())
-        if not line:
-            continue
-        m = header_re.match(line)
-        if m:
-            # canonical header case
-            target = m.group(1)
-            canonical = next(s for s in SECTIONS if re.fullmatch(_pattern_for(s), target, flags=re.IGNORECASE))
-            current = canonical
-            continue
-        if current is None:
-            current = "Doctor's Notes"
-        buckets[current].append(line)
-
-    # Compose output
-    out_lines: List[str] = []
-    for s in SECTIONS:
-        out_lines.append(s)
-        content = buckets.get(s) or []
-        if not content:
-            out_lines.append("- None reported.")
-        else:
-            for ln in content:
-                # NEW: per-line cleanup too (defensive)
-                ln = _strip_llm_special_tokens(ln)
-                if re.match(r"^[\-•]\s+", ln):
-                    ln = re.sub(r"^[\-•]\s+", "- ", ln)
-                out_lines.append(ln)
-        out_lines.append("")
-    return "\n".join(out_lines).strip() + "\n"
+# ---------------------- prompt + client registry ----------------------
+
+# LangChain / OpenAI take ~1s to import, so they load on first use (or in the cog's
+# warm-up task) instead of at import time. Tests swap ChatOpenAI for a fake.
+ChatOpenAI = None  # langchain_openai.ChatOpenAI once loaded
+
+
+def _chat_openai_class():
+    global ChatOpenAI
+    if ChatOpenAI is None:
+        from langchain_openai import ChatOpenAI as cls
+        ChatOpenAI = cls
+    return ChatOpenAI
+
+
+class _Lazy:
+    """Build `factory()` on first attribute access, then delegate to it."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._obj = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return self._obj
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
 
-def generate_medical_report(transcribed_text: str) -> str:
-    """
-    Takes doctor–patient consultation text and generates
-    a structured medical report using DeepSeek via OpenRouter API,
-    formatted to be DOCX-friendly (no Markdown symbols) and aligned with our renderer.
-    """
-    llm = ChatOpenAI(
-        model="deepseek/deepseek-chat-v3.1:free",
-        api_key=OPENROUTER_API_KEY,
-        base_url="https://openrouter.ai/api/v1",
-        temperature=0.2,
-    )
 
-    # IMPORTANT: exact headers (no markdown), concise hyphen bullets, no patient identifiers
-    prompt_template = ChatPromptTemplate.from_template(
-        """
+def _prompt(template: str):
+    def build():
+        from langchain_core.prompts import ChatPromptTemplate
+        return ChatPromptTemplate.from_template(template)
+    return _Lazy(build)
+
+
+def _str_output_parser():
+    from langchain_core.output_parsers import StrOutputParser
+    return StrOutputParser()
+
+
+# IMPORTANT: exact headers (no markdown), concise hyphen bullets, no patient identifiers
+# Built once (on first use); every call only formats messages.
+_REPORT_TEMPLATE = """
         You are a professional medical scribe. Convert the doctor–patient consultation
         into a concise, objective medical report. Follow these STRICT rules:
 
@@ -146,17 +148,516 @@ def generate_medical_report(transcribed_text: str) -> str:
 
         Transcript:
         {transcript}
-        """
+    """
+_REPORT_PROMPT = _prompt(_REPORT_TEMPLATE)
+
+# Map step of map-reduce mode: one chunk of a long transcript → the same eight sections
+_MAP_TEMPLATE = """
+    You are a professional medical scribe. Below is PART {part} of {total} of a longer
+    doctor–patient consultation. Extract only what THIS part states. Follow these STRICT rules:
+
+    1) Output PLAIN TEXT only. Do NOT use Markdown (#, **, bullets like •). Bullets MUST be hyphens: "- ".
+    2) Use EXACTLY these section headers, each on its own line (no colon, no numbering):
+       Symptoms
+       Diagnosis
+       Prescription / Treatment Plan
+       Doctor's Notes
+       Assessment
+       Plan
+       Red Flags
+       Disclaimer
+    3) Under each header write short hyphen bullets. Write "- None reported." if this part says nothing about it.
+    4) DO NOT include patient identifiers (name, ID/MRN, DOB/age, phone, address) or dates.
+
+    Transcript part:
+    {transcript}
+    """
+_MAP_PROMPT = _prompt(_MAP_TEMPLATE)
+
+# LLM_OUTPUT_FORMAT=json: same content rules, returned as one JSON object keyed by
+# core.report.SECTION_SLOTS (parsed in core.structured_output)
+_JSON_REPORT_TEMPLATE = """
+        You are a professional medical scribe. Convert the doctor–patient consultation
+        into a concise, objective medical report. Follow these STRICT rules:
+
+        1) Output ONE JSON object only. No Markdown, no code fences, no text before or after it.
+        2) Use EXACTLY these keys, each an array of short strings (no bullet characters):
+           "symptoms", "diagnosis", "treatment_plan", "doctors_notes",
+           "assessment", "plan", "red_flags", "disclaimer"
+        3) Give 1–8 items per key, or an empty array when the consultation says nothing about it.
+           Keep it clinical and verifiable.
+        4) DO NOT include patient identifiers (name, ID/MRN, DOB/age, phone, address) or dates.
+        5) "disclaimer" must hold a single line about potential transcription errors and for clinical use only.
+
+        Transcript:
+        {transcript}
+    """
+_JSON_REPORT_PROMPT = _prompt(_JSON_REPORT_TEMPLATE)
+_OUTPUT_PARSER = _Lazy(_str_output_parser)
+
+
+def warm_up() -> None:
+    """Import LangChain/OpenAI and build the prompts now (called off the event loop)."""
+    _chat_openai_class()
+    _REPORT_PROMPT._get()
+    _MAP_PROMPT._get()
+    _OUTPUT_PARSER._get()
+    if _json_output():
+        _JSON_REPORT_PROMPT._get()
+        import core.structured_output  # noqa: F401  (orjson + pydantic)
+
+
+def _json_output() -> bool:
+    return LLM_OUTPUT_FORMAT == "json"
+
+
+# Bump when _reduce_sections merges map-step outputs differently (it is code, not a prompt)
+_REDUCE_VERSION = "2"
+
+def _prompt_version() -> str:
+    """Hash of everything that shapes a report besides the model: the text prompt
+    (also the JSON-mode fallback), the JSON prompt when active, and for long
+    transcripts the map prompt, the chunking and the reduce step."""
+    parts = (
+        _JSON_REPORT_TEMPLATE if _json_output() else "",
+        _REPORT_TEMPLATE,
+        _MAP_TEMPLATE,
+        f"map-reduce:{MAP_REDUCE_THRESHOLD_TOKENS}:{MAP_REDUCE_CHUNK_TOKENS}:{_REDUCE_VERSION}",
+    )
+    return xxhash.xxh3_64("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+# Changes whenever any of those change, so cached reports never outlive their prompts
+PROMPT_VERSION = _prompt_version()
+
+# Optional memoization of normalized reports (REPORT_CACHE_BACKEND)
+REPORT_CACHE: Optional[ReportCache] = make_report_cache(
+    REPORT_CACHE_BACKEND, REPORT_CACHE_PATH, REPORT_CACHE_MAX_ENTRIES
+)
+
+# { (model, base_url, temperature): ChatOpenAI }
+_LLM_CLIENTS: Dict[Tuple[str, str, float], ChatOpenAI] = {}
+_LLM_CLIENTS_LOCK = threading.Lock()
+_HTTP_CLIENT: Optional[httpx.Client] = None
+_ASYNC_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _shared_http_client() -> httpx.Client:
+    """Keep-alive connection pool shared by every registered LLM client.
+    Caller must hold _LLM_CLIENTS_LOCK."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.Client(limits=_http_limits(), timeout=LLM_TIMEOUT)
+    return _HTTP_CLIENT
+
+
+def _shared_async_http_client() -> httpx.AsyncClient:
+    """Async twin of _shared_http_client, used by ainvoke on the bot loop."""
+    global _ASYNC_HTTP_CLIENT
+    if _ASYNC_HTTP_CLIENT is None or _ASYNC_HTTP_CLIENT.is_closed:
+        _ASYNC_HTTP_CLIENT = httpx.AsyncClient(limits=_http_limits(), timeout=LLM_TIMEOUT)
+    return _ASYNC_HTTP_CLIENT
+
+
+def get_llm(
+    model: str = LLM_MODEL,
+    base_url: str = LLM_BASE_URL,
+    temperature: float = LLM_TEMPERATURE,
+    api_key: Optional[str] = None,
+) -> ChatOpenAI:
+    """Return the pooled ChatOpenAI client for (model, base_url, temperature, api key),
+    creating it on first use so TLS connections are reused across reports.
+    Retries are left to the router (max_retries=0)."""
+    api_key = api_key or OPENROUTER_API_KEY
+    # routes may share model + base URL but not the key; keyed by a hash, not the secret
+    key = (model, base_url, float(temperature), xxhash.xxh3_64_hexdigest((api_key or "").encode("utf-8")))
+    llm = _LLM_CLIENTS.get(key)
+    if llm is not None:
+        return llm
+    with _LLM_CLIENTS_LOCK:
+        llm = _LLM_CLIENTS.get(key)
+        if llm is None:
+            llm = _chat_openai_class()(
+                model=model,
+                api_key=api_key,
+                base_url=base_url,
+                temperature=temperature,
+                max_retries=0,
+                http_client=_shared_http_client(),
+                http_async_client=_shared_async_http_client(),
+            )
+            _LLM_CLIENTS[key] = llm
+    return llm
+
+
+_ROUTER: Optional[LLMRouter] = None
+
+
+def _client_for(ep: Endpoint) -> ChatOpenAI:
+    return get_llm(ep.model, ep.base_url, LLM_TEMPERATURE, api_key=ep.api_key)
+
+
+def get_router() -> LLMRouter:
+    """The configured LLM_ROUTES behind failover / retry / breakers / hedging.
+    Same invoke/ainvoke/astream surface as ChatOpenAI."""
+    global _ROUTER
+    if _ROUTER is None:
+        _ROUTER = LLMRouter(
+            parse_routes(LLM_ROUTES, LLM_BASE_URL, OPENROUTER_API_KEY),
+            client_for=_client_for,
+            retry_attempts=LLM_RETRY_ATTEMPTS,
+            backoff_base_s=LLM_RETRY_BACKOFF_BASE,
+            backoff_max_s=LLM_RETRY_BACKOFF_MAX,
+            breaker_failures=LLM_BREAKER_FAILURES,
+            breaker_reset_s=LLM_BREAKER_RESET_SECONDS,
+            hedge_after_s=LLM_HEDGE_AFTER_SECONDS,
+        )
+    return _ROUTER
+
+
+def close_llm_clients() -> None:
+    """Drop every registered client and close the shared sync connection pool.
+    The async pool is closed by aclose_llm_clients()."""
+    global _HTTP_CLIENT
+    with _LLM_CLIENTS_LOCK:
+        _LLM_CLIENTS.clear()
+        if _HTTP_CLIENT is not None:
+            _HTTP_CLIENT.close()
+            _HTTP_CLIENT = None
+
+
+async def aclose_llm_clients() -> None:
+    global _ASYNC_HTTP_CLIENT
+    close_llm_clients()
+    if _ASYNC_HTTP_CLIENT is not None:
+        await _ASYNC_HTTP_CLIENT.aclose()
+        _ASYNC_HTTP_CLIENT = None
+
+
+def _parse_report(raw: str) -> Report:
+    """Parse raw LLM text once into the Report the DOCX renderer consumes."""
+    with span("normalize"):
+        return parse_report(raw)
+
+
+def _normalize_report(raw: str) -> str:
+    """Normalize raw LLM text to the exact structure the DOCX renderer expects.
+    Byte-identical to _strip_markdown → _strip_llm_special_tokens → _censor_patient_lines
+    → _ensure_section_order, done in a single precompiled pass."""
+    return _parse_report(raw).to_text()
+
+
+def _compact(transcribed_text: str) -> str:
+    """Pre-LLM compaction (core.compaction); logs and counts the tokens saved."""
+    if not TRANSCRIPT_COMPACTION_ENABLED:
+        return transcribed_text
+    with span("compact"):
+        result = compact_transcript(transcribed_text, TRANSCRIPT_TOKEN_BUDGET)
+    if not result.text:
+        return transcribed_text  # nothing but small talk: let the model see it as is
+    REGISTRY.add_gauge("transcript_tokens_in_total", result.tokens_before)
+    REGISTRY.add_gauge("transcript_tokens_saved_total", result.saved)
+    log.info(
+        "transcript compacted: %d -> %d tokens (%d saved, %d sentences trimmed)",
+        result.tokens_before, result.tokens_after, result.saved, result.trimmed_sentences,
     )
+    return result.text
+
+
+def _report_cache_key(transcribed_text: str) -> str:
+    """Keyed on the whole route chain (model@base_url each), so editing LLM_ROUTES
+    never serves reports another model wrote; answers from a fallback route are
+    not stored at all (see _track_fallbacks)."""
+    routes = getattr(get_router(), "routes", None)
+    models = ",".join(ep.name for ep in routes) if routes else LLM_MODEL
+    return make_report_key(transcribed_text, models, PROMPT_VERSION, LLM_TEMPERATURE)
+
+
+# Routes that answered with a fallback model during the current report (see _answered)
+_FALLBACK_ROUTES: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar(
+    "fallback_routes", default=None
+)
+
+
+@contextlib.contextmanager
+def _track_fallbacks():
+    """Collect the fallback routes used while building one report. The cache is
+    keyed on LLM_MODEL, so a report any fallback model contributed to is not stored."""
+    routes: List[str] = []
+    token = _FALLBACK_ROUTES.set(routes)
+    try:
+        yield routes
+    finally:
+        _FALLBACK_ROUTES.reset(token)
+
+
+def _answered(message):
+    """Note a response (or streamed chunk) the router tagged as served by a fallback model."""
+    metadata = getattr(message, "response_metadata", None)
+    routes = _FALLBACK_ROUTES.get()
+    if routes is not None and isinstance(metadata, dict) and metadata.get("llm_fallback"):
+        routes.append(metadata.get("llm_route", ""))
+    return message
+
+
+# ---------------------- map-reduce mode (long transcripts) ----------------------
+
+
+def _needs_map_reduce(transcribed_text: str) -> bool:
+    return count_tokens(transcribed_text) > MAP_REDUCE_THRESHOLD_TOKENS
+
+
+def _map_messages(transcribed_text: str):
+    chunks = split_by_tokens(transcribed_text, MAP_REDUCE_CHUNK_TOKENS)
+    return [
+        _MAP_PROMPT.format_messages(part=i + 1, total=len(chunks), transcript=chunk)
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def _line_key(line: str) -> str:
+    """Comparison key for merged lines: case, bullets and punctuation ignored, padded
+    so containment checks only match whole words."""
+    return f" {_NON_WORD_RE.sub(' ', line.lower()).strip()} "
+
+
+def _reduce_sections(partials: List[Report]) -> Report:
+    """Merge per-chunk reports section by section (order kept, placeholders dropped).
+    Lines that differ only in case, bullets or punctuation count as duplicates, and
+    a line whose words are contained in a longer one is replaced by that longer
+    line. Every chunk writes its own Disclaimer, so only the first one is kept."""
+    merged: Dict[str, List[str]] = {s: [] for s in SECTIONS}
+    for s in SECTIONS:
+        keys: List[str] = []
+        for report in partials:
+            for line in report[s]:
+                key = _line_key(line)
+                if line == _PLACEHOLDER or not key.strip() or any(key in k for k in keys):
+                    continue
+                shorter = [i for i, k in enumerate(keys) if k in key]
+                if shorter:
+                    # keep the fuller line where the first shorter one was
+                    first = shorter[0]
+                    merged[s][first], keys[first] = line, key
+                    for i in reversed(shorter[1:]):
+                        del merged[s][i], keys[i]
+                    continue
+                keys.append(key)
+                merged[s].append(line)
+        if s == "Disclaimer":
+            merged[s] = merged[s][:1]
+    return Report(merged)
+
+
+def _map_reduce_report(llm: LLMRouter, transcribed_text: str) -> Report:
+    batches = _map_messages(transcribed_text)
+
+    def _one(messages) -> Report:
+        return _parse_report(_OUTPUT_PARSER.parse(_answered(llm.invoke(messages)).content))
+
+    with ThreadPoolExecutor(max_workers=max(1, MAP_REDUCE_CONCURRENCY)) as pool:
+        # each worker runs in a copy of this context so _answered sees the tracker
+        futures = [pool.submit(contextvars.copy_context().run, _one, m) for m in batches]
+        partials = [f.result() for f in futures]
+    return _reduce_sections(partials)
+
+
+async def _amap_reduce_report(llm: LLMRouter, transcribed_text: str) -> Report:
+    batches = _map_messages(transcribed_text)
+    sem = asyncio.Semaphore(max(1, MAP_REDUCE_CONCURRENCY))
+
+    async def _one(messages) -> Report:
+        async with sem:
+            response = _answered(await llm.ainvoke(messages))
+        return _parse_report(_OUTPUT_PARSER.parse(response.content))
+
+    partials = await asyncio.gather(*(_one(m) for m in batches))
+    return _reduce_sections(list(partials))
+
+
+def _structured_report(raw: str) -> Optional[Report]:
+    """LLM_OUTPUT_FORMAT=json: the validated Report, or None to fall back to the text prompt."""
+    from core.structured_output import StructuredOutputError, parse_structured_report
+    with span("normalize"):
+        try:
+            return parse_structured_report(raw)
+        except StructuredOutputError as e:
+            log.warning("structured report rejected, falling back to text output: %s", e)
+            REGISTRY.add_gauge("llm_json_fallbacks_total", 1)
+            return None
+
+
+def _single_report(llm: LLMRouter, transcribed_text: str) -> Report:
+    if _json_output():
+        response = _answered(llm.invoke(_JSON_REPORT_PROMPT.format_messages(transcript=transcribed_text)))
+        report = _structured_report(_OUTPUT_PARSER.parse(response.content))
+        if report is not None:
+            return report
+    messages = _REPORT_PROMPT.format_messages(transcript=transcribed_text)
+    response = _answered(llm.invoke(messages))
+    return _parse_report(_OUTPUT_PARSER.parse(response.content))
+
+
+async def _asingle_report(llm: LLMRouter, transcribed_text: str) -> Report:
+    if _json_output():
+        response = _answered(await llm.ainvoke(_JSON_REPORT_PROMPT.format_messages(transcript=transcribed_text)))
+        report = _structured_report(_OUTPUT_PARSER.parse(response.content))
+        if report is not None:
+            return report
+    messages = _REPORT_PROMPT.format_messages(transcript=transcribed_text)
+    response = _answered(await llm.ainvoke(messages))
+    return _parse_report(_OUTPUT_PARSER.parse(response.content))
+
+
+def _cached_report(key: str) -> Optional[Report]:
+    cached = REPORT_CACHE.get(key)
+    return None if cached is None else parse_report(cached)
+
+
+def generate_report(transcribed_text: str) -> Report:
+    """
+    Takes doctor–patient consultation text and generates
+    a structured medical report using DeepSeek via OpenRouter API,
+    parsed once into a Report for the DOCX renderer.
+    The transcript is compacted first (fillers, repeats, token budget; see core.compaction).
+    Transcripts still above MAP_REDUCE_THRESHOLD_TOKENS are summarized chunk by chunk (map-reduce).
+    With LLM_OUTPUT_FORMAT=json the model answers with a JSON object (core.structured_output),
+    and a reply that does not validate is re-requested as plain text.
+    Reports are cached only when every answer came from LLM_MODEL (not a fallback route).
+    """
+    transcribed_text = _compact(transcribed_text)
+    cache = REPORT_CACHE
+    if cache:
+        key = _report_cache_key(transcribed_text)
+        cached = _cached_report(key)
+        if cached is not None:
+            return cached
+
+    llm = get_router()
+
+    with _track_fallbacks() as fallbacks:
+        if _needs_map_reduce(transcribed_text):
+            report = _map_reduce_report(llm, transcribed_text)
+        else:
+            report = _single_report(llm, transcribed_text)
+    if cache and not fallbacks:
+        cache.put(key, report.to_text())
+    return report
+
+
+async def agenerate_report(transcribed_text: str) -> Report:
+    """Async variant of generate_report using ainvoke (cache I/O runs in a thread)."""
+    transcribed_text = _compact(transcribed_text)
+    cache = REPORT_CACHE
+    if cache:
+        key = _report_cache_key(transcribed_text)
+        cached = await asyncio.to_thread(_cached_report, key)
+        if cached is not None:
+            return cached
+
+    llm = get_router()
+
+    with _track_fallbacks() as fallbacks:
+        if _needs_map_reduce(transcribed_text):
+            report = await _amap_reduce_report(llm, transcribed_text)
+        else:
+            report = await _asingle_report(llm, transcribed_text)
+    if cache and not fallbacks:
+        await asyncio.to_thread(cache.put, key, report.to_text())
+    return report
+
+
+def generate_medical_report(transcribed_text: str) -> str:
+    """
+    generate_report as plain text: DOCX-friendly (no Markdown symbols), exact
+    section headers in order, aligned with our renderer.
+    """
+    return generate_report(transcribed_text).to_text()
+
+
+async def agenerate_medical_report(transcribed_text: str) -> str:
+    """Async variant of generate_medical_report using ainvoke (no executor thread)."""
+    return (await agenerate_report(transcribed_text)).to_text()
+
+
+# ---------------------- streaming mode ----------------------
+
+ProgressCallback = Callable[[List[str]], Awaitable[None]]
+
+
+async def _astream_structured_report(
+    llm: LLMRouter, transcribed_text: str, on_progress: Optional[ProgressCallback]
+) -> Report:
+    """JSON mode: progress follows the section keys as they stream; invalid output
+    falls back to one (non-streamed) text request."""
+    from core.structured_output import JsonSectionProgress
+    progress = JsonSectionProgress()
+    async for chunk in llm.astream(_JSON_REPORT_PROMPT.format_messages(transcript=transcribed_text)):
+        if progress.feed(_answered(chunk).content) and on_progress:
+            await on_progress(progress.completed_sections)
+    report = _structured_report(_OUTPUT_PARSER.parse(progress.text))
+    if report is not None:
+        return report
+    response = _answered(await llm.ainvoke(_REPORT_PROMPT.format_messages(transcript=transcribed_text)))
+    return _parse_report(_OUTPUT_PARSER.parse(response.content))
+
+
+async def astream_report(
+    transcribed_text: str,
+    on_progress: Optional[ProgressCallback] = None,
+) -> Report:
+    """
+    Streaming variant of agenerate_report: tokens are parsed as they arrive
+    and `on_progress(completed_sections)` is awaited whenever a section finishes.
+    Returns exactly what agenerate_report would for the same completion.
+    Cache hits and map-reduce transcripts report all sections once, at the end.
+    """
+    transcribed_text = _compact(transcribed_text)
+    cache = REPORT_CACHE
+    if cache:
+        key = _report_cache_key(transcribed_text)
+        cached = await asyncio.to_thread(_cached_report, key)
+        if cached is not None:
+            if on_progress:
+                await on_progress(list(SECTIONS))
+            return cached
+
+    llm = get_router()
+
+    with _track_fallbacks() as fallbacks:
+        if _needs_map_reduce(transcribed_text):
+            report = await _amap_reduce_report(llm, transcribed_text)
+        elif _json_output():
+            report = await _astream_structured_report(llm, transcribed_text, on_progress)
+        else:
+            messages = _REPORT_PROMPT.format_messages(transcript=transcribed_text)
+            parser = StreamingNormalizer()
+            async for chunk in llm.astream(messages):
+                if parser.feed(_answered(chunk).content) and on_progress:
+                    await on_progress(parser.completed_sections)
+            with span("normalize"):
+                report = parser.finish_report()
+    if on_progress:
+        await on_progress(list(SECTIONS))
+    if cache and not fallbacks:
+        await asyncio.to_thread(cache.put, key, report.to_text())
+    return report
+
 
-    messages = prompt_template.format_messages(transcript=transcribed_text)
-    parser = StrOutputParser()
-    response = llm.invoke(messages)
-    raw = parser.parse(response.content)
-
-    # Normalize to the exact structure the DOCX renderer expects
-    cleaned = _strip_markdown(raw)
-    cleaned = _strip_llm_special_tokens(cleaned)  # NEW: remove <|...|> / <｜...｜> tokens
-    cleaned = _censor_patient_lines(cleaned)
-    normalized = _ensure_section_order(cleaned)
-    return normalized
+async def astream_medical_report(
+    transcribed_text: str,
+    on_progress: Optional[ProgressCallback] = None,
+) -> str:
+    """astream_report as plain text (same as agenerate_medical_report for the same completion)."""
+    return (await astream_report(transcribed_text, on_progress)).to_text()
@@ -0,0 +1,334 @@
+# core/llm_router.py
+"""
+Model routing for report generation: ordered failover, retries, circuit breakers
+and optional hedged requests.
+
+    router = LLMRouter(parse_routes("deepseek/deepseek-chat-v3.1:free, openai/gpt-4o-mini@https://..."),
+                       client_for=lambda ep: get_llm(ep.model, ep.base_url, api_key=ep.api_key))
+    router.invoke(messages) / await router.ainvoke(messages) / router.astream(messages)
+
+The router exposes the same invoke/ainvoke/astream surface as ChatOpenAI, so the
+pipeline (single prompt, map-reduce, streaming) uses it as a drop-in client.
+
+- Routes are tried in order; a route whose provider breaker is open is skipped.
+- Each route retries transient errors (timeouts, connection errors, 408/409/429/5xx)
+  with jittered exponential backoff (tenacity); other errors move on at once.
+- A provider's breaker opens after `breaker_failures` consecutive failures and
+  lets one trial request through after `breaker_reset_s` (half-open). The breaker
+  is only consulted when its route is actually about to be tried, and a trial
+  that never reports back (e.g. a cancelled hedge) expires after breaker_reset_s.
+- With hedge_after_s > 0, ainvoke starts a second request on the next route (or
+  the same one when it is the only route) if the first has not answered in time;
+  the first success wins and the other request is cancelled.
+- Streaming fails over only before the first chunk; later errors propagate.
+- Responses (and streamed chunks) from a route whose model differs from the
+  first route's are tagged response_metadata["llm_fallback"] = True, with the
+  route in "llm_route", so callers can tell a fallback model answered.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from core.metrics import REGISTRY
+
+_TRANSIENT_STATUS = {408, 409, 429}
+_TRANSIENT_NAMES = {"APIConnectionError", "APITimeoutError", "InternalServerError", "RateLimitError"}
+
+
+class AllRoutesFailed(RuntimeError):
+    """Every configured route failed or had its circuit breaker open."""
+
+
+class _BreakerOpen(RuntimeError):
+    """The route was skipped: its provider's breaker did not admit the request."""
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    model: str
+    base_url: str
+    api_key: Optional[str] = None
+
+    @property
+    def provider(self) -> str:
+        return self.base_url.rstrip("/")
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}@{self.provider}"
+
+
+def parse_routes(spec: str, default_base_url: str, default_api_key: Optional[str] = None) -> List[Endpoint]:
+    """
+    "model-a, model-b@https://host/v1, model-c@https://other/v1#OTHER_API_KEY" → endpoints.
+    Without "@", the default base URL is used; "#ENV" names the env var holding the key.
+    """
+    routes: List[Endpoint] = []
+    for part in (p.strip() for p in (spec or "").split(",")):
+        if not part:
+            continue
+        key = default_api_key
+        if "#" in part:
+            part, env = part.rsplit("#", 1)
+            key = os.getenv(env.strip(), default_api_key)
+        model, _, base_url = part.partition("@")
+        routes.append(Endpoint(model.strip(), (base_url.strip() or default_base_url), key))
+    return routes
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, httpx.TransportError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status in _TRANSIENT_STATUS or status >= 500
+    return any(cls.__name__ in _TRANSIENT_NAMES for cls in type(exc).__mro__)
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_s: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_s = reset_s
+        self.failures = 0
+        self.opened_at = 0.0  # when it opened, or when the current half-open trial started
+        self.state = self.CLOSED
+        self._lock = threading.Lock()
+
+    def _due(self) -> bool:
+        # OPEN: the reset period is over; HALF_OPEN: the trial never reported back in time
+        return time.monotonic() - self.opened_at >= self.reset_s
+
+    def ready(self) -> bool:
+        """Would allow() admit a request now? (no state change)"""
+        with self._lock:
+            return self.state == self.CLOSED or self._due()
+
+    def allow(self) -> bool:
+        """Admit one request; call only right before actually sending it."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self._due():
+                self.state = self.HALF_OPEN  # one trial request
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LLMRouter:
+    def __init__(
+        self,
+        routes: List[Endpoint],
+        client_for: Callable[[Endpoint], Any],
+        retry_attempts: int = 3,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 8.0,
+        breaker_failures: int = 5,
+        breaker_reset_s: float = 30.0,
+        hedge_after_s: float = 0.0,
+    ):
+        if not routes:
+            raise ValueError("LLMRouter needs at least one route")
+        self.routes = list(routes)
+        self.client_for = client_for
+        self.retry_attempts = max(1, retry_attempts)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge_after_s = hedge_after_s
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        for ep in self.routes:
+            self.breakers.setdefault(ep.provider, CircuitBreaker(breaker_failures, breaker_reset_s))
+
+    # ---------------------- helpers ----------------------
+
+    def _available(self) -> List[Endpoint]:
+        routes = [ep for ep in self.routes if self.breakers[ep.provider].ready()]
+        if not routes:
+            raise AllRoutesFailed("all LLM providers are failing (circuit breakers open)")
+        return routes
+
+    def _retry_kwargs(self, ep: Endpoint) -> dict:
+        breaker = self.breakers[ep.provider]
+        return dict(
+            stop=stop_after_attempt(self.retry_attempts),
+            wait=wait_random_exponential(multiplier=self.backoff_base_s, max=self.backoff_max_s),
+            # keep retrying only while the provider's breaker still lets requests through
+            retry=retry_if_exception(lambda e: is_transient(e) and breaker.state != CircuitBreaker.OPEN),
+            reraise=True,
+        )
+
+    def _publish_breakers(self) -> None:
+        open_count = sum(1 for b in self.breakers.values() if b.state == CircuitBreaker.OPEN)
+        REGISTRY.set_gauge("llm_breakers_open", open_count)
+
+    def _admit(self, ep: Endpoint) -> None:
+        if not self.breakers[ep.provider].allow():
+            raise _BreakerOpen(f"{ep.name}: circuit breaker open")
+
+    def _failed(self, ep: Endpoint) -> None:
+        self.breakers[ep.provider].record_failure()
+        self._publish_breakers()
+
+    def _tag(self, ep: Endpoint, message):
+        if ep.model != self.routes[0].model:
+            metadata = getattr(message, "response_metadata", None)
+            if isinstance(metadata, dict):
+                metadata["llm_fallback"] = True
+                metadata["llm_route"] = ep.name
+        return message
+
+    def _succeeded(self, ep: Endpoint, seconds: float) -> None:
+        self.breakers[ep.provider].record_success()
+        self._publish_breakers()
+        REGISTRY.observe("llm_call", seconds)
+
+    @staticmethod
+    def _give_up(errors: List[BaseException]) -> AllRoutesFailed:
+        last = errors[-1] if errors else None
+        err = AllRoutesFailed(f"all LLM routes failed; last error: {last}")
+        err.__cause__ = last
+        return err
+
+    # ---------------------- sync ----------------------
+
+    def _invoke_one(self, ep: Endpoint, messages):
+        self._admit(ep)
+        for attempt in Retrying(**self._retry_kwargs(ep)):
+            with attempt:
+                t0 = time.perf_counter()
+                try:
+                    response = self.client_for(ep).invoke(messages)
+                except Exception:
+                    self._failed(ep)
+                    raise
+                self._succeeded(ep, time.perf_counter() - t0)
+                return self._tag(ep, response)
+
+    def invoke(self, messages):
+        """Ordered failover with retries (no hedging on the sync path)."""
+        errors: List[BaseException] = []
+        for ep in self._available():
+            try:
+                return self._invoke_one(ep, messages)
+            except Exception as e:
+                errors.append(e)
+        raise self._give_up(errors)
+
+    # ---------------------- async ----------------------
+
+    async def _ainvoke_one(self, ep: Endpoint, messages):
+        self._admit(ep)
+        async for attempt in AsyncRetrying(**self._retry_kwargs(ep)):
+            with attempt:
+                t0 = time.perf_counter()
+                try:
+                    response = await self.client_for(ep).ainvoke(messages)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self._failed(ep)
+                    raise
+                self._succeeded(ep, time.perf_counter() - t0)
+                return self._tag(ep, response)
+
+    async def _hedged(self, messages, first: Endpoint, second: Endpoint):
+        primary = asyncio.create_task(self._ainvoke_one(first, messages))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after_s)
+        if done:
+            if primary.exception() is None or second is first:
+                return primary.result()
+            # failed fast: the hedge route becomes a plain failover
+            return await self._ainvoke_one(second, messages)
+        hedge = asyncio.create_task(self._ainvoke_one(second, messages))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    async def ainvoke(self, messages):
+        errors: List[BaseException] = []
+        routes = self._available()
+        i = 0
+        while i < len(routes):
+            ep = routes[i]
+            partner = None
+            if self.hedge_after_s > 0:
+                partner = routes[i + 1] if i + 1 < len(routes) else ep
+            # a hedge to the next route uses that route up as well
+            i += 2 if partner is not None and partner is not ep else 1
+            try:
+                if partner is None:
+                    return await self._ainvoke_one(ep, messages)
+                return await self._hedged(messages, ep, partner)
+            except Exception as e:
+                errors.append(e)
+        raise self._give_up(errors)
+
+    async def astream(self, messages):
+        """Yield chunks from the first route that starts streaming."""
+        errors: List[BaseException] = []
+        for ep in self._available():
+            stream = None
+            first = None
+            t0 = time.perf_counter()
+            try:
+                self._admit(ep)
+                async for attempt in AsyncRetrying(**self._retry_kwargs(ep)):
+                    with attempt:
+                        stream = self.client_for(ep).astream(messages).__aiter__()
+                        try:
+                            first = await stream.__anext__()
+                        except StopAsyncIteration:
+                            first = None
+                        except Exception:
+                            self._failed(ep)
+                            raise
+            except Exception as e:
+                errors.append(e)
+                continue
+            if first is not None:
+                yield self._tag(ep, first)
+                async for chunk in stream:
+                    yield self._tag(ep, chunk)
+            self._succeeded(ep, time.perf_counter() - t0)
+            return
+        raise self._give_up(errors)
+
+    def stats(self) -> Dict[str, str]:
+        return {provider: b.state for provider, b in self.breakers.items()}
@@ -0,0 +1,217 @@
+# core/metrics.py
+"""
+Lightweight per-stage instrumentation for the consultation pipeline.
+
+    with span("llm"): ...              # sync or `async with`
+    @timed("normalize")                 # sync or async functions
+    REGISTRY.observe("queue_wait", s)   # any externally measured duration
+
+Each stage keeps count/sum/max plus a bounded reservoir of recent samples for
+p50/p95/p99, and an in-flight gauge. Dumps as JSON or Prometheus text.
+`profile_job()` wraps a single job in cProfile or tracemalloc (opt-in).
+"""
+from __future__ import annotations
+import cProfile
+import functools
+import inspect
+import io
+import json
+import math
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageStats:
+    __slots__ = ("count", "total", "max", "in_flight", "samples")
+
+    def __init__(self, reservoir: int):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.in_flight = 0
+        self.samples: Deque[float] = deque(maxlen=reservoir)
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self.samples:
+            return {q: 0.0 for q in QUANTILES}
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        # nearest-rank percentile
+        return {q: ordered[min(n - 1, max(0, math.ceil(q * n) - 1))] for q in QUANTILES}
+
+
+class MetricsRegistry:
+    def __init__(self, reservoir: int = 2048):
+        self.reservoir = reservoir
+        self._stages: Dict[str, StageStats] = {}
+        self._gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, name: str) -> StageStats:
+        st = self._stages.get(name)
+        if st is None:
+            st = self._stages.setdefault(name, StageStats(self.reservoir))
+        return st
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            st = self._stage(stage)
+            st.count += 1
+            st.total += seconds
+            st.max = max(st.max, seconds)
+            st.samples.append(seconds)
+
+    def enter(self, stage: str) -> None:
+        with self._lock:
+            self._stage(stage).in_flight += 1
+
+    def exit(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stage(stage).in_flight -= 1
+        self.observe(stage, seconds)
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def add_gauge(self, name: str, delta: float) -> None:
+        """Increment a running total (e.g. tokens saved)."""
+        with self._lock:
+            self._gauges[name] = self._gauges.get(name, 0) + delta
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._gauges.clear()
+
+    # ---------------------- dumps ----------------------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {}
+            for name, st in sorted(self._stages.items()):
+                q = st.quantiles()
+                stages[name] = {
+                    "count": st.count,
+                    "in_flight": st.in_flight,
+                    "mean_s": (st.total / st.count) if st.count else 0.0,
+                    "p50_s": q[0.5],
+                    "p95_s": q[0.95],
+                    "p99_s": q[0.99],
+                    "max_s": st.max,
+                }
+            return {"stages": stages, "gauges": dict(sorted(self._gauges.items()))}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = "medbot") -> str:
+        snap = self.snapshot()
+        lines: List[str] = [
+            f"# HELP {prefix}_stage_seconds Pipeline stage latency.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, st in snap["stages"].items():
+            for q, key in ((0.5, "p50_s"), (0.95, "p95_s"), (0.99, "p99_s")):
+                lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="{q}"}} {st[key]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {st["mean_s"] * st["count"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {st["count"]}')
+        lines.append(f"# TYPE {prefix}_stage_in_flight gauge")
+        for name, st in snap["stages"].items():
+            lines.append(f'{prefix}_stage_in_flight{{stage="{name}"}} {st["in_flight"]}')
+        for name, value in snap["gauges"].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class span:
+    """Time a block as one sample of `stage` (usable with `with` and `async with`)."""
+
+    __slots__ = ("stage", "registry", "seconds", "_t0")
+
+    def __init__(self, stage: str, registry: Optional[MetricsRegistry] = None):
+        self.stage = stage
+        self.registry = registry or REGISTRY
+        self.seconds = 0.0  # elapsed time, set on exit (`with span(...) as s: ...; s.seconds`)
+        self._t0 = 0.0
+
+    def __enter__(self):
+        self.registry.enter(self.stage)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._t0
+        self.registry.exit(self.stage, self.seconds)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+
+def timed(stage: str, registry: Optional[MetricsRegistry] = None):
+    """Decorator form of span() for sync and async functions."""
+
+    def deco(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with span(stage, registry):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, registry):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return deco
+
+
+@contextmanager
+def profile_job(kind: str = "cpu", limit: int = 30):
+    """
+    Profile one job. Yields a dict whose "report" key holds the text result after
+    the block: cProfile cumulative stats ("cpu") or top allocation sites ("mem").
+    Note that on the event loop, cProfile also sees other coroutines running meanwhile.
+    """
+    result = {"kind": kind, "report": ""}
+    if kind == "mem":
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        try:
+            yield result
+        finally:
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_here:
+                tracemalloc.stop()
+            stats = after.compare_to(before, "lineno")[:limit]
+            result["report"] = f"peak traced: {peak / 1024:.1f} KiB\n" + "\n".join(str(s) for s in stats)
+    else:
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield result
+        finally:
+            prof.disable()
+            out = io.StringIO()
+            pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(limit)
+            result["report"] = out.getvalue()
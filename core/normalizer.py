@@ -0,0 +1,106 @@
+# core/normalizer.py
+"""
+Normalized report text from raw LLM output, whole or streamed.
+
+Produces byte-identical output to the reference chain in core/langchain_pipeline:
+    _ensure_section_order(_censor_patient_lines(_strip_llm_special_tokens(_strip_markdown(text))))
+
+Both entry points are thin layers over core.report: normalize_report_text is
+parse_report(raw).to_text(), and StreamingNormalizer feeds complete lines to a
+ReportBuilder as they arrive.
+"""
+from __future__ import annotations
+from typing import List
+
+# The parser itself lives in core.report; names re-exported for existing imports.
+from core.report import (
+    CENSOR_PATTERNS,
+    SECTIONS,
+    Report,
+    ReportBuilder,
+    canonical_header,
+    parse_report,
+    strip_header_markup,
+    strip_tokens,
+)
+
+
+def normalize_report_text(raw: str) -> str:
+    """Markdown/token cleanup, censoring and section ordering in a single line pass."""
+    return parse_report(raw).to_text()
+
+
+# Characters whose cleanup can span lines (fences, '#', bold/italics, control tokens).
+_UNSAFE_CHARS = ("`", "#", "*", "<")
+
+
+class StreamingNormalizer:
+    """
+    Incremental normalize_report_text for streamed LLM output.
+
+        norm = StreamingNormalizer()
+        for chunk in stream:
+            done = norm.feed(chunk)   # sections completed by this chunk
+        text = norm.finish()          # == normalize_report_text("".join(chunks))
+        # or: report = norm.finish_report(), the same as a core.report.Report
+
+    Complete lines are bucketed as they arrive, so finish() only handles the tail.
+    Once a character whose cleanup can span lines shows up, lines are no longer
+    bucketed (headers are still tracked for progress) and finish() falls back to
+    normalize_report_text over the whole text, keeping the output identical.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._pending = ""
+        self._builder = ReportBuilder()
+        self._line_safe = True
+        self.sections_seen: List[str] = []
+
+    @property
+    def completed_sections(self) -> List[str]:
+        """Sections whose header has been followed by another section (first-seen order)."""
+        return list(dict.fromkeys(self.sections_seen[:-1]))
+
+    def feed(self, chunk: str) -> List[str]:
+        if not chunk:
+            return []
+        self._parts.append(chunk)
+        if self._line_safe and any(c in chunk for c in _UNSAFE_CHARS):
+            self._line_safe = False
+
+        before = len(self.completed_sections)
+        text = self._pending + chunk
+        # splitlines() also breaks on \r, \x0b, \x1c..., so only cut at the last
+        # line break and let it decide the boundaries inside the complete part.
+        cut = max(text.rfind("\n"), text.rfind("\r"))
+        if cut < 0:
+            self._pending = text
+            return []
+        complete, self._pending = text[:cut + 1], text[cut + 1:]
+        for ln in complete.splitlines():
+            self._track(ln)
+        return self.completed_sections[before:]
+
+    def _track(self, ln: str) -> None:
+        if self._line_safe:
+            prev = self._builder.current
+            current = self._builder.add(ln)
+            if current != prev and current is not None:
+                self.sections_seen.append(current)
+            return
+        header = canonical_header(strip_header_markup(ln))
+        if header and (not self.sections_seen or self.sections_seen[-1] != header):
+            self.sections_seen.append(header)
+
+    def finish_report(self) -> Report:
+        if self._line_safe and self._pending:
+            for ln in self._pending.splitlines():
+                self._track(ln)
+            self._pending = ""
+        if not self._line_safe:
+            return parse_report("".join(self._parts))
+        return self._builder.build()
+
+    def finish(self) -> str:
+        return self.finish_report().to_text()
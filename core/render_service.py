@@ -0,0 +1,120 @@
+# core/render_service.py
+"""
+Process-pool DOCX rendering service.
+
+Workers are spawned (not forked from the bot), pre-import python-docx and
+pre-load the base report template in their initializer, then take plain data
+(report text or a parsed core.report.Report, plus header fields) and return the
+saved file path or the DOCX bytes.
+Rendering therefore scales across cores and never runs on the event-loop thread.
+A job that times out keeps its worker busy, so the pool is killed and replaced
+on timeout (other jobs in flight on it fail); repeated stuck renders cannot
+exhaust the workers.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, Union
+
+if TYPE_CHECKING:
+    from core.report import Report
+
+
+def _warm_worker() -> None:
+    # Runs once per worker process: import python-docx and parse the template now,
+    # so the first real job does not pay for it.
+    from core.docx_renderer import _fresh_report_document
+    _fresh_report_document()
+
+
+def _ping() -> bool:
+    return True
+
+
+def _render_job(
+    report_text: Union[str, Report],
+    report_path: str,
+    author_name: str,
+    patient_name: str,
+    patient_id: str,
+    as_bytes: bool,
+    consulted_at: Optional[datetime] = None,
+) -> Union[str, bytes]:
+    from core.docx_renderer import render_tidy_docx_bytes, save_tidy_docx
+    if as_bytes:
+        return render_tidy_docx_bytes(report_text, report_path, author_name, patient_name, patient_id, consulted_at)
+    save_tidy_docx(report_text, report_path, author_name, patient_name, patient_id, consulted_at)
+    return report_path
+
+
+class RenderService:
+    def __init__(self, workers: int = 2, timeout_s: float = 60.0):
+        self.workers = max(1, workers)
+        self.timeout_s = timeout_s
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        return self._pool
+
+    async def start(self) -> None:
+        """Spawn and warm every worker up front instead of on the first report."""
+        pool = self._ensure_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(self.workers)))
+
+    async def render(
+        self,
+        report_text: Union[str, Report],
+        report_path: str,
+        author_name: str = "Unknown",
+        patient_name: str = "Unknown",
+        patient_id: str = "Unknown",
+        as_bytes: bool = False,
+        consulted_at: Optional[datetime] = None,
+    ) -> Union[str, bytes]:
+        """
+        Render one report in a worker process. Returns report_path once the file is
+        written, or the DOCX bytes when as_bytes=True (report_path then only names
+        the report). The consultation date is consulted_at, else parsed from
+        report_path. Raises asyncio.TimeoutError after timeout_s.
+        """
+        return await self._run(
+            _render_job,
+            report_text,
+            report_path,
+            author_name,
+            patient_name,
+            patient_id,
+            as_bytes,
+            consulted_at,
+        )
+
+    async def _run(self, fn, *args):
+        pool = self._ensure_pool()
+        fut = asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        try:
+            return await asyncio.wait_for(fut, timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            self._recycle(pool)
+            raise
+
+    def _recycle(self, pool: ProcessPoolExecutor) -> None:
+        """Kill the workers of `pool` (one is stuck on a timed-out job); the next render starts a new pool."""
+        if self._pool is pool:
+            self._pool = None
+        for proc in list((getattr(pool, "_processes", None) or {}).values()):
+            proc.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = False) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,251 @@
+# core/report.py
+"""
+The one report parser, shared by the LLM pipeline and the DOCX renderer.
+
+    report = parse_report(raw_llm_text)   # cleanup + censoring + sectioning, once
+    report.lines("Plan")                  # ["- Rest", ...] or ["- None reported."]
+    report.to_text()                      # the normalized plain-text report
+
+- Section headers are found with a precompiled alias table: a candidate line is
+  folded once (case, spacing, trailing colon, " / ") and looked up in a dict, so
+  canonical headers and aliases ("dx", "warning signs", ...) cost one hash lookup.
+- Identifier censoring is a single precompiled alternation.
+- Whole-text cleanup (code fences, '#' headers, bold/italics, control tokens) only
+  runs when its sentinel character is present.
+- `Report` is a slotted object (one list per section), cheap to keep around and
+  to pickle into the render worker processes.
+"""
+from __future__ import annotations
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SECTIONS: List[str] = [
+    "Symptoms",
+    "Diagnosis",
+    "Prescription / Treatment Plan",
+    "Doctor's Notes",
+    "Assessment",
+    "Plan",
+    "Red Flags",
+    "Disclaimer",
+]
+
+# Report attribute holding each section's lines
+SECTION_SLOTS: Dict[str, str] = {
+    "Symptoms": "symptoms",
+    "Diagnosis": "diagnosis",
+    "Prescription / Treatment Plan": "treatment_plan",
+    "Doctor's Notes": "doctors_notes",
+    "Assessment": "assessment",
+    "Plan": "plan",
+    "Red Flags": "red_flags",
+    "Disclaimer": "disclaimer",
+}
+
+# Header spellings accepted besides the canonical name (compared after _fold)
+SECTION_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "Symptoms": ("symptom",),
+    "Diagnosis": ("dx",),
+    "Prescription / Treatment Plan": (
+        "prescription", "rx", "treatment plan", "treatment/plan", "management plan",
+    ),
+    "Doctor's Notes": (
+        "doctor's note", "doctors notes", "doctors note", "doctor notes", "doctor note",
+        "doctor' notes", "doctor' note", "clinical notes", "clinical note",
+    ),
+    "Assessment": ("impression",),
+    "Plan": ("plan of care",),
+    "Red Flags": ("red flag", "warning signs", "warning sign"),
+    "Disclaimer": ("note",),
+}
+
+PLACEHOLDER = "- None reported."
+DEFAULT_SECTION = "Doctor's Notes"  # where lines before the first header go
+
+CENSOR_PATTERNS = [
+    r"^\s*(patient\s*name|nama\s*pasien)\s*[:=].*$",
+    r"^\s*(patient\s*id|id\s*pasien|mrn|rekam\s*medis)\s*[:=].*$",
+    r"^\s*(dob|tanggal\s*lahir|age|umur)\s*[:=].*$",
+    r"^\s*(date\s*of\s*consultation|tanggal\s*konsultasi)\s*[:=].*$",
+    r"^\s*(alamat|address|phone|telepon)\s*[:=].*$",
+]
+
+_FENCE_RE = re.compile(r"```[\s\S]*?```")
+_HASH_HEADER_RE = re.compile(r"^\s*#+\s*", re.MULTILINE)
+_BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+_ITALIC_RE = re.compile(r"\*(.*?)\*")
+_SPECIAL_TOKEN_RE = re.compile(r"[.\s]*<\s*[|｜]\s*[^|｜>]+?\s*[|｜]\s*>[.\s]*")
+_THINK_RE = re.compile(r"</?think>", re.IGNORECASE)
+_CENSOR_RE = re.compile("|".join(f"(?:{p})" for p in CENSOR_PATTERNS), re.IGNORECASE)
+_BULLET_RE = re.compile(r"^[\-•]\s+")
+_SLASH_RE = re.compile(r"\s*/\s*")
+
+
+# ---------------------- header alias table ----------------------
+
+def _fold(line: str) -> str:
+    """Lowercase, single spaces, no trailing colon, "a / b" -> "a/b"."""
+    key = " ".join(line.lower().split()).rstrip(":").rstrip()
+    return _SLASH_RE.sub("/", key) if "/" in key else key
+
+
+def _build_header_table() -> Dict[str, str]:
+    table: Dict[str, str] = {}
+    for section in SECTIONS:
+        for spelling in (section, *SECTION_ALIASES.get(section, ())):
+            key = _fold(spelling)
+            table.setdefault(key, section)
+            table.setdefault(key.replace(" ", ""), section)  # "redflags", "treatmentplan"
+    return table
+
+
+_HEADERS = _build_header_table()
+# Cheap rejects before folding: first letter and length (with room for spacing)
+_HEADER_INITIALS = frozenset(k[0] for k in _HEADERS) | frozenset(k[0].upper() for k in _HEADERS)
+_MAX_HEADER_LEN = 2 * max(len(k) for k in _HEADERS)
+
+
+def canonical_header(line: str) -> Optional[str]:
+    """Canonical section for a header line (canonical name or alias), else None."""
+    if not line or line[0] not in _HEADER_INITIALS or len(line) > _MAX_HEADER_LEN:
+        return None
+    key = _fold(line)
+    return _HEADERS.get(key) or _HEADERS.get(key.replace(" ", ""))
+
+
+def looks_like_patient_info(line: str) -> bool:
+    """Identifier lines (name, ID/MRN, DOB/age, dates, contact) that must not reach the report."""
+    return _CENSOR_RE.search(line) is not None
+
+
+def strip_bullet(line: str) -> str:
+    """Cell text for a report line: leading "- " / "• " removed."""
+    return _BULLET_RE.sub("", line).strip()
+
+
+# ---------------------- cleanup ----------------------
+
+def _unfence(m: "re.Match[str]") -> str:
+    return m.group(0).strip("`\n")
+
+
+def strip_tokens(text: str) -> str:
+    """Remove model control tokens (<|...|>, <｜...｜>) and <think> tags; identity without '<'."""
+    if "<" not in text:
+        return text
+    text = _SPECIAL_TOKEN_RE.sub("", text)
+    return _THINK_RE.sub("", text)
+
+
+def strip_header_markup(line: str) -> str:
+    """'## **Plan**' -> 'Plan' (header detection on streamed lines before full cleanup)."""
+    return _BOLD_RE.sub(r"\1", _HASH_HEADER_RE.sub("", line)).strip()
+
+
+def clean_text(text: str) -> str:
+    """Whole-text Markdown and control-token cleanup (these can span lines)."""
+    if "```" in text:
+        text = _FENCE_RE.sub(_unfence, text)
+    if "#" in text:
+        text = _HASH_HEADER_RE.sub("", text)
+    if "*" in text:
+        text = _BOLD_RE.sub(r"\1", text)
+        text = _ITALIC_RE.sub(r"\1", text)
+    return strip_tokens(text.strip())
+
+
+# ---------------------- Report ----------------------
+
+class Report:
+    """Report lines per section, in SECTIONS order (bullets normalized to "- ")."""
+
+    __slots__ = tuple(SECTION_SLOTS.values())
+
+    def __init__(self, sections: Optional[Dict[str, List[str]]] = None):
+        sections = sections or {}
+        for section, slot in SECTION_SLOTS.items():
+            setattr(self, slot, list(sections.get(section, ())))
+
+    def __getitem__(self, section: str) -> List[str]:
+        """The section's own lines (empty when the model said nothing about it)."""
+        return getattr(self, SECTION_SLOTS[section])
+
+    def items(self) -> Iterator[Tuple[str, List[str]]]:
+        for section, slot in SECTION_SLOTS.items():
+            yield section, getattr(self, slot)
+
+    def lines(self, section: str) -> List[str]:
+        """Lines to render: the section's lines, or the placeholder when empty."""
+        return self[section] or [PLACEHOLDER]
+
+    def to_text(self) -> str:
+        out: List[str] = []
+        for section, lines in self.items():
+            out.append(section)
+            out.extend(lines or (PLACEHOLDER,))
+            out.append("")
+        return "\n".join(out).strip() + "\n"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Report):
+            return NotImplemented
+        return all(self[s] == other[s] for s in SECTIONS)
+
+    def __repr__(self) -> str:
+        counts = ", ".join(f"{slot}={len(getattr(self, slot))}" for slot in self.__slots__)
+        return f"Report({counts})"
+
+    # __slots__ objects pickle fine, but keep the state explicit and compact
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state) -> None:
+        for slot, lines in zip(self.__slots__, state):
+            setattr(self, slot, lines)
+
+
+class ReportBuilder:
+    """
+    Line-at-a-time parser: `add(line)` per line, then `build()`.
+    Lines before the first header go to Doctor's Notes; identifier lines are
+    dropped when censor=True.
+    """
+
+    __slots__ = ("current", "censor", "_buckets")
+
+    def __init__(self, censor: bool = True):
+        self.current: Optional[str] = None
+        self.censor = censor
+        self._buckets: Dict[str, List[str]] = {s: [] for s in SECTIONS}
+
+    def add(self, ln: str) -> Optional[str]:
+        """Consume one line; returns the current section afterwards."""
+        ln = ln.rstrip()
+        if self.censor and _CENSOR_RE.search(ln):
+            return self.current
+        line = ln.strip()
+        if "<" in line:
+            line = strip_tokens(line)
+        if not line:
+            return self.current
+        header = canonical_header(line)
+        if header:
+            self.current = header
+            return header
+        if self.current is None:
+            self.current = DEFAULT_SECTION
+        self._buckets[self.current].append(_BULLET_RE.sub("- ", line, count=1))
+        return self.current
+
+    def extend(self, lines: Iterable[str]) -> "ReportBuilder":
+        for ln in lines:
+            self.add(ln)
+        return self
+
+    def build(self) -> Report:
+        return Report(self._buckets)
+
+
+def parse_report(raw: str) -> Report:
+    """Raw LLM text (or an already normalized report) -> Report, in one pass over the lines."""
+    return ReportBuilder().extend(clean_text(raw).splitlines()).build()
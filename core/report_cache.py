@@ -0,0 +1,137 @@
+# core/report_cache.py
+"""
+Optional memoization of normalized report text.
+
+Key = hash(transcript) + model + prompt version + temperature.
+Backends: "memory" (in-process LRU) and "sqlite" (single file, shareable by processes).
+Every backend keeps hit/miss counters so the savings can be checked in production;
+they are published as report_cache_* gauges (visible in !stats).
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+import xxhash
+
+from core.metrics import REGISTRY
+
+
+def make_report_key(transcript: str, model: str, prompt_version: str, temperature: float) -> str:
+    digest = xxhash.xxh3_128(transcript.encode("utf-8")).hexdigest()
+    return f"{digest}|{model}|{prompt_version}|{float(temperature):.3f}"
+
+
+class ReportCache:
+    """Base class: subclasses implement _get/_put; counters live here."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            stats = self.stats()
+        for name, v in stats.items():
+            REGISTRY.set_gauge(f"report_cache_{name}", v)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self._put(key, value)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
+
+    def _get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def _put(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryReportCache(ReportCache):
+    def __init__(self, max_entries: int = 512):
+        super().__init__()
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def _put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class SQLiteReportCache(ReportCache):
+    def __init__(self, path: str, max_entries: int = 10000):
+        super().__init__()
+        self.max_entries = max_entries
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS report_cache ("
+            " key TEXT PRIMARY KEY, report TEXT NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_report_cache_used ON report_cache(used_at)")
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT report FROM report_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE report_cache SET used_at = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def _put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO report_cache (key, report, used_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM report_cache WHERE key IN ("
+                " SELECT key FROM report_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def make_report_cache(backend: str, path: str = "", max_entries: int = 512) -> Optional[ReportCache]:
+    """Build the configured backend; "" / "none" disables report caching."""
+    backend = (backend or "none").strip().lower()
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryReportCache(max_entries=max_entries)
+    if backend == "sqlite":
+        return SQLiteReportCache(path, max_entries=max_entries)
+    raise ValueError(f"Unknown REPORT_CACHE_BACKEND: {backend!r}")
@@ -0,0 +1,159 @@
+# core/scheduler.py
+"""
+Bounded, fair job scheduler for audio consultations.
+
+- Admission: at most `max_queue` jobs may wait; submit() raises SchedulerFull beyond that.
+- Fairness: waiting jobs are kept per user and dispatched round-robin, so one
+  clinic uploading a burst cannot starve everyone else.
+- Concurrency: `global_limit` jobs run at once, at most `per_user_limit` per user,
+  and each pipeline stage (download, stt, llm, render) has its own worker cap.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional
+from core.metrics import REGISTRY
+
+log = logging.getLogger(__name__)
+
+STAGES = ("download", "stt", "llm", "render")
+
+
+class SchedulerFull(Exception):
+    """Raised when the waiting queue is at capacity."""
+
+
+@dataclass
+class _Job:
+    user_id: Hashable
+    run: Callable[[], Awaitable[None]]
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class ConsultationScheduler:
+    def __init__(
+        self,
+        max_queue: int = 100,
+        global_limit: int = 8,
+        per_user_limit: int = 1,
+        stage_workers: Optional[Dict[str, int]] = None,
+    ):
+        self.max_queue = max_queue
+        self.global_limit = global_limit
+        self.per_user_limit = per_user_limit
+        workers = {s: global_limit for s in STAGES}
+        workers.update(stage_workers or {})
+        self._stage_sems = {name: asyncio.Semaphore(n) for name, n in workers.items()}
+
+        self._pending: Dict[Hashable, Deque[_Job]] = {}
+        self._rr: Deque[Hashable] = deque()  # users with waiting jobs, round-robin order
+        self._active: Dict[Hashable, int] = {}
+        self._n_pending = 0
+        self._cond = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+
+    # ---------------------- lifecycle ----------------------
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"consultation-worker-{i}")
+            for i in range(self.global_limit)
+        ]
+
+    async def stop(self) -> None:
+        for t in self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ---------------------- public API ----------------------
+
+    @property
+    def pending(self) -> int:
+        return self._n_pending
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._active.values())
+
+    async def submit(self, user_id: Hashable, run: Callable[[], Awaitable[None]]) -> int:
+        """
+        Enqueue a job and return its 1-based position among waiting jobs
+        (0 means a worker slot is free and the job starts right away).
+        """
+        async with self._cond:
+            if self._n_pending >= self.max_queue:
+                raise SchedulerFull(f"queue is full ({self.max_queue} waiting)")
+            position = self._n_pending + 1
+            if (
+                not self._n_pending
+                and self.in_flight < self.global_limit
+                and self._active.get(user_id, 0) < self.per_user_limit
+            ):
+                position = 0
+            q = self._pending.setdefault(user_id, deque())
+            if not q:
+                self._rr.append(user_id)
+            q.append(_Job(user_id, run))
+            self._n_pending += 1
+            self._publish_gauges()
+            self._cond.notify_all()
+        return position
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """Hold one worker slot of a pipeline stage for the duration of the block."""
+        async with self._stage_sems[name]:
+            yield
+
+    # ---------------------- internals ----------------------
+
+    def _publish_gauges(self) -> None:
+        REGISTRY.set_gauge("scheduler_pending", self._n_pending)
+        REGISTRY.set_gauge("scheduler_in_flight", self.in_flight)
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the next runnable job in round-robin user order (caller holds the lock)."""
+        for _ in range(len(self._rr)):
+            user_id = self._rr[0]
+            self._rr.rotate(-1)
+            if self._active.get(user_id, 0) >= self.per_user_limit:
+                continue
+            q = self._pending[user_id]
+            job = q.popleft()
+            if not q:
+                del self._pending[user_id]
+                self._rr.remove(user_id)
+            self._n_pending -= 1
+            self._active[user_id] = self._active.get(user_id, 0) + 1
+            return job
+        return None
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._cond:
+                job = self._next_job()
+                while job is None:
+                    await self._cond.wait()
+                    job = self._next_job()
+                self._publish_gauges()
+            REGISTRY.observe("queue_wait", time.monotonic() - job.submitted_at)
+            try:
+                await job.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Consultation job for user %s failed", job.user_id)
+            finally:
+                async with self._cond:
+                    self._active[job.user_id] -= 1
+                    if not self._active[job.user_id]:
+                        del self._active[job.user_id]
+                    self._publish_gauges()
+                    self._cond.notify_all()
@@ -0,0 +1,172 @@
+# core/session_store.py
+"""
+Pending patient info per Discord user, between `!patient` and the audio upload.
+
+Entries expire after ttl_s and the store holds at most max_entries (least
+recently used are evicted first), so abandoned sessions cannot pile up.
+Backends: "memory" (in-process) and "sqlite" (single file; survives restarts and
+can be shared by every shard / process on the host).
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class SessionStore(ABC):
+    """Base class: subclasses implement get/set/pop/purge_expired/__len__."""
+
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def get(self, user_id: Hashable) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set(self, user_id: Hashable, value: dict) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, user_id: Hashable) -> Optional[dict]:
+        """Remove and return the session (atomic: only one caller gets it)."""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, ttl_s: float = 3600, max_entries: int = 10000):
+        super().__init__(ttl_s, max_entries)
+        # { user_id: (expires_at, value) }, oldest use first
+        self._data: "OrderedDict[Hashable, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Hashable) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return dict(entry[1])
+
+    def set(self, user_id: Hashable, value: dict) -> None:
+        with self._lock:
+            self._data[user_id] = (time.time() + self.ttl_s, dict(value))
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, user_id: Hashable) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.pop(user_id, None)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (exp, _) in self._data.items() if exp <= now]
+            for k in expired:
+                del self._data[k]
+        return len(expired)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path: str, ttl_s: float = 3600, max_entries: int = 10000):
+        super().__init__(ttl_s, max_entries)
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " user_id TEXT PRIMARY KEY, data TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_used ON sessions(used_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires ON sessions(expires_at)")
+
+    def get(self, user_id: Hashable) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE user_id = ? AND expires_at > ?", (str(user_id), now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE sessions SET used_at = ? WHERE user_id = ?", (now, str(user_id)))
+            return json.loads(row[0])
+
+    def set(self, user_id: Hashable, value: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (user_id, data, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (str(user_id), json.dumps(value), now + self.ttl_s, now),
+            )
+            self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM sessions WHERE user_id IN ("
+                " SELECT user_id FROM sessions ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def pop(self, user_id: Hashable) -> Optional[dict]:
+        with self._lock:
+            # DELETE ... RETURNING keeps take-once semantics across processes
+            row = self._conn.execute(
+                "DELETE FROM sessions WHERE user_id = ? RETURNING data, expires_at", (str(user_id),)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+            return cur.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def make_session_store(
+    backend: str, path: str = "", ttl_s: float = 3600, max_entries: int = 10000
+) -> SessionStore:
+    """Build the configured backend ("memory" or "sqlite")."""
+    backend = (backend or "memory").strip().lower()
+    if backend == "memory":
+        return MemorySessionStore(ttl_s=ttl_s, max_entries=max_entries)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, ttl_s=ttl_s, max_entries=max_entries)
+    raise ValueError(f"Unknown SESSION_STORE_BACKEND: {backend!r}")
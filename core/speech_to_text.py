@@ -1,24 +1,186 @@
 #core/speech_to_text.py
 import os
-import assemblyai as aai
-from config.settings import ASSEMBLYAI_API_KEY
+import time
+import asyncio
+from typing import Optional
+import httpx
+from config.settings import (
+    ASSEMBLYAI_API_KEY,
+    ASSEMBLYAI_BASE_URL,
+    ASSEMBLYAI_POLL_INTERVAL,
+    ASSEMBLYAI_TIMEOUT,
+    ASSEMBLYAI_MAX_WAIT,
+    TRANSCRIPT_CACHE_ENABLED,
+    TRANSCRIPT_CACHE_DIR,
+    TRANSCRIPT_CACHE_MAX_MB,
+    TRANSCRIPT_CACHE_MAX_AGE_DAYS,
+    TRANSCRIPT_CACHE_MEMORY_ENTRIES,
+    STT_CHUNKING_ENABLED,
+    STT_CHUNK_SECONDS,
+    STT_CHUNK_OVERLAP_SECONDS,
+    STT_CHUNK_FANOUT,
+)
+from core.transcript_cache import TranscriptCache, hash_audio_file
+
+# Value of aai.SpeechModel used for transcription (also part of the cache key).
+# The assemblyai SDK is only needed by the sync path and is imported on first use.
+SPEECH_MODEL = "universal"
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Retries and duplicate uploads of the same audio skip AssemblyAI entirely
+TRANSCRIPT_CACHE: Optional[TranscriptCache] = (
+    TranscriptCache(
+        TRANSCRIPT_CACHE_DIR,
+        max_bytes=TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024,
+        max_age_s=TRANSCRIPT_CACHE_MAX_AGE_DAYS * 24 * 3600,
+        memory_entries=TRANSCRIPT_CACHE_MEMORY_ENTRIES,
+    )
+    if TRANSCRIPT_CACHE_ENABLED
+    else None
+)
+
+
+def _cache_key(file_path: str, audio_hash: Optional[str] = None) -> str:
+    return TranscriptCache.make_key(audio_hash or hash_audio_file(file_path), SPEECH_MODEL)
+
+
+def _aai():
+    import assemblyai as aai
+    aai.settings.api_key = ASSEMBLYAI_API_KEY
+    return aai
 
-aai.settings.api_key = ASSEMBLYAI_API_KEY
 
 def transcribe_audio(file_path: str) -> str:
     """
     Transcribes an audio file using AssemblyAI SDK.
-    Returns the transcribed text.
+    Returns the transcribed text (served from TRANSCRIPT_CACHE when the same audio was seen before).
     """
 
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Audio file not found: {file_path}")
 
-    config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.universal)
+    cache = TRANSCRIPT_CACHE
+    key = _cache_key(file_path) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    aai = _aai()
+    config = aai.TranscriptionConfig(speech_model=aai.SpeechModel(SPEECH_MODEL))
     transcriber = aai.Transcriber(config=config)
     transcript = transcriber.transcribe(file_path)
 
     if transcript.status == "error":
         raise RuntimeError(f"Transcription failed: {transcript.error}")
 
+    if cache:
+        cache.put(key, transcript.text)
     return transcript.text
+
+# ---------------------- asyncio path ----------------------
+
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _async_client() -> httpx.AsyncClient:
+    """One keep-alive client for every AssemblyAI REST call on the bot loop."""
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None or _ASYNC_CLIENT.is_closed:
+        _ASYNC_CLIENT = httpx.AsyncClient(
+            base_url=ASSEMBLYAI_BASE_URL,
+            headers={"authorization": ASSEMBLYAI_API_KEY or ""},
+            timeout=ASSEMBLYAI_TIMEOUT,
+        )
+    return _ASYNC_CLIENT
+
+
+async def aclose_stt_client() -> None:
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is not None:
+        await _ASYNC_CLIENT.aclose()
+        _ASYNC_CLIENT = None
+
+
+async def _iter_file(file_path: str):
+    """Upload body: disk reads run in a thread so a slow disk never stalls the loop."""
+    f = await asyncio.to_thread(open, file_path, "rb")
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, _UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+async def atranscribe_audio(file_path: str, audio_hash: Optional[str] = None) -> str:
+    """
+    Async variant of transcribe_audio that talks to the AssemblyAI REST API
+    directly (upload → submit → poll), so no thread is held during remote I/O.
+    Long WAV recordings are split at silences and transcribed concurrently (STT_CHUNK_*).
+    Returns the transcribed text (served from TRANSCRIPT_CACHE when the same audio was seen before).
+    `audio_hash` (xxh3-128 of the file, e.g. DownloadStats.xxh3) saves re-reading the file for the cache key.
+    """
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Audio file not found: {file_path}")
+
+    cache = TRANSCRIPT_CACHE
+    key = None
+    if cache:
+        if audio_hash:
+            key = _cache_key(file_path, audio_hash)
+        else:
+            key = await asyncio.to_thread(_cache_key, file_path)
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+
+    text = None
+    if STT_CHUNKING_ENABLED:
+        from core.audio_chunking import atranscribe_chunked  # numpy, only when chunking
+        text = await atranscribe_chunked(
+            file_path,
+            _atranscribe_remote,
+            chunk_s=STT_CHUNK_SECONDS,
+            overlap_s=STT_CHUNK_OVERLAP_SECONDS,
+            fan_out=STT_CHUNK_FANOUT,
+        )
+    if text is None:
+        text = await _atranscribe_remote(file_path)
+    if cache:
+        await asyncio.to_thread(cache.put, key, text)
+    return text
+
+
+async def _atranscribe_remote(file_path: str) -> str:
+    client = _async_client()
+
+    resp = await client.post("/v2/upload", content=_iter_file(file_path))
+    resp.raise_for_status()
+    audio_url = resp.json()["upload_url"]
+
+    resp = await client.post(
+        "/v2/transcript",
+        json={"audio_url": audio_url, "speech_model": SPEECH_MODEL},
+    )
+    resp.raise_for_status()
+    transcript_id = resp.json()["id"]
+
+    deadline = time.monotonic() + ASSEMBLYAI_MAX_WAIT if ASSEMBLYAI_MAX_WAIT > 0 else None
+    while True:
+        resp = await client.get(f"/v2/transcript/{transcript_id}")
+        resp.raise_for_status()
+        body = resp.json()
+        status = body.get("status")
+        if status == "completed":
+            return body.get("text") or ""
+        if status == "error":
+            raise RuntimeError(f"Transcription failed: {body.get('error')}")
+        if deadline is not None and time.monotonic() >= deadline:
+            raise asyncio.TimeoutError(
+                f"Transcription {transcript_id} still {status} after {ASSEMBLYAI_MAX_WAIT:.0f}s"
+            )
+        await asyncio.sleep(ASSEMBLYAI_POLL_INTERVAL)
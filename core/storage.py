@@ -0,0 +1,214 @@
+# core/storage.py
+"""
+On-disk layout and retention for consultation files (audio, transcripts, reports).
+
+    storage = StorageManager(audio_dir, transcript_dir, report_dir, audio_retention_s=7 * 86400)
+    audio_path = storage.path_for("audio", "user_20250101_120000_visit.mp3")
+    transcript_path = storage.write_transcript("user_20250101_120000_visit", text)
+    stats = storage.sweep()            # run periodically (the cog does, off the loop)
+
+- Files go to <root>/YYYY/MM/DD/<2-hex hash of the name>/<name>, so no directory
+  grows without bound and the sweeper only ever lists small directories.
+- Transcripts are written zstandard-compressed (<base>.txt.zst); read_text /
+  write_text pick the codec from the extension, so plain .txt keeps working.
+- sweep() deletes files older than each kind's retention (0 = keep forever),
+  compresses leftover plain transcripts, removes empty shard directories and
+  publishes storage_* gauges to core.metrics.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import xxhash
+import zstandard
+
+from core.metrics import REGISTRY, span
+
+KINDS = ("audio", "transcript", "report")
+ZSTD_SUFFIX = ".zst"
+# In-flight or bookkeeping files the sweeper never touches
+_SKIP_SUFFIXES = (".part", ".tmp")
+_SKIP_NAMES = {"manifest.jsonl"}
+# Empty directories younger than this are left alone: a writer may be about to use them
+_DIR_GRACE_S = 600.0
+
+
+def read_text(path: str) -> str:
+    """Read a transcript written by write_text (compressed or not)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(ZSTD_SUFFIX):
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode("utf-8")
+
+
+def write_text(path: str, text: str, level: int = 3) -> str:
+    """Atomically write text; zstd-compressed when path ends with .zst. Returns path."""
+    data = text.encode("utf-8")
+    if path.endswith(ZSTD_SUFFIX):
+        data = zstandard.ZstdCompressor(level=level).compress(data)
+    return write_bytes(path, data)
+
+
+def write_bytes(path: str, data: bytes) -> str:
+    """Atomically write data (tmp file + rename, so readers never see a partial file). Returns path."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+@dataclass
+class SweepStats:
+    deleted: int = 0
+    freed_bytes: int = 0
+    compressed: int = 0
+    saved_bytes: int = 0
+    files: Dict[str, int] = field(default_factory=dict)
+    bytes: Dict[str, int] = field(default_factory=dict)
+
+
+class StorageManager:
+    def __init__(
+        self,
+        audio_dir: str,
+        transcript_dir: str,
+        report_dir: str,
+        audio_retention_s: float = 0,
+        transcript_retention_s: float = 0,
+        report_retention_s: float = 0,
+        compression_level: int = 3,
+        sharded: bool = True,
+        skip_dirs: Iterable[str] = (),
+    ):
+        # Absolute, so os.walk output compares with skip_dirs whatever the cwd-relative settings say
+        self.roots = {
+            "audio": os.path.abspath(audio_dir),
+            "transcript": os.path.abspath(transcript_dir),
+            "report": os.path.abspath(report_dir),
+        }
+        self.retention_s = {
+            "audio": audio_retention_s,
+            "transcript": transcript_retention_s,
+            "report": report_retention_s,
+        }
+        self.compression_level = compression_level
+        self.sharded = sharded
+        self.skip_dirs = {os.path.abspath(d) for d in skip_dirs}
+        for root in self.roots.values():
+            os.makedirs(root, exist_ok=True)
+
+    # ---------------------- layout ----------------------
+
+    def path_for(self, kind: str, name: str, when: Optional[datetime] = None) -> str:
+        """
+        Where a new file called `name` goes. Only computes the path: writers create
+        the directory when they write (write_bytes, stream_download, save_tidy_docx),
+        so a sweep in between cannot remove it from under them.
+        """
+        root = self.roots[kind]
+        if not self.sharded:
+            return os.path.join(root, name)
+        when = when or datetime.now()
+        shard = xxhash.xxh3_64_hexdigest(name.encode("utf-8"))[:2]
+        return os.path.join(root, when.strftime("%Y"), when.strftime("%m"), when.strftime("%d"), shard, name)
+
+    def transcript_path(self, base: str, when: Optional[datetime] = None) -> str:
+        suffix = ".txt" + (ZSTD_SUFFIX if self.compression_level > 0 else "")
+        return self.path_for("transcript", base + suffix, when)
+
+    def write_transcript(self, base: str, text: str, when: Optional[datetime] = None) -> str:
+        return write_text(self.transcript_path(base, when), text, self.compression_level)
+
+    # ---------------------- sweeper ----------------------
+
+    def _skipped(self, dirpath: str) -> bool:
+        dirpath = os.path.abspath(dirpath)
+        return any(dirpath == d or dirpath.startswith(d + os.sep) for d in self.skip_dirs)
+
+    def _files(self, root: str):
+        """(path, stat) for every managed file under root; skip_dirs are not descended into."""
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not self._skipped(os.path.join(dirpath, d))]
+            for name in filenames:
+                if name in _SKIP_NAMES or name.endswith(_SKIP_SUFFIXES):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    yield path, os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+    def _prune_empty_dirs(self, root: str, now: float) -> None:
+        for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+            if dirpath == root or self._skipped(dirpath):
+                continue
+            try:
+                if now - os.stat(dirpath).st_mtime < _DIR_GRACE_S:
+                    continue
+                os.rmdir(dirpath)  # only succeeds when empty
+            except OSError:
+                pass
+
+    def _compress(self, path: str, size: int) -> int:
+        """Plain transcript -> .zst next to it; returns bytes saved."""
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        target = write_text(path + ZSTD_SUFFIX, text, self.compression_level)
+        st = os.stat(path)
+        os.utime(target, (st.st_atime, st.st_mtime))  # keep the age for retention
+        os.remove(path)
+        return size - os.path.getsize(target)
+
+    def sweep(self, now: Optional[float] = None) -> SweepStats:
+        """
+        Apply retention and compression once. Safe to run while files are being
+        written: in-flight .part/.tmp files are skipped and recently created or
+        modified directories are not pruned.
+        """
+        now = time.time() if now is None else now
+        stats = SweepStats()
+        with span("storage_sweep"):
+            for kind, root in self.roots.items():
+                retention = self.retention_s[kind]
+                files = size_total = 0
+                for path, st in self._files(root):
+                    if retention > 0 and now - st.st_mtime > retention:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            continue
+                        stats.deleted += 1
+                        stats.freed_bytes += st.st_size
+                        continue
+                    size = st.st_size
+                    if kind == "transcript" and self.compression_level > 0 and path.endswith(".txt"):
+                        saved = self._compress(path, size)
+                        stats.compressed += 1
+                        stats.saved_bytes += saved
+                        size -= saved
+                    files += 1
+                    size_total += size
+                self._prune_empty_dirs(root, now)
+                stats.files[kind] = files
+                stats.bytes[kind] = size_total
+        self._publish(stats)
+        return stats
+
+    @staticmethod
+    def _publish(stats: SweepStats) -> None:
+        for kind in KINDS:
+            REGISTRY.set_gauge(f"storage_{kind}_files", stats.files.get(kind, 0))
+            REGISTRY.set_gauge(f"storage_{kind}_bytes", stats.bytes.get(kind, 0))
+        REGISTRY.add_gauge("storage_deleted_files_total", stats.deleted)
+        REGISTRY.add_gauge("storage_freed_bytes_total", stats.freed_bytes)
+        REGISTRY.add_gauge("storage_compressed_files_total", stats.compressed)
+        REGISTRY.add_gauge("storage_compression_saved_bytes_total", stats.saved_bytes)
@@ -0,0 +1,128 @@
+# core/structured_output.py
+"""
+Structured (JSON) report output: LLM_OUTPUT_FORMAT=json.
+
+The model returns one JSON object with an array of strings per section, keyed by
+the Report slot names:
+
+    {"symptoms": ["Dry cough for 3 days"], "diagnosis": [], ..., "disclaimer": ["..."]}
+
+It is decoded with orjson and validated with pydantic, then mapped straight onto
+a core.report.Report — no Markdown stripping, header matching or reordering.
+Identifier lines are still censored. Anything that does not decode or validate
+raises StructuredOutputError and the pipeline falls back to the text prompt.
+"""
+from __future__ import annotations
+import re
+from typing import List, Optional
+
+import orjson
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+from core.report import SECTION_SLOTS, Report, looks_like_patient_info, strip_tokens
+
+# List numbering needs whitespace after it, so "0.5 mg" or "37.8 C" keep their digits
+_ITEM_PREFIX_RE = re.compile(r"^(?:[-•*]\s*|\d+[.)](?:\s+|$))")
+_KEY_RE = re.compile(r'"(%s)"\s*:' % "|".join(SECTION_SLOTS.values()))
+_SLOT_SECTIONS = {slot: section for section, slot in SECTION_SLOTS.items()}
+
+
+class StructuredOutputError(ValueError):
+    """The model's output is not a valid report object."""
+
+
+class ReportPayload(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    symptoms: List[str] = []
+    diagnosis: List[str] = []
+    treatment_plan: List[str] = []
+    doctors_notes: List[str] = []
+    assessment: List[str] = []
+    plan: List[str] = []
+    red_flags: List[str] = []
+    disclaimer: List[str] = []
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _lines(cls, value):
+        # models sometimes give one string (or null) instead of an array
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return value.splitlines()
+        if isinstance(value, list):
+            return [v if isinstance(v, str) else str(v) for v in value if v is not None]
+        return value
+
+
+def _json_object(raw: str) -> bytes:
+    """The outermost {...} of the reply (tolerates code fences or stray prose around it)."""
+    start, end = raw.find("{"), raw.rfind("}")
+    if start < 0 or end < start:
+        raise StructuredOutputError("no JSON object in model output")
+    return raw[start:end + 1].encode("utf-8")
+
+
+def _bullets(items: List[str]) -> List[str]:
+    out: List[str] = []
+    for item in items:
+        for line in item.splitlines():
+            if "<" in line:
+                line = strip_tokens(line)
+            line = _ITEM_PREFIX_RE.sub("", line.strip(), count=1).strip()
+            if line and not looks_like_patient_info(line):
+                out.append("- " + line)
+    return out
+
+
+def parse_structured_report(raw: str) -> Report:
+    """JSON model output -> Report; raises StructuredOutputError when it is not usable."""
+    try:
+        payload = ReportPayload.model_validate(orjson.loads(_json_object(raw)))
+    except orjson.JSONDecodeError as e:
+        raise StructuredOutputError(f"invalid JSON: {e}") from e
+    except ValidationError as e:
+        raise StructuredOutputError(f"invalid report object: {e.error_count()} error(s)") from e
+    sections = {section: _bullets(getattr(payload, slot)) for section, slot in SECTION_SLOTS.items()}
+    if not any(sections.values()):
+        raise StructuredOutputError("report object has no content")
+    return Report(sections)
+
+
+class JsonSectionProgress:
+    """
+    Progress for a streamed JSON report: a section counts as completed once the
+    key of another section has started.
+
+        progress = JsonSectionProgress()
+        done = progress.feed(chunk)   # sections completed by this chunk
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._scan = 0
+        self.sections_seen: List[str] = []
+
+    @property
+    def completed_sections(self) -> List[str]:
+        return self.sections_seen[:-1]
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._text
+
+    def feed(self, chunk: Optional[str]) -> List[str]:
+        if not chunk:
+            return []
+        before = len(self.completed_sections)
+        self._text += chunk
+        for m in _KEY_RE.finditer(self._text, self._scan):
+            section = _SLOT_SECTIONS[m.group(1)]
+            if section not in self.sections_seen:
+                self.sections_seen.append(section)
+            self._scan = m.end()
+        # a key split across chunks is at most this far back
+        self._scan = max(self._scan, len(self._text) - 40)
+        return self.completed_sections[before:]
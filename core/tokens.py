@@ -0,0 +1,73 @@
+# core/tokens.py
+"""
+Token counting and token-budgeted splitting.
+
+Uses tiktoken when its encoding is available; otherwise (e.g. offline hosts
+where the BPE file cannot be downloaded) falls back to a ~4 chars/token estimate.
+"""
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import List
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+@lru_cache(maxsize=1)
+def _encoding(name: str = "cl100k_base"):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def split_by_tokens(text: str, budget: int) -> List[str]:
+    """
+    Split text into chunks of at most `budget` tokens, cutting on sentence or
+    line boundaries (a single oversized sentence is cut on words).
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for sentence in (s.strip() for s in _SENTENCE_RE.split(text)):
+        if not sentence:
+            continue
+        n = count_tokens(sentence)
+        if n > budget:
+            if current:
+                chunks.append(" ".join(current))
+                current, used = [], 0
+            chunks.extend(_split_words(sentence, budget))
+            continue
+        if used + n > budget and current:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+        current.append(sentence)
+        used += n + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _split_words(sentence: str, budget: int) -> List[str]:
+    out: List[str] = []
+    current: List[str] = []
+    used = 0
+    for word in sentence.split():
+        n = count_tokens(word) + 1
+        if used + n > budget and current:
+            out.append(" ".join(current))
+            current, used = [], 0
+        current.append(word)
+        used += n
+    if current:
+        out.append(" ".join(current))
+    return out
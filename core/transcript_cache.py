@@ -0,0 +1,167 @@
+# core/transcript_cache.py
+"""
+Content-addressed transcript cache.
+
+Key   = xxh3-128 of the audio bytes + speech model name.
+Tiers = in-memory LRU  →  on-disk text files under data/transcripts/cache/<2-char shard>/.
+Disk entries are evicted by age (max_age_s) and then oldest-first until the
+store is below max_bytes. put() keeps a running byte total (seeded by the first
+prune), so the directory is only walked when that total exceeds max_bytes or
+prune_interval_s has passed (which also resyncs the total with other processes).
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+import xxhash
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_audio_file(file_path: str) -> str:
+    """Fast, streaming hash of the audio file contents."""
+    h = xxhash.xxh3_128()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TranscriptCache:
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age_s: float = 30 * 24 * 3600,
+        memory_entries: int = 256,
+        prune_interval_s: float = 3600.0,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.memory_entries = memory_entries
+        self.prune_interval_s = prune_interval_s
+        # key -> (text, time of its last disk write/read); memory hits expire with the disk entry
+        self._mem: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None  # unknown until the first prune
+        self._last_prune = 0.0
+
+    @staticmethod
+    def make_key(audio_hash: str, speech_model: str) -> str:
+        return f"{audio_hash}-{speech_model}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.txt")
+
+    def _remember(self, key: str, text: str) -> None:
+        self._mem[key] = (text, time.time())
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if time.time() - hit[1] <= self.max_age_s:
+                    self._mem.move_to_end(key)
+                    return hit[0]
+                del self._mem[key]  # expired: the disk copy is at least as old
+
+        path = self._path(key)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if time.time() - st.st_mtime > self.max_age_s:
+            if _unlink_quiet(path):
+                self._account(-st.st_size)
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # refresh recency for disk eviction
+        except FileNotFoundError:
+            return None  # pruned (here or by another process) since the stat
+        with self._lock:
+            self._remember(key, text)
+        return text
+
+    def _account(self, delta: int) -> None:
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += delta
+
+    def put(self, key: str, text: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = text.encode("utf-8")
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._account(len(data) - replaced)
+        with self._lock:
+            self._remember(key, text)
+            due = (
+                self._disk_bytes is None
+                or self._disk_bytes > self.max_bytes
+                or time.time() - self._last_prune >= self.prune_interval_s
+            )
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Evict expired entries, then the least recently used ones until under max_bytes.
+        Returns the number of files removed."""
+        now = time.time()
+        entries = []
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".txt"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if now - st.st_mtime > self.max_age_s:
+                    removed += _unlink_quiet(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                removed += _unlink_quiet(path)
+                total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+            self._last_prune = now
+            if removed:
+                for key in [k for k in self._mem if not os.path.exists(self._path(k))]:
+                    del self._mem[key]
+        return removed
+
+
+def _unlink_quiet(path: str) -> int:
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
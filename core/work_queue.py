@@ -0,0 +1,193 @@
+# core/work_queue.py
+"""
+Local work queue shared by bot shards (producers) and worker processes (consumers).
+
+A single SQLite file in WAL mode stands in for a real broker: any process on the
+host can enqueue, claim, complete and wait on jobs. Claims are leases, so a job
+held by a worker that died is handed out again after lease_s (up to
+max_attempts times, then marked "error"). heartbeat/complete/fail only apply
+while the caller still holds the lease, so a worker whose job was re-leased or
+cancelled cannot overwrite the outcome.
+
+    q = SQLiteWorkQueue("data/queue.sqlite3")
+    job_id = q.enqueue("consultation", {...})                       # shard
+    job = q.claim("worker-1")                                        # worker
+    q.complete(job.id, "worker-1", {...}) / q.fail(job.id, "worker-1", "...")
+    result = await q.wait(job_id)                                    # shard
+    q.cancel(job_id, "timed out")                                    # shard gave up
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# Job kinds
+CONSULTATION_JOB = "consultation"  # audio → transcript → report → DOCX (see worker.py)
+
+
+class JobFailed(Exception):
+    """The job ended in status "error"; the message is the worker's error."""
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class SQLiteWorkQueue:
+    def __init__(self, path: str, lease_s: float = 600.0, max_attempts: int = 2):
+        self.path = path
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " result TEXT, error TEXT, worker TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL, lease_until REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs(status, id)")
+
+    # ---------------------- producer side ----------------------
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO jobs (kind, payload, created_at) VALUES (?, ?, ?)",
+                (kind, json.dumps(payload), time.time()),
+            )
+            return cur.lastrowid
+
+    def status(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, result, error, attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, result, error, attempts = row
+        return {
+            "status": status,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "attempts": attempts,
+        }
+
+    async def wait(self, job_id: int, poll_s: float = 0.5, timeout_s: Optional[float] = None) -> Dict[str, Any]:
+        """Poll until the job finishes; returns its result or raises JobFailed / asyncio.TimeoutError."""
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while True:
+            st = await asyncio.to_thread(self.status, job_id)
+            if st is None:
+                raise KeyError(job_id)
+            if st["status"] == "done":
+                return st["result"] or {}
+            if st["status"] in ("error", "cancelled"):
+                raise JobFailed(st["error"] or f"job {st['status']}")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise asyncio.TimeoutError(f"job {job_id} still {st['status']}")
+            await asyncio.sleep(poll_s)
+
+    def cancel(self, job_id: int, reason: str) -> bool:
+        """Give up on a job that has not finished; a worker still running it cannot complete it."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', error = ?, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND status IN ('queued', 'running')",
+                (reason, time.time(), job_id),
+            )
+            return cur.rowcount == 1
+
+    # ---------------------- consumer side ----------------------
+
+    def claim(self, worker: str, kind: Optional[str] = None) -> Optional[Job]:
+        """Atomically lease the oldest queued job (or one whose lease expired)."""
+        now = time.time()
+        self._expire_leases(now)
+        kind_sql, args = ("AND kind = ?", (kind,)) if kind else ("", ())
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_until = ?"
+                " WHERE id = (SELECT id FROM jobs WHERE status = 'queued' " + kind_sql +
+                " ORDER BY id LIMIT 1)"
+                " RETURNING id, kind, payload, attempts",
+                (worker, now + self.lease_s, *args),
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(row[0], row[1], json.loads(row[2]), row[3])
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Extend the lease of a job that is still being worked on; False once the lease is lost."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + self.lease_s, job_id, worker),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, result: Dict[str, Any]) -> bool:
+        """Record the result; False (and nothing written) if `worker` no longer holds the lease."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job_id, worker),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """Record an error; False (and nothing written) if `worker` no longer holds the lease."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'error', error = ?, finished_at = ?, lease_until = NULL"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (error, time.time(), job_id, worker),
+            )
+            return cur.rowcount == 1
+
+    def _expire_leases(self, now: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'error' ELSE 'queued' END,"
+                " error = CASE WHEN attempts >= ? THEN 'worker lease expired' ELSE error END,"
+                " lease_until = NULL"
+                " WHERE status = 'running' AND lease_until < ?",
+                (self.max_attempts, self.max_attempts, now),
+            )
+
+    # ---------------------- housekeeping ----------------------
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def prune(self, older_than_s: float) -> int:
+        """Delete finished jobs older than older_than_s."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'error', 'cancelled') AND finished_at < ?",
+                (time.time() - older_than_s,),
+            )
+            return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
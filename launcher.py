@@ -0,0 +1,80 @@
+"""
+Sharded deployment launcher.
+
+    python launcher.py --shard-count 4 --shard-groups 2 --workers 4
+
+Starts one process per shard group (each an AutoShardedBot running its slice of
+the shards) plus worker processes that consume the shared local work queue.
+Shards only download audio and talk to Discord; STT, LLM and DOCX rendering run
+in the workers (PIPELINE_MODE=queue), so capacity grows past one interpreter.
+Pending patient sessions are shared through SQLite (SESSION_STORE_BACKEND=sqlite).
+"""
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+
+def shard_groups(shard_count: int, groups: int):
+    """Split shard ids 0..shard_count-1 into `groups` contiguous, near-equal lists."""
+    groups = max(1, min(groups, shard_count))
+    base, extra = divmod(shard_count, groups)
+    out, start = [], 0
+    for g in range(groups):
+        size = base + (1 if g < extra else 0)
+        out.append(list(range(start, start + size)))
+        start += size
+    return out
+
+
+def _shard_main(shard_ids, shard_count) -> None:
+    import bot
+    bot.run_shards(shard_ids, shard_count)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the bot as shard-group processes + queue workers.")
+    parser.add_argument("--shard-count", type=int, required=True)
+    parser.add_argument("--shard-groups", type=int, default=1, help="bot processes; shards are split between them")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default WORKER_PROCESSES)")
+    parser.add_argument("--worker-concurrency", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    # Children are spawned and read config.settings themselves: set the shared-mode env first
+    os.environ["PIPELINE_MODE"] = "queue"
+    if os.environ.get("SESSION_STORE_BACKEND", "memory") == "memory":
+        os.environ["SESSION_STORE_BACKEND"] = "sqlite"
+
+    from config.settings import WORK_QUEUE_PATH, WORKER_PROCESSES, WORKER_CONCURRENCY
+    import worker
+
+    procs = worker.start_workers(
+        args.workers if args.workers is not None else WORKER_PROCESSES,
+        WORK_QUEUE_PATH,
+        args.worker_concurrency if args.worker_concurrency is not None else WORKER_CONCURRENCY,
+    )
+    ctx = multiprocessing.get_context("spawn")
+    for ids in shard_groups(args.shard_count, args.shard_groups):
+        p = ctx.Process(target=_shard_main, args=(ids, args.shard_count), name=f"medbot-shards-{ids[0]}-{ids[-1]}")
+        p.start()
+        procs.append(p)
+        print(f"[launcher] shards {ids} of {args.shard_count} -> pid {p.pid}", flush=True)
+
+    try:
+        # If any process dies, take the whole deployment down so a supervisor restarts it
+        while all(p.is_alive() for p in procs):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        for p in procs:
+            p.join(timeout=10)
+    return 0 if all(p.exitcode == 0 for p in procs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
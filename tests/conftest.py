@@ -25,19 +25,10 @@ def temp_dirs(monkeypatch):
 
     shutil.rmtree(base, ignore_errors=True)
 
-@pytest.fixture
-def fake_llm(monkeypatch):
-    """
-    Gantikan ChatOpenAI dengan fake class yang memiliki .invoke() -> object dgn .content
-    """
-    class _Msg:
-        def __init__(self, content): self.content = content
-
-    class FakeChatOpenAI:
-        def __init__(self, *args, **kwargs): pass
-        def invoke(self, messages):
-            # kembalikan output tidak berformat markdown, campur token aneh utk menguji pembersihan
-            text = """
+# ---------------------- fake LLM ----------------------
+
+# output tidak berformat markdown, campur token aneh utk menguji pembersihan
+FAKE_REPORT_TEXT = """
 Symptoms
 - Cough
 - Fever
@@ -66,7 +57,97 @@ Disclaimer
 - For clinical use only; may contain transcription errors.
 """
 
-            return _Msg(text)
+class _Msg:
+    def __init__(self, content): self.content = content
+
+class FakeChatOpenAI:
+    """Pengganti ChatOpenAI: .invoke()/.ainvoke() -> object dgn .content (juga dipakai benchmarks/)."""
+    def __init__(self, *args, **kwargs): pass
+    def invoke(self, messages):
+        return _Msg(FAKE_REPORT_TEXT)
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+    async def astream(self, messages):
+        # potongan kecil yg memotong baris di tengah, seperti token dari API
+        text = self.invoke(messages).content
+        for i in range(0, len(text), 7):
+            yield _Msg(text[i:i + 7])
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Gantikan ChatOpenAI dengan FakeChatOpenAI
+    """
     import core.langchain_pipeline as lp
     monkeypatch.setattr(lp, "ChatOpenAI", FakeChatOpenAI)
+    # registry kosong supaya client asli yang sudah di-cache tidak terpakai
+    monkeypatch.setattr(lp, "_LLM_CLIENTS", {})
     return True
+
+# ---------------------- fake speech-to-text ----------------------
+
+_TONE_RATE = 16000
+_TONE_WORDS = {
+    "cough": 300, "fever": 450, "two": 600, "days": 750,
+    "no": 900, "rash": 1050, "take": 1200, "rest": 1350,
+}
+
+def write_tone_wav(path, script):
+    """
+    Tulis WAV sintetis: setiap kata = burst nada dengan frekuensi unik,
+    dipisah hening. `script` = list of (word | None, detik); None = hening.
+    """
+    import wave
+    import numpy as np
+    chunks = []
+    for word, seconds in script:
+        n = int(_TONE_RATE * seconds)
+        if word is None:
+            chunks.append(np.zeros(n))
+        else:
+            t = np.arange(n) / _TONE_RATE
+            chunks.append(0.5 * np.sin(2 * np.pi * _TONE_WORDS[word] * t))
+    pcm = (np.concatenate(chunks) * 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1); w.setsampwidth(2); w.setframerate(_TONE_RATE)
+        w.writeframes(pcm.tobytes())
+    return path
+
+class FakeTranscriber:
+    """Transcriber lokal pengganti AssemblyAI: mengenali kata dari frekuensi nada."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, path):
+        import asyncio
+        import numpy as np
+        from core.audio_chunking import load_pcm, _window_rms
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            pcm = load_pcm(path)
+            rms, win = _window_rms(pcm, 0.02)
+            loud = rms > 0.05 * 32767
+            words, i = [], 0
+            while i < len(loud):
+                if not loud[i]:
+                    i += 1; continue
+                j = i
+                while j < len(loud) and loud[j]:
+                    j += 1
+                seg = pcm.samples[i * win: j * win].astype(float)
+                freq = np.argmax(np.abs(np.fft.rfft(seg))) * pcm.rate / len(seg)
+                words.append(min(_TONE_WORDS, key=lambda w: abs(_TONE_WORDS[w] - freq)))
+                i = j
+            return " ".join(words)
+        finally:
+            self.active -= 1
+
+@pytest.fixture
+def fake_transcriber():
+    return FakeTranscriber(delay=0.01)
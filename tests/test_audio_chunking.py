@@ -0,0 +1,76 @@
+import asyncio
+from core.audio_chunking import (
+    atranscribe_chunked, find_split_points, load_pcm, merge_overlap, stitch_transcripts
+)
+from tests.conftest import write_tone_wav
+
+SCRIPT = [
+    ("cough", 0.4), (None, 0.2), ("fever", 0.4), (None, 1.0),
+    ("two", 0.4), (None, 0.2), ("days", 0.4), (None, 1.0),
+    ("no", 0.4), (None, 0.2), ("rash", 0.4), (None, 1.0),
+    ("take", 0.4), (None, 0.2), ("rest", 0.4), (None, 0.3),
+]
+
+def test_split_points_land_in_silence(tmp_path):
+    pcm = load_pcm(write_tone_wav(str(tmp_path / "a.wav"), SCRIPT))
+    cuts = find_split_points(pcm, chunk_s=2.0)
+    assert cuts
+    # cut pertama harus di jeda panjang setelah "fever" (1.0s .. 2.0s)
+    assert 1.0 <= cuts[0] / pcm.rate <= 2.0
+
+def test_merge_overlap_drops_repeated_words():
+    assert merge_overlap("patient has cough and fever", "and fever for two days") == "for two days"
+    # kata terpotong di tepi overlap
+    assert merge_overlap("cough and fever", "ver for two days") == "ver for two days"
+    assert merge_overlap("cough and fever", "er and fever for two days") == "for two days"
+    assert stitch_transcripts(["a b c", "b c d", "", "c d e"]) == "a b c d e"
+    # one shared word is not enough evidence of overlap ("no" said twice)
+    assert merge_overlap("any rash? no", "no rash at all") == "no rash at all"
+    assert stitch_transcripts(["a b c", "c d"]) == "a b c c d"
+
+def test_merge_overlap_handles_punctuation_and_case():
+    # token counts differ from word counts ("—", "fever,"), which used to disable de-duplication
+    assert merge_overlap("cough and fever.", "And fever, — for two days.") == "— for two days."
+    assert merge_overlap("she said: don't worry", "don't worry. Rest well") == "Rest well"
+    assert merge_overlap("cough", "fever") == "fever"
+
+def test_chunked_transcription_is_ordered_and_parallel(tmp_path, fake_transcriber):
+    path = write_tone_wav(str(tmp_path / "long.wav"), SCRIPT)
+    text = asyncio.run(atranscribe_chunked(path, fake_transcriber, chunk_s=1.5, overlap_s=0.8, fan_out=3))
+    assert text == "cough fever two days no rash take rest"
+    assert fake_transcriber.calls > 1
+    assert 1 < fake_transcriber.peak <= 3
+
+def test_short_or_undecodable_audio_falls_back(tmp_path, fake_transcriber):
+    short = write_tone_wav(str(tmp_path / "short.wav"), SCRIPT[:3])
+    assert asyncio.run(atranscribe_chunked(short, fake_transcriber, chunk_s=10)) is None
+    mp3 = tmp_path / "a.mp3"; mp3.write_bytes(b"ID3")
+    assert asyncio.run(atranscribe_chunked(str(mp3), fake_transcriber)) is None
+
+def test_non_wav_audio_is_decoded_through_ffmpeg(tmp_path, fake_transcriber, monkeypatch):
+    import os
+    import stat
+    import sys
+    # stand-in ffmpeg: the "ogg" is really a 16 kHz mono WAV, dumped as raw s16le
+    fake = tmp_path / "bin" / "ffmpeg"
+    fake.parent.mkdir()
+    fake.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, wave\n"
+        "args = sys.argv[1:]\n"
+        "assert args[args.index('-ar') + 1] == '16000' and args[args.index('-ac') + 1] == '1'\n"
+        "with wave.open(args[args.index('-i') + 1], 'rb') as w:\n"
+        "    sys.stdout.buffer.write(w.readframes(w.getnframes()))\n"
+    )
+    fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+    voice = str(tmp_path / "voice-message.ogg")
+    os.rename(write_tone_wav(str(tmp_path / "src.wav"), SCRIPT), voice)
+
+    monkeypatch.setenv("PATH", str(fake.parent), prepend=os.pathsep)
+    pcm = load_pcm(voice)
+    assert pcm is not None and pcm.rate == 16000 and pcm.channels == 1
+    text = asyncio.run(atranscribe_chunked(voice, fake_transcriber, chunk_s=1.5, overlap_s=0.8, fan_out=3))
+    assert text == "cough fever two days no rash take rest"
+
+    monkeypatch.setenv("PATH", str(tmp_path / "empty"))
+    assert load_pcm(voice) is None  # no ffmpeg: not split
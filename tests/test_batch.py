@@ -0,0 +1,30 @@
+import asyncio
+import json
+import os
+from batch import run_batch, load_manifest, MANIFEST_NAME
+
+def test_batch_regenerates_transcripts_and_resumes(temp_dirs, fake_llm):
+    src = temp_dirs["transcripts"]
+    for i in range(3):
+        with open(os.path.join(src, f"user_2025010{i + 1}_120000_a{i}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Patient {i} reports cough.")
+    # file di cache transcript tidak ikut diproses
+    os.makedirs(os.path.join(src, "cache", "ab"))
+    with open(os.path.join(src, "cache", "ab", "x.txt"), "w") as f:
+        f.write("cached")
+    out = temp_dirs["reports"]
+
+    first = asyncio.run(run_batch("transcripts", src, out, render_workers=1))
+    assert (first.total, first.done, first.failed) == (3, 3, 0)
+    assert sorted(os.listdir(out)) == sorted(
+        [MANIFEST_NAME] + [f"user_2025010{i + 1}_120000_a{i}.docx" for i in range(3)]
+    )
+    assert len(load_manifest(os.path.join(out, MANIFEST_NAME))) == 3
+
+    # jalankan ulang: semua sudah selesai menurut manifest
+    second = asyncio.run(run_batch("transcripts", src, out, render_workers=1))
+    assert second.total == 0
+
+    with open(os.path.join(out, MANIFEST_NAME), encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert all(r["status"] == "done" for r in records)
@@ -0,0 +1,32 @@
+import json
+from benchmarks import suite
+
+def test_synthetic_inputs_hit_requested_size():
+    for size in (1024, 10 * 1024):
+        assert len(suite.llm_output_of_size(size)) == size
+        assert len(suite.transcript_of_size(size)) == size
+
+def test_run_suite_smoke_includes_end_to_end():
+    res = suite.run_suite([1], only=["ensure_section_order", "end_to_end"], budget_s=0.01, log=lambda *_: None)
+    assert set(res) == {"ensure_section_order@1KB", "end_to_end@1KB"}
+    for r in res.values():
+        assert r["seconds"] > 0 and r["peak_kib"] > 0
+
+def test_compare_flags_regressions_and_scales_by_host_speed():
+    base = {"x@1KB": {"seconds": 1.0, "peak_kib": 100.0}}
+    assert suite.compare({"x@1KB": {"seconds": 1.2, "peak_kib": 100.0}}, base, 0.25) == []
+    msgs = suite.compare({"x@1KB": {"seconds": 1.5, "peak_kib": 200.0}}, base, 0.25)
+    assert len(msgs) == 2
+    # host 2x slower than when the baseline was recorded -> 1.5s is fine
+    assert suite.compare({"x@1KB": {"seconds": 1.5, "peak_kib": 100.0}}, base, 0.25, speed_ratio=2.0) == []
+
+def test_main_saves_baseline_then_fails_on_regression(tmp_path, monkeypatch):
+    path = str(tmp_path / "baseline.json")
+    argv = ["--sizes", "1", "--only", "censor_patient_lines", "--baseline", path]
+    assert suite.main(argv + ["--save"]) == 0
+    data = json.loads(open(path).read())
+    assert "censor_patient_lines@1KB" in data["results"] and data["calibration_s"] > 0
+
+    data["results"]["censor_patient_lines@1KB"]["seconds"] = 1e-9
+    open(path, "w").write(json.dumps(data))
+    assert suite.main(argv) == 1
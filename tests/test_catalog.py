@@ -0,0 +1,54 @@
+import os
+import sqlite3
+from core.catalog import ConsultationCatalog, ConsultationRecord
+
+def _record(ts, clinician="1", patient="P-1", **kw):
+    return ConsultationRecord(created_at=ts, clinician_id=clinician, clinician="Dr " + clinician,
+                              patient_id=patient, **kw)
+
+def test_writes_are_batched_and_reads_see_pending_records(tmp_path):
+    path = str(tmp_path / "catalog.sqlite3")
+    catalog = ConsultationCatalog(path, batch_size=3)
+    catalog.add(_record(1.0, audio_hash="abc", timings={"stt": 1.23456, "llm": 2.0}))
+    catalog.add(_record(2.0, clinician="2"))
+    # nothing committed yet: another connection sees an empty table
+    other = sqlite3.connect(path)
+    assert other.execute("SELECT COUNT(*) FROM consultations").fetchone()[0] == 0
+    catalog.add(_record(3.0, patient="P-2"))  # third record fills the batch
+    assert other.execute("SELECT COUNT(*) FROM consultations").fetchone()[0] == 3
+
+    catalog.add(_record(4.0))
+    rows = catalog.history("P-1")  # flushes the pending record first
+    assert [r.created_at for r in rows] == [4.0, 2.0, 1.0]
+    assert [r.created_at for r in catalog.history("P-1", clinician_id="1")] == [4.0, 1.0]
+    first = rows[-1]
+    assert first.audio_hash == "abc" and first.timings == {"stt": 1.2346, "llm": 2.0}
+    assert catalog.get(first.id).created_at == 1.0
+    assert catalog.latest("1").created_at == 4.0 and catalog.latest("9") is None
+    other.close()
+    catalog.close()
+
+def test_close_flushes_and_catalog_reopens(tmp_path):
+    path = str(tmp_path / "catalog.sqlite3")
+    catalog = ConsultationCatalog(path, batch_size=100)
+    record = _record(5.0, report_path=os.path.join(str(tmp_path), "r.docx"))
+    catalog.add(record)
+    catalog.close()
+    assert record.id == 1
+    reopened = ConsultationCatalog(path)
+    assert len(reopened) == 1 and reopened.get(1).report_path.endswith("r.docx")
+    reopened.close()
+
+def test_add_does_not_wait_for_a_commit_in_progress(tmp_path):
+    import threading
+    catalog = ConsultationCatalog(str(tmp_path / "catalog.sqlite3"), batch_size=100)
+    catalog._lock.acquire()  # as if a flush were committing
+    try:
+        t = threading.Thread(target=catalog.add, args=(_record(1.0),))
+        t.start()
+        t.join(timeout=2)
+        assert not t.is_alive()
+    finally:
+        catalog._lock.release()
+    assert len(catalog) == 1
+    catalog.close()
@@ -0,0 +1,58 @@
+import logging
+import core.langchain_pipeline as lp
+from core.compaction import compact_transcript, remove_disfluencies
+from core.metrics import REGISTRY
+
+TRANSCRIPT = """Doctor: Good morning. How are you today?
+Patient: Um, I'm fine, thanks. Well, uh, I I have had a a cough for, you know, three days.
+Doctor: Okay. Okay. Any fever?
+Patient: Yes. I went to the ER yesterday. I went to the ER yesterday.
+Doctor: The weather has been lovely lately, has it not.
+Patient: The weather has been lovely lately, has it not. Hmm.
+Doctor: Take paracetamol 500 mg. Thank you so much doctor."""
+
+def test_removes_fillers_stutters_and_repeats():
+    assert remove_disfluencies("Um, I I have, you know, a cough.") == "I have a cough."
+    assert remove_disfluencies("Mm-hmm, 10 10 is the reading.") == "Mm-hmm, 10 10 is the reading."
+    out = compact_transcript(TRANSCRIPT)
+    assert "Patient: I'm fine, thanks. Well, I have had a cough for three days." in out.text
+    assert "Doctor: Okay. Any fever?" in out.text
+    assert out.text.count("ER yesterday") == 1 and out.text.count("lovely") == 1
+    # a speaker turn left empty disappears with its label
+    assert "Patient: Yes." in out.text and out.text.count("\n") == 5
+    assert 0 < out.tokens_after < out.tokens_before and out.trimmed_sentences == 0
+
+def test_keeps_deliberate_repeats_and_clinical_labels():
+    assert remove_disfluencies("No no, the pain is on the left.") == "No no, the pain is on the left."
+    assert remove_disfluencies("Take it twice twice daily.") == "Take it twice twice daily."
+    out = compact_transcript("Doctor: Allergies: none.\nMedications: none.\nBP: 120 over 80.")
+    # "Allergies:" / "Medications:" are not speakers, so the two answers are not duplicates
+    assert out.text == "Doctor: Allergies: none.\nMedications: none.\nBP: 120 over 80."
+
+def test_budget_trims_small_talk_first_and_keeps_clinical_lines():
+    full = compact_transcript(TRANSCRIPT)
+    out = compact_transcript(TRANSCRIPT, budget_tokens=full.tokens_after - 10)
+    assert out.trimmed_sentences > 0 and out.tokens_after < full.tokens_after
+    assert "How are you today" not in out.text and "Thank you" not in out.text
+    assert "lovely" in out.text  # general chatter goes only after small talk
+    # the answer to a question stays with it; clinical lines are never trimmed
+    tiny = compact_transcript(TRANSCRIPT, budget_tokens=1)
+    for kept in ("cough for three days", "Any fever?", "Patient: Yes.", "paracetamol 500 mg"):
+        assert kept in tiny.text
+    assert "lovely" not in tiny.text
+
+def test_pipeline_sends_compacted_transcript_and_logs_savings(fake_llm, monkeypatch, caplog):
+    seen = []
+    monkeypatch.setattr(lp, "REPORT_CACHE", None)
+    monkeypatch.setattr(lp, "_compact", lambda t, _c=lp._compact: seen.append(_c(t)) or seen[-1])
+    REGISTRY.reset()
+    with caplog.at_level(logging.INFO, logger="core.langchain_pipeline"):
+        lp.generate_medical_report(TRANSCRIPT)
+    assert seen == [compact_transcript(TRANSCRIPT, lp.TRANSCRIPT_TOKEN_BUDGET).text]
+    assert "transcript compacted" in caplog.text
+    gauges = REGISTRY.snapshot()["gauges"]
+    assert gauges["transcript_tokens_saved_total"] > 0
+
+    monkeypatch.setattr(lp, "TRANSCRIPT_COMPACTION_ENABLED", False)
+    assert lp.generate_medical_report(TRANSCRIPT)  # still works with compaction off
+    assert seen[-1] == TRANSCRIPT
@@ -21,3 +21,80 @@ def test_canonical_section_aliases_basic():
     assert _canonical_section("treatment plan", sections) == "Prescription / Treatment Plan"
     assert _canonical_section("Doctor's notes:", sections) == "Doctor's Notes"
     assert _canonical_section("warning signs", sections) == "Red Flags"
+
+def test_progress_message_is_rate_limited_and_flushes_last_state():
+    import asyncio
+    from cogs.consultation import _ProgressMessage
+
+    class FakeMessage:
+        def __init__(self): self.edits = []
+        async def edit(self, content): self.edits.append(content)
+
+    class FakeChannel:
+        def __init__(self): self.msg = FakeMessage()
+        async def send(self, content): return self.msg
+
+    async def main():
+        ch = FakeChannel()
+        progress = _ProgressMessage(ch, interval=60, total=8)
+        await progress.start()
+        await progress.update(["Symptoms"])
+        await progress.update(["Symptoms", "Diagnosis"])
+        assert ch.msg.edits == []          # inside the interval: no edit yet
+        await progress.flush()
+        assert len(ch.msg.edits) == 1 and "(2/8 sections)" in ch.msg.edits[0]
+        await progress.flush()
+        assert len(ch.msg.edits) == 1      # unchanged content is not re-sent
+    asyncio.run(main())
+
+def test_report_persist_policy(tmp_path, monkeypatch):
+    import asyncio
+    import os
+    import cogs.consultation as cog_module
+    from core.catalog import ConsultationRecord
+
+    cog = Consultation.__new__(Consultation)
+    cog._persist_tasks = set()
+
+    async def persist(policy, name):
+        monkeypatch.setattr(cog_module, "REPORT_PERSIST", policy)
+        path = str(tmp_path / name)
+        job = ConsultationRecord(0.0, "1", "Dr", "P-1", report_path=path)
+        await cog._persist_report(path, b"docx-bytes", job)
+        written_before_return = os.path.exists(path)
+        await asyncio.gather(*cog._persist_tasks)
+        return job, path, written_before_return
+
+    job, path, _ = asyncio.run(persist("async", "a.docx"))
+    assert open(path, "rb").read() == b"docx-bytes" and not cog._persist_tasks
+    job, path, written = asyncio.run(persist("sync", "s.docx"))
+    assert written
+    job, path, written = asyncio.run(persist("off", "o.docx"))
+    assert not written and job.report_path == "" and not (tmp_path / "o.docx").exists()
+
+def test_failed_report_write_clears_report_path(tmp_path, monkeypatch):
+    import asyncio
+    import cogs.consultation as cog_module
+    from core.catalog import ConsultationCatalog, ConsultationRecord
+
+    cog = Consultation.__new__(Consultation)
+    cog._persist_tasks = set()
+    cog.catalog = ConsultationCatalog(str(tmp_path / "catalog.sqlite3"), batch_size=1)
+    (tmp_path / "not-a-dir").write_bytes(b"")
+    unwritable = str(tmp_path / "not-a-dir" / "r.docx")
+
+    async def persist(policy, written_first):
+        monkeypatch.setattr(cog_module, "REPORT_PERSIST", policy)
+        job = ConsultationRecord(0.0, "1", "Dr", "P-1", report_path=unwritable)
+        if written_first:
+            cog.catalog.add(job)  # already committed when the write fails
+        error = await cog._persist_report(unwritable, b"docx-bytes", job)
+        while cog._persist_tasks:
+            await asyncio.gather(*cog._persist_tasks, return_exceptions=True)
+        return job, error
+
+    job, error = asyncio.run(persist("sync", False))
+    assert isinstance(error, OSError) and job.report_path == ""
+    job, error = asyncio.run(persist("async", True))
+    assert error is None and job.report_path == ""
+    assert cog.catalog.get(job.id).report_path == ""
@@ -29,3 +29,25 @@ def test_save_tidy_docx_creates_file_with_sections(temp_dirs):
     assert "Medical Consultation Report" in full
     assert "Patient Name: Jane" in full
     assert "Date of Consultation:" in full
+
+def test_save_tidy_docx_reuses_template_and_grows_rows(temp_dirs):
+    from core.docx_renderer import report_template_bytes, REPORT_MIN_ROWS
+    assert report_template_bytes() is report_template_bytes()
+
+    text = "Symptoms\n" + "\n".join(f"- finding {i}" for i in range(10))
+    first = os.path.join(temp_dirs["reports"], "long_20250101_120000_a.docx")
+    save_tidy_docx(report_text=text, report_path=first, patient_name="A", patient_id="P-1")
+    second = os.path.join(temp_dirs["reports"], "short_20250101_120000_a.docx")
+    save_tidy_docx(report_text="Symptoms\n- Fever", report_path=second, patient_name="B", patient_id="P-2")
+
+    doc = Document(first)
+    symptoms = [r.cells[0].text for r in doc.tables[0].rows]
+    assert symptoms[0] == "Symptoms"
+    assert symptoms[1:] == [f"finding {i}" for i in range(10)]
+
+    # dokumen kedua tidak membawa sisa isi dokumen pertama
+    doc2 = Document(second)
+    rows2 = [r.cells[0].text for r in doc2.tables[0].rows]
+    assert len(rows2) == 1 + REPORT_MIN_ROWS["Symptoms"]
+    assert rows2[1] == "Fever" and "finding 0" not in rows2
+    assert "Patient Name: B" in "\n".join(p.text for p in doc2.paragraphs)
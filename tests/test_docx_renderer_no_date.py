@@ -35,3 +35,10 @@ def test_save_tidy_docx_uses_fallback_date_when_filename_has_no_timestamp(temp_d
     assert "Medical Consultation Report" in full
     assert "Patient Name: Jane" in full
     assert "Date of Consultation: [Date not available]" in full
+
+def test_save_tidy_docx_prefers_explicit_consultation_date(temp_dirs):
+    from datetime import datetime
+    report_path = os.path.join(temp_dirs["reports"], "user_20250101_120000_audio.docx")
+    save_tidy_docx("Plan\n- Rest", report_path, "Tester", "Jane", "P-1", consulted_at=datetime(2025, 3, 4, 9, 30))
+    full = "\n".join(p.text for p in Document(report_path).paragraphs)
+    assert "Date of Consultation: 04 March 2025" in full
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import aiohttp
+import pytest
+from aiohttp import web
+from core.download import stream_download, DownloadError, DownloadTooLarge
+from core.transcript_cache import hash_audio_file
+
+PAYLOAD = b"x" * (300 * 1024)
+
+async def _with_server(fn):
+    async def audio(request):
+        return web.Response(body=PAYLOAD)
+    async def streamed(request):
+        # tanpa Content-Length: batas ukuran harus dicek saat streaming
+        resp = web.StreamResponse()
+        await resp.prepare(request)
+        for _ in range(3):
+            await resp.write(PAYLOAD)
+        await resp.write_eof()
+        return resp
+    app = web.Application()
+    app.router.add_get("/audio.wav", audio)
+    app.router.add_get("/streamed.wav", streamed)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        async with aiohttp.ClientSession() as session:
+            return await fn(session, f"http://127.0.0.1:{port}")
+    finally:
+        await runner.cleanup()
+
+def test_stream_download_writes_file_and_reports_throughput(tmp_path):
+    dest = str(tmp_path / "a.wav")
+    stats = asyncio.run(_with_server(
+        lambda s, base: stream_download(s, f"{base}/audio.wav", dest, max_bytes=10 * 1024 * 1024, chunk_size=64 * 1024)
+    ))
+    assert stats.bytes == len(PAYLOAD)
+    assert open(dest, "rb").read() == PAYLOAD
+    assert stats.mb_per_s > 0
+    assert stats.xxh3 == hash_audio_file(dest)
+    assert not os.path.exists(dest + ".part")
+
+def test_stream_download_batches_writes(tmp_path, monkeypatch):
+    import core.download as download
+    writes = []
+    real_to_thread = asyncio.to_thread
+    async def counting_to_thread(fn, *args, **kw):
+        if getattr(fn, "__name__", "") == "write":
+            writes.append(len(args[0]))
+        return await real_to_thread(fn, *args, **kw)
+    monkeypatch.setattr(download.asyncio, "to_thread", counting_to_thread)
+    dest = str(tmp_path / "nested" / "a.wav")
+    stats = asyncio.run(_with_server(
+        lambda s, base: stream_download(s, f"{base}/audio.wav", dest, max_bytes=len(PAYLOAD),
+                                        chunk_size=16 * 1024, write_batch=128 * 1024)
+    ))
+    assert open(dest, "rb").read() == PAYLOAD and stats.xxh3 == hash_audio_file(dest)
+    assert sum(writes) == len(PAYLOAD) and len(writes) == 3  # 128 + 128 + 44 KiB
+
+def test_stream_download_enforces_max_size_without_leaving_files(tmp_path):
+    dest = str(tmp_path / "big.wav")
+    with pytest.raises(DownloadTooLarge):
+        asyncio.run(_with_server(
+            lambda s, base: stream_download(s, f"{base}/streamed.wav", dest, max_bytes=len(PAYLOAD))
+        ))
+    assert os.listdir(tmp_path) == []
+
+def test_stream_download_raises_on_http_error(tmp_path):
+    dest = str(tmp_path / "missing.wav")
+    with pytest.raises(DownloadError):
+        asyncio.run(_with_server(
+            lambda s, base: stream_download(s, f"{base}/nope.wav", dest, max_bytes=1024)
+        ))
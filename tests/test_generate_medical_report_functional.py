@@ -1,4 +1,5 @@
-from core.langchain_pipeline import generate_medical_report
+import asyncio
+from core.langchain_pipeline import generate_medical_report, agenerate_medical_report
 
 def test_generate_medical_report_normalizes_and_censors(fake_llm):
     transcript = "Patient says coughing and fever for 2 days."
@@ -13,3 +14,21 @@ def test_generate_medical_report_normalizes_and_censors(fake_llm):
     assert "<|" not in out and "patient name:" not in out.lower()
     # Bullet menggunakan '-' (bukan '•')
     assert "•" not in out
+
+def test_agenerate_medical_report_matches_sync(fake_llm):
+    transcript = "Patient says coughing and fever for 2 days."
+    out = asyncio.run(agenerate_medical_report(transcript))
+    assert out == generate_medical_report(transcript)
+
+def test_astream_medical_report_matches_and_reports_progress(fake_llm):
+    from core.langchain_pipeline import astream_medical_report
+    transcript = "Patient says coughing and fever for 2 days."
+    seen = []
+    async def on_progress(sections):
+        seen.append(list(sections))
+    out = asyncio.run(astream_medical_report(transcript, on_progress=on_progress))
+    assert out == generate_medical_report(transcript)
+    # progress grows section by section and ends with every section
+    assert seen[0] == ["Symptoms"]
+    assert all(len(a) <= len(b) for a, b in zip(seen, seen[1:]))
+    assert seen[-1][-1] == "Disclaimer"
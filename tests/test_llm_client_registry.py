@@ -0,0 +1,16 @@
+import core.langchain_pipeline as lp
+from core.langchain_pipeline import get_llm
+
+def test_get_llm_reuses_client_per_key(fake_llm):
+    a = get_llm("model-a", "http://localhost/v1", 0.2)
+    b = get_llm("model-a", "http://localhost/v1", 0.2)
+    c = get_llm("model-a", "http://localhost/v1", 0.7)
+    d = get_llm("model-a", "http://localhost/v1", 0.2, api_key="other-key")
+    assert a is b
+    assert a is not c and a is not d
+    assert len(lp._LLM_CLIENTS) == 3
+
+def test_generate_medical_report_uses_single_client(fake_llm):
+    lp.generate_medical_report("cough")
+    lp.generate_medical_report("fever")
+    assert len(lp._LLM_CLIENTS) == 1
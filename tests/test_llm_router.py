@@ -0,0 +1,189 @@
+import asyncio
+import json
+import time
+import pytest
+from aiohttp import web
+from langchain_core.messages import HumanMessage
+from core.llm_router import (
+    AllRoutesFailed, CircuitBreaker, Endpoint, LLMRouter, is_transient, parse_routes
+)
+
+# ---------------------- fake OpenAI-compatible server ----------------------
+
+class FakeProvider:
+    def __init__(self, name, fail=0, status=500, delay=0.0):
+        self.name, self.fail, self.status, self.delay = name, fail, status, delay
+        self.requests = 0
+
+    async def handle(self, request):
+        self.requests += 1
+        body = await request.json()
+        await asyncio.sleep(self.delay)
+        if self.fail < 0 or self.requests <= self.fail:
+            return web.json_response({"error": {"message": "upstream down"}}, status=self.status)
+        content = f"Symptoms\n- answered by {self.name}\n"
+        if body.get("stream"):
+            resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await resp.prepare(request)
+            for piece in (content[:9], content[9:]):
+                chunk = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await resp.write(b"data: [DONE]\n\n")
+            await resp.write_eof()
+            return resp
+        return web.json_response({
+            "id": "c", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+async def _with_providers(providers, fn):
+    app = web.Application()
+    for p in providers:
+        app.router.add_post(f"/{p.name}/v1/chat/completions", p.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await fn(f"http://127.0.0.1:{port}")
+    finally:
+        await runner.cleanup()
+
+def _router(base, names, models=None, **kw):
+    from langchain_openai import ChatOpenAI
+    clients = {}
+    def client_for(ep):
+        if ep not in clients:
+            clients[ep] = ChatOpenAI(model=ep.model, base_url=ep.base_url, api_key="test", max_retries=0, timeout=5)
+        return clients[ep]
+    models = models or ["fake-model"] * len(names)
+    routes = [Endpoint(m, f"{base}/{n}/v1") for m, n in zip(models, names)]
+    kw.setdefault("backoff_base_s", 0.01)
+    kw.setdefault("backoff_max_s", 0.02)
+    return LLMRouter(routes, client_for, **kw)
+
+MESSAGES = [HumanMessage(content="transcript")]
+
+# ---------------------- tests ----------------------
+
+def test_retries_transient_errors_with_backoff():
+    a = FakeProvider("a", fail=2)
+    async def run(base):
+        return await _router(base, ["a"], retry_attempts=3).ainvoke(MESSAGES)
+    out = asyncio.run(_with_providers([a], run))
+    assert "answered by a" in out.content and a.requests == 3
+
+def test_fails_over_to_next_route_and_breaker_skips_dead_provider():
+    a, b = FakeProvider("a", fail=-1), FakeProvider("b")
+    async def run(base):
+        router = _router(base, ["a", "b"], retry_attempts=2, breaker_failures=2, breaker_reset_s=60)
+        first = await router.ainvoke(MESSAGES)
+        second = await router.ainvoke(MESSAGES)
+        return router, first, second
+    router, first, second = asyncio.run(_with_providers([a, b], run))
+    assert "answered by b" in first.content and "answered by b" in second.content
+    assert a.requests == 2  # breaker opened after two failures; second call never reached a
+    assert router.stats()[router.routes[0].provider] == CircuitBreaker.OPEN
+
+def test_non_transient_errors_are_not_retried():
+    a, b = FakeProvider("a", fail=-1, status=401), FakeProvider("b")
+    async def run(base):
+        return await _router(base, ["a", "b"], retry_attempts=3).ainvoke(MESSAGES)
+    out = asyncio.run(_with_providers([a, b], run))
+    assert "answered by b" in out.content and a.requests == 1
+
+def test_hedged_request_beats_slow_primary():
+    a, b = FakeProvider("a", delay=2.0), FakeProvider("b")
+    async def run(base):
+        t0 = time.perf_counter()
+        out = await _router(base, ["a", "b"], hedge_after_s=0.1).ainvoke(MESSAGES)
+        return out, time.perf_counter() - t0
+    out, elapsed = asyncio.run(_with_providers([a, b], run))
+    assert "answered by b" in out.content and elapsed < 1.5
+
+def test_stream_fails_over_before_first_chunk():
+    a, b = FakeProvider("a", fail=-1), FakeProvider("b")
+    async def run(base):
+        router = _router(base, ["a", "b"], retry_attempts=1)
+        return "".join([c.content async for c in router.astream(MESSAGES)])
+    assert asyncio.run(_with_providers([a, b], run)) == "Symptoms\n- answered by b\n"
+
+def test_all_routes_failing_raises():
+    a = FakeProvider("a", fail=-1)
+    async def run(base):
+        return await _router(base, ["a"], retry_attempts=2).ainvoke(MESSAGES)
+    with pytest.raises(AllRoutesFailed):
+        asyncio.run(_with_providers([a], run))
+
+def test_pipeline_generates_through_router(monkeypatch):
+    import core.langchain_pipeline as lp
+    a, b = FakeProvider("a", fail=-1), FakeProvider("b")
+    async def run(base):
+        monkeypatch.setattr(lp, "_ROUTER", _router(base, ["a", "b"], retry_attempts=1))
+        monkeypatch.setattr(lp, "REPORT_CACHE", None)
+        return await lp.agenerate_medical_report("Patient reports cough.")
+    out = asyncio.run(_with_providers([a, b], run))
+    assert out.startswith("Symptoms\n- answered by b\n")
+
+def test_reports_from_a_fallback_model_are_not_cached(monkeypatch):
+    import core.langchain_pipeline as lp
+    from core.report_cache import MemoryReportCache
+    a, b = FakeProvider("a", fail=-1), FakeProvider("b")
+    cache = MemoryReportCache()
+    async def run(base):
+        router = _router(base, ["a", "b"], models=["fake-model", "backup-model"], retry_attempts=1)
+        monkeypatch.setattr(lp, "_ROUTER", router)
+        monkeypatch.setattr(lp, "REPORT_CACHE", cache)
+        served = await lp.agenerate_medical_report("Patient reports cough.")
+        tagged = await router.ainvoke(MESSAGES)
+        a.fail = 0
+        router.breakers[router.routes[0].provider].record_success()
+        await lp.agenerate_medical_report("Patient reports cough.")  # primary answers: stored
+        cached = await lp.agenerate_medical_report("Patient reports cough.")
+        return served, tagged, cached
+    served, tagged, cached = asyncio.run(_with_providers([a, b], run))
+    assert "answered by b" in served
+    assert tagged.response_metadata["llm_fallback"]
+    assert tagged.response_metadata["llm_route"].startswith("backup-model@")
+    assert "answered by a" in cached
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_breaker_half_open_and_route_parsing(monkeypatch):
+    br = CircuitBreaker(failure_threshold=1, reset_s=0)
+    br.record_failure()
+    assert br.state == CircuitBreaker.OPEN
+    assert br.allow() and br.state == CircuitBreaker.HALF_OPEN
+    br.record_success()
+    assert br.state == CircuitBreaker.CLOSED
+
+    monkeypatch.setenv("OTHER_KEY", "k2")
+    routes = parse_routes("m1, m2@https://x/v1#OTHER_KEY", "https://default/v1", "k1")
+    assert routes == [Endpoint("m1", "https://default/v1", "k1"), Endpoint("m2", "https://x/v1", "k2")]
+    assert is_transient(asyncio.TimeoutError()) and not is_transient(ValueError())
+
+def test_untried_backup_keeps_its_breaker_and_takes_over_when_primary_fails():
+    a, b = FakeProvider("a"), FakeProvider("b")
+    async def run(base):
+        router = _router(base, ["a", "b"], retry_attempts=1, breaker_failures=1, breaker_reset_s=0.2)
+        router.breakers[router.routes[1].provider].record_failure()  # backup tripped
+        await asyncio.sleep(0.25)
+        first = await router.ainvoke(MESSAGES)  # primary healthy: backup is never consulted
+        state = router.stats()[router.routes[1].provider]
+        a.fail = -1
+        second = await router.ainvoke(MESSAGES)
+        return first, state, second
+    first, state, second = asyncio.run(_with_providers([a, b], run))
+    assert "answered by a" in first.content and state == CircuitBreaker.OPEN
+    assert "answered by b" in second.content and b.requests == 1
+
+def test_half_open_trial_that_never_reports_back_expires():
+    br = CircuitBreaker(failure_threshold=1, reset_s=0.05)
+    br.record_failure()
+    time.sleep(0.06)
+    assert br.ready() and br.allow() and br.state == CircuitBreaker.HALF_OPEN
+    assert not br.ready() and not br.allow()  # one trial at a time
+    time.sleep(0.06)
+    assert br.allow()  # the lost trial expired; another one is let through
@@ -0,0 +1,56 @@
+import asyncio
+import re
+import core.langchain_pipeline as lp
+from core.tokens import count_tokens, split_by_tokens
+
+class _Msg:
+    def __init__(self, content): self.content = content
+
+class PartEchoLLM:
+    """Fake LLM: setiap part menghasilkan bullet unik + satu bullet yang sama (utk uji dedup)."""
+    def __init__(self):
+        self.calls = 0
+    def invoke(self, messages):
+        self.calls += 1
+        part = re.search(r"PART (\d+) of (\d+)", messages[0].content).group(1)
+        return _Msg(f"Symptoms\n- finding {part}\nPlan\n- Rest\nDisclaimer\n- None reported.\n")
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+def test_split_by_tokens_respects_budget():
+    text = " ".join(f"Sentence number {i} about cough." for i in range(200))
+    chunks = split_by_tokens(text, 50)
+    assert len(chunks) > 1
+    assert all(count_tokens(c) <= 50 for c in chunks)
+    assert " ".join(chunks) == text
+
+def test_map_reduce_merges_sections_in_order(monkeypatch):
+    llm = PartEchoLLM()
+    monkeypatch.setattr(lp, "_LLM_CLIENTS", {})
+    monkeypatch.setattr(lp, "get_llm", lambda *a, **k: llm)
+    monkeypatch.setattr(lp, "MAP_REDUCE_THRESHOLD_TOKENS", 100)
+    monkeypatch.setattr(lp, "MAP_REDUCE_CHUNK_TOKENS", 60)
+    transcript = " ".join(f"Patient reports symptom {i} today." for i in range(60))
+
+    out = lp.generate_medical_report(transcript)
+    assert llm.calls > 1
+    symptoms = out.split("Symptoms\n", 1)[1].split("\n\n", 1)[0].splitlines()
+    assert symptoms == [f"- finding {i}" for i in range(1, llm.calls + 1)]
+    assert out.count("- Rest") == 1
+    assert "Diagnosis\n- None reported." in out
+    assert asyncio.run(lp.agenerate_medical_report(transcript)) == out
+
+def test_reduce_collapses_disclaimers_and_near_duplicates():
+    from core.report import Report, SECTIONS
+    def report(sections):
+        return Report({s: sections.get(s, []) for s in SECTIONS})
+    partials = [
+        report({"Symptoms": ["- Dry cough", "- Fever"], "Plan": ["- Rest"],
+                "Disclaimer": ["- May contain transcription errors; for clinical use only."]}),
+        report({"Symptoms": ["- dry cough.", "- Fever since Monday"], "Plan": ["- Rest and fluids", "- Rest"],
+                "Disclaimer": ["- Transcript may contain errors. Clinical use only."]}),
+    ]
+    merged = lp._reduce_sections(partials)
+    assert merged["Symptoms"] == ["- Dry cough", "- Fever since Monday"]
+    assert merged["Plan"] == ["- Rest and fluids"]
+    assert merged["Disclaimer"] == ["- May contain transcription errors; for clinical use only."]
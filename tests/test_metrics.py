@@ -0,0 +1,61 @@
+import asyncio
+import json
+from core.metrics import MetricsRegistry, span, timed, profile_job
+
+def test_span_records_sync_and_async_samples():
+    reg = MetricsRegistry()
+    with span("stt", reg) as timer:
+        pass
+    assert timer.seconds > 0
+    async def main():
+        async with span("stt", reg):
+            await asyncio.sleep(0)
+    asyncio.run(main())
+    snap = reg.snapshot()["stages"]["stt"]
+    assert snap["count"] == 2
+    assert snap["in_flight"] == 0
+    assert snap["max_s"] >= timer.seconds
+
+def test_timed_decorator_wraps_sync_and_async():
+    reg = MetricsRegistry()
+    @timed("normalize", reg)
+    def f(x):
+        return x * 2
+    @timed("llm", reg)
+    async def g(x):
+        return x + 1
+    assert f(2) == 4
+    assert asyncio.run(g(1)) == 2
+    stages = reg.snapshot()["stages"]
+    assert stages["normalize"]["count"] == 1
+    assert stages["llm"]["count"] == 1
+
+def test_quantiles_nearest_rank():
+    reg = MetricsRegistry()
+    for i in range(1, 101):
+        reg.observe("render", i / 100)
+    s = reg.snapshot()["stages"]["render"]
+    assert s["p50_s"] == 0.5
+    assert s["p95_s"] == 0.95
+    assert s["p99_s"] == 0.99
+    assert s["max_s"] == 1.0
+
+def test_dumps_json_and_prometheus():
+    reg = MetricsRegistry()
+    reg.observe("download", 0.25)
+    reg.set_gauge("scheduler_pending", 3)
+    data = json.loads(reg.to_json())
+    assert data["gauges"]["scheduler_pending"] == 3
+    prom = reg.to_prometheus()
+    assert 'medbot_stage_seconds{stage="download",quantile="0.5"} 0.250000' in prom
+    assert 'medbot_stage_seconds_count{stage="download"} 1' in prom
+    assert "medbot_scheduler_pending 3" in prom
+
+def test_profile_job_cpu_and_mem_reports():
+    with profile_job("cpu") as prof:
+        sum(i * i for i in range(1000))
+    assert "function calls" in prof["report"]
+    with profile_job("mem") as prof:
+        data = [bytes(1024) for _ in range(100)]
+    assert prof["report"].startswith("peak traced:")
+    assert data
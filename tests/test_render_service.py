@@ -0,0 +1,52 @@
+import asyncio
+import os
+from docx import Document
+from core.render_service import RenderService
+
+TEXT = "Symptoms\n- Fever\nPlan\n- Rest"
+
+def test_render_service_writes_file_and_returns_bytes(temp_dirs):
+    path = os.path.join(temp_dirs["reports"], "user_20250101_120000_audio.docx")
+
+    async def main():
+        service = RenderService(workers=1, timeout_s=60)
+        try:
+            await service.start()
+            out_path = await service.render(TEXT, path, "Tester", "Jane", "P-1")
+            data = await service.render(TEXT, path, "Tester", "Jane", "P-1", as_bytes=True)
+        finally:
+            service.shutdown(wait=True)
+        return out_path, data
+
+    out_path, data = asyncio.run(main())
+    assert out_path == path and os.path.exists(path)
+    assert data[:2] == b"PK"
+    full = "\n".join(p.text for p in Document(path).paragraphs)
+    assert "Patient Name: Jane" in full and "01 January 2025" in full
+
+def test_render_timeout_recycles_the_stuck_worker(temp_dirs):
+    import time
+    path = os.path.join(temp_dirs["reports"], "user_20250101_120000_audio.docx")
+
+    async def main():
+        service = RenderService(workers=1, timeout_s=0.5)
+        try:
+            await service.start()
+            stuck = service._pool
+            try:
+                await service._run(time.sleep, 30)  # a render that never finishes
+            except asyncio.TimeoutError:
+                pass
+            else:
+                raise AssertionError("expected a timeout")
+            assert service._pool is None
+            service.timeout_s = 60
+            # the only worker was stuck: without recycling this would time out too
+            data = await service.render(TEXT, path, "Tester", "Jane", "P-1", as_bytes=True)
+        finally:
+            service.shutdown(wait=True)
+        return stuck, data
+
+    stuck, data = asyncio.run(main())
+    assert data[:2] == b"PK"
+    assert all(not p.is_alive() for p in (stuck._processes or {}).values())
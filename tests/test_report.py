@@ -0,0 +1,49 @@
+import asyncio
+import os
+import pickle
+from docx import Document
+import core.docx_renderer as renderer
+from core.report import SECTIONS, SECTION_SLOTS, Report, canonical_header, parse_report
+
+def test_header_table_accepts_canonical_names_and_aliases():
+    assert canonical_header("Prescription  /  treatment plan :") == "Prescription / Treatment Plan"
+    assert canonical_header("DOCTOR'S NOTES") == "Doctor's Notes"
+    assert canonical_header("Red flags:") == canonical_header("warning signs") == "Red Flags"
+    assert canonical_header("dx") == "Diagnosis" and canonical_header("Impression") == "Assessment"
+    assert canonical_header("redflags") == "Red Flags"
+    assert canonical_header("Plan to rest") is None and canonical_header("- Plan") is None
+
+def test_parse_report_builds_slotted_report():
+    raw = "**Symptoms**\n• Cough\nPatient Name: X\nPlan\n- Rest<|end_of_text|>\n"
+    report = parse_report(raw)
+    assert not hasattr(report, "__dict__") and set(Report.__slots__) == set(SECTION_SLOTS.values())
+    assert report.symptoms == ["- Cough"] and report["Plan"] == ["- Rest"]
+    assert report.diagnosis == [] and report.lines("Diagnosis") == ["- None reported."]
+    assert [s for s, _ in report.items()] == SECTIONS
+    assert parse_report(report.to_text()).to_text() == report.to_text()
+    assert pickle.loads(pickle.dumps(report)) == report
+
+def test_renderer_takes_report_without_parsing_again(temp_dirs, monkeypatch):
+    raw = "Symptoms\n- Fever\nDx\n- Flu\nPlan\n- Rest\n"
+    report = parse_report(raw)
+    from_text = os.path.join(temp_dirs["reports"], "a_20250101_120000_x.docx")
+    from_report = os.path.join(temp_dirs["reports"], "b_20250101_120000_x.docx")
+    renderer.save_tidy_docx(raw, from_text)
+
+    def _no_parse(text):
+        raise AssertionError("renderer parsed a Report again")
+    monkeypatch.setattr(renderer, "parse_report", _no_parse)
+    renderer.save_tidy_docx(report, from_report)
+
+    cells = lambda p: [[r.cells[0].text for r in t.rows] for t in Document(p).tables]
+    assert cells(from_text) == cells(from_report)
+    assert cells(from_report)[1][1] == "Flu"
+
+def test_pipeline_returns_report_matching_text_api(fake_llm, monkeypatch):
+    import core.langchain_pipeline as lp
+    monkeypatch.setattr(lp, "REPORT_CACHE", None)
+    transcript = "Patient says coughing and fever for 2 days."
+    report = asyncio.run(lp.agenerate_report(transcript))
+    assert isinstance(report, Report)
+    assert report.to_text() == lp.generate_medical_report(transcript)
+    assert asyncio.run(lp.astream_report(transcript)) == report
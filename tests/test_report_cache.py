@@ -0,0 +1,63 @@
+import core.langchain_pipeline as lp
+from core.metrics import REGISTRY
+from core.report_cache import (
+    MemoryReportCache, SQLiteReportCache, make_report_cache, make_report_key
+)
+
+def test_key_depends_on_model_prompt_and_temperature():
+    base = make_report_key("cough", "m1", "p1", 0.2)
+    assert base == make_report_key("cough", "m1", "p1", 0.2)
+    assert base != make_report_key("cough", "m2", "p1", 0.2)
+    assert base != make_report_key("cough", "m1", "p2", 0.2)
+    assert base != make_report_key("cough", "m1", "p1", 0.7)
+    assert base != make_report_key("fever", "m1", "p1", 0.2)
+
+def test_memory_backend_lru_and_counters():
+    cache = MemoryReportCache(max_entries=2)
+    cache.put("a", "A"); cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")  # 'b' paling lama tidak dipakai
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+def test_sqlite_backend_persists_and_bounds_size(tmp_path):
+    path = str(tmp_path / "reports.sqlite3")
+    cache = SQLiteReportCache(path, max_entries=2)
+    for k in ("a", "b", "c"):
+        cache.put(k, k.upper())
+    cache.close()
+    reopened = SQLiteReportCache(path)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == "C"
+
+def test_make_report_cache_none_disables():
+    assert make_report_cache("none") is None
+    assert make_report_cache("") is None
+
+def test_generate_medical_report_hits_cache(fake_llm, monkeypatch):
+    cache = MemoryReportCache()
+    monkeypatch.setattr(lp, "REPORT_CACHE", cache)
+    first = lp.generate_medical_report("cough")
+    second = lp.generate_medical_report("cough")
+    assert first == second
+    assert (cache.hits, cache.misses) == (1, 1)
+    gauges = REGISTRY.snapshot()["gauges"]
+    assert gauges["report_cache_hits"] == 1 and gauges["report_cache_hit_ratio"] == 0.5
+
+def test_pipeline_key_follows_the_route_chain(monkeypatch):
+    from core.llm_router import Endpoint, LLMRouter
+    def key_for(*routes):
+        monkeypatch.setattr(lp, "_ROUTER", LLMRouter(list(routes), client_for=None))
+        return lp._report_cache_key("cough")
+    primary = Endpoint("m1", "https://a/v1")
+    base = key_for(primary)
+    assert base == key_for(Endpoint("m1", "https://a/v1"))
+    assert base != key_for(Endpoint("m1", "https://b/v1"))
+    assert base != key_for(primary, Endpoint("m2", "https://b/v1"))
+
+def test_prompt_version_covers_map_reduce_prompts(monkeypatch):
+    assert lp._prompt_version() == lp.PROMPT_VERSION
+    for name in ("_REPORT_TEMPLATE", "_MAP_TEMPLATE", "_REDUCE_VERSION", "MAP_REDUCE_CHUNK_TOKENS"):
+        with monkeypatch.context() as m:
+            m.setattr(lp, name, getattr(lp, name) * 2)
+            assert lp._prompt_version() != lp.PROMPT_VERSION, name
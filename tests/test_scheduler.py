@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from core.scheduler import ConsultationScheduler, SchedulerFull
+
+def test_submit_rejects_when_queue_full():
+    async def main():
+        sched = ConsultationScheduler(max_queue=2, global_limit=1)
+        # tanpa worker yang jalan, semua job tetap menunggu
+        async def job(): pass
+        assert await sched.submit("a", job) == 0
+        assert await sched.submit("a", job) == 2
+        with pytest.raises(SchedulerFull):
+            await sched.submit("b", job)
+    asyncio.run(main())
+
+def test_round_robin_between_users_and_per_user_limit():
+    async def main():
+        sched = ConsultationScheduler(max_queue=10, global_limit=1, per_user_limit=1)
+        order = []
+        def make(tag):
+            async def job():
+                order.append(tag)
+            return job
+        for tag in ("a1", "a2", "a3"):
+            await sched.submit("clinic-a", make(tag))
+        await sched.submit("clinic-b", make("b1"))
+        sched.start()
+        while sched.pending or sched.in_flight:
+            await asyncio.sleep(0.01)
+        await sched.stop()
+        return order
+    order = asyncio.run(main())
+    # clinic-b tidak menunggu semua job clinic-a selesai
+    assert order.index("b1") < order.index("a3")
+
+def test_stage_caps_concurrency():
+    async def main():
+        sched = ConsultationScheduler(global_limit=4, per_user_limit=4, stage_workers={"llm": 2})
+        running = {"now": 0, "peak": 0}
+        async def job():
+            async with sched.stage("llm"):
+                running["now"] += 1
+                running["peak"] = max(running["peak"], running["now"])
+                await asyncio.sleep(0.02)
+                running["now"] -= 1
+        sched.start()
+        for _ in range(6):
+            await sched.submit("u", job)
+        await asyncio.sleep(0.01)
+        while sched.pending or sched.in_flight:
+            await asyncio.sleep(0.01)
+        await sched.stop()
+        return running["peak"]
+    assert asyncio.run(main()) == 2
@@ -0,0 +1,53 @@
+import time
+import pytest
+from core.session_store import MemorySessionStore, SQLiteSessionStore, make_session_store
+
+def _stores(tmp_path, **kw):
+    return [MemorySessionStore(**kw), SQLiteSessionStore(str(tmp_path / "s.sqlite3"), **kw)]
+
+def test_set_get_pop_is_one_time(tmp_path):
+    for store in _stores(tmp_path):
+        store.set(42, {"name": "Kusuma", "id": "P-1"})
+        assert store.get(42) == {"name": "Kusuma", "id": "P-1"}
+        assert store.pop(42) == {"name": "Kusuma", "id": "P-1"}
+        assert store.pop(42) is None and store.get(42) is None
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    for store in _stores(tmp_path, ttl_s=10):
+        now = time.time()
+        store.set("u", {"name": "a", "id": "1"})
+        monkeypatch.setattr(time, "time", lambda: now + 11)
+        assert store.get("u") is None
+        assert store.pop("u") is None
+        monkeypatch.undo()
+
+def test_purge_expired_and_lru_cap(tmp_path, monkeypatch):
+    for store in _stores(tmp_path, ttl_s=10, max_entries=3):
+        for uid in range(5):
+            store.set(uid, {"name": str(uid), "id": str(uid)})
+            time.sleep(0.001)
+        assert len(store) == 3
+        assert store.get(0) is None and store.get(4) is not None
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 11)
+        assert store.purge_expired() == 3
+        assert len(store) == 0
+        monkeypatch.undo()
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    shard_a, shard_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    shard_a.set(7, {"name": "x", "id": "y"})
+    assert shard_b.get(7) == {"name": "x", "id": "y"}
+    assert shard_b.pop(7) is not None
+    assert shard_a.pop(7) is None
+
+def test_make_session_store_rejects_unknown_backend():
+    assert isinstance(make_session_store("memory"), MemorySessionStore)
+    with pytest.raises(ValueError):
+        make_session_store("redis")
+
+def test_session_store_base_is_abstract():
+    from core.session_store import SessionStore
+    with pytest.raises(TypeError):
+        SessionStore(ttl_s=1, max_entries=1)
@@ -1,6 +1,57 @@
+import asyncio
+import httpx
 import pytest
-from core.speech_to_text import transcribe_audio
+import core.speech_to_text as stt
+from core.speech_to_text import transcribe_audio, atranscribe_audio
 
 def test_transcribe_audio_raises_if_missing_file():
     with pytest.raises(FileNotFoundError):
         transcribe_audio("this/file/does/not/exist.wav")
+
+def test_atranscribe_audio_raises_if_missing_file():
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(atranscribe_audio("this/file/does/not/exist.wav"))
+
+def test_atranscribe_audio_polls_until_completed(tmp_path, monkeypatch):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF....")
+    polls = {"n": 0}
+
+    def handler(request):
+        if request.url.path == "/v2/upload":
+            return httpx.Response(200, json={"upload_url": "https://cdn/x"})
+        if request.method == "POST" and request.url.path == "/v2/transcript":
+            return httpx.Response(200, json={"id": "t1", "status": "queued"})
+        polls["n"] += 1
+        status = "completed" if polls["n"] >= 2 else "processing"
+        return httpx.Response(200, json={"id": "t1", "status": status, "text": "hello"})
+
+    client = httpx.AsyncClient(base_url="https://stt.test", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(stt, "_ASYNC_CLIENT", client)
+    monkeypatch.setattr(stt, "TRANSCRIPT_CACHE", None)
+    monkeypatch.setattr(stt, "ASSEMBLYAI_POLL_INTERVAL", 0)
+    assert asyncio.run(atranscribe_audio(str(audio))) == "hello"
+    assert polls["n"] == 2
+
+def test_atranscribe_audio_gives_up_after_max_wait(tmp_path, monkeypatch):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF" + b"\0" * (3 * stt._UPLOAD_CHUNK_SIZE))
+    uploaded = {}
+
+    def handler(request):
+        if request.url.path == "/v2/upload":
+            uploaded["bytes"] = len(request.read())
+            return httpx.Response(200, json={"upload_url": "https://cdn/x"})
+        if request.method == "POST":
+            return httpx.Response(200, json={"id": "t1", "status": "queued"})
+        return httpx.Response(200, json={"id": "t1", "status": "processing"})
+
+    client = httpx.AsyncClient(base_url="https://stt.test", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(stt, "_ASYNC_CLIENT", client)
+    monkeypatch.setattr(stt, "TRANSCRIPT_CACHE", None)
+    monkeypatch.setattr(stt, "STT_CHUNKING_ENABLED", False)
+    monkeypatch.setattr(stt, "ASSEMBLYAI_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(stt, "ASSEMBLYAI_MAX_WAIT", 0.05)
+    with pytest.raises(asyncio.TimeoutError, match="still processing"):
+        asyncio.run(atranscribe_audio(str(audio)))
+    assert uploaded["bytes"] == 4 + 3 * stt._UPLOAD_CHUNK_SIZE
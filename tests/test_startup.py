@@ -0,0 +1,27 @@
+from benchmarks.bench_startup import import_times, eager_heavy_modules
+
+def test_cog_import_keeps_provider_and_docx_libraries_lazy():
+    times = import_times("cogs.consultation")
+    assert "cogs.consultation" in times
+    assert eager_heavy_modules(times) == []
+
+def test_docx_reexports_still_resolve_from_the_cog():
+    import cogs.consultation as cog
+    from core.docx_renderer import save_tidy_docx
+    assert cog.save_tidy_docx is save_tidy_docx
+
+def test_on_ready_loads_the_cog_on_an_unsharded_bot(monkeypatch, capsys):
+    import asyncio
+    from types import SimpleNamespace
+    from bot import create_bot
+
+    bot = create_bot()
+    assert not hasattr(bot, "shard_ids")
+    loaded = []
+    async def fake_load(name):
+        loaded.append(name)
+    monkeypatch.setattr(bot, "load_extension", fake_load)
+    monkeypatch.setattr(bot._connection, "user", SimpleNamespace(id=1), raising=False)
+    asyncio.run(bot.on_ready())
+    assert loaded == ["cogs.consultation"]
+    assert "shards=[0]" in capsys.readouterr().out
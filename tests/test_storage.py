@@ -0,0 +1,93 @@
+import os
+import time
+from datetime import datetime
+from core.metrics import REGISTRY
+from core.storage import StorageManager, read_text, write_bytes, write_text
+
+def _storage(temp_dirs, **kw):
+    return StorageManager(
+        temp_dirs["audio"], temp_dirs["transcripts"], temp_dirs["reports"],
+        skip_dirs=(os.path.join(temp_dirs["transcripts"], "cache"),), **kw
+    )
+
+def _age(path, days):
+    old = time.time() - days * 86400
+    os.utime(path, (old, old))
+
+def test_sharded_paths_and_compressed_transcripts(temp_dirs):
+    storage = _storage(temp_dirs)
+    when = datetime(2025, 1, 2)
+    audio = storage.path_for("audio", "user_20250102_120000_a.mp3", when)
+    rel = os.path.relpath(audio, temp_dirs["audio"]).split(os.sep)
+    assert rel[:3] == ["2025", "01", "02"] and len(rel[3]) == 2
+    assert not os.path.exists(os.path.dirname(audio))  # created by whoever writes the file
+
+    text = "Patient: dry cough for three days.\n" * 200
+    path = storage.write_transcript("user_20250102_120000_a", text, when)
+    assert path.endswith(".txt.zst") and os.path.getsize(path) < len(text) // 10
+    assert read_text(path) == text
+
+    flat = _storage(temp_dirs, sharded=False, compression_level=0)
+    assert flat.transcript_path("x") == os.path.join(temp_dirs["transcripts"], "x.txt")
+
+def test_sweep_applies_retention_compresses_and_reports_metrics(temp_dirs):
+    storage = _storage(temp_dirs, audio_retention_s=7 * 86400)
+    old_audio = storage.path_for("audio", "old.mp3")
+    new_audio = storage.path_for("audio", "new.mp3")
+    for p in (old_audio, new_audio):
+        write_bytes(p, b"\0" * 1000)
+    _age(old_audio, 10)
+    partial = os.path.join(temp_dirs["audio"], "incoming.mp3.part")
+    with open(partial, "wb") as f:
+        f.write(b"\0")
+    _age(partial, 10)
+
+    legacy = write_text(os.path.join(temp_dirs["transcripts"], "legacy.txt"), "cough " * 500)
+    _age(legacy, 30)  # transcripts are kept forever by default
+    cached = write_text(os.path.join(temp_dirs["transcripts"], "cache", "ab", "entry.txt"), "cached")
+    report = write_text(os.path.join(temp_dirs["reports"], "r.docx"), "docx")
+
+    stats = storage.sweep()
+    assert not os.path.exists(old_audio) and os.path.exists(new_audio)
+    assert os.path.exists(partial) and os.path.exists(cached)
+    assert stats.deleted == 1 and stats.freed_bytes == 1000
+    assert not os.path.exists(legacy) and read_text(legacy + ".zst") == "cough " * 500
+    assert os.path.getmtime(legacy + ".zst") < time.time() - 29 * 86400
+    assert stats.compressed == 1 and stats.files == {"audio": 1, "transcript": 1, "report": 1}
+    assert os.path.exists(report)
+
+    snap = REGISTRY.snapshot()
+    assert snap["gauges"]["storage_audio_files"] == 1
+    assert snap["gauges"]["storage_deleted_files_total"] >= 1
+    assert snap["stages"]["storage_sweep"]["count"] >= 1
+
+def test_sweep_keeps_fresh_directories_for_pending_writers(temp_dirs):
+    storage = _storage(temp_dirs)
+    stale = os.path.join(temp_dirs["reports"], "2020", "01", "01", "ab")
+    os.makedirs(stale)
+    for d in (stale, os.path.dirname(stale), os.path.dirname(os.path.dirname(stale))):
+        _age(d, 1)
+    fresh = os.path.join(temp_dirs["audio"], "2025", "01", "02", "cd")
+    os.makedirs(fresh)
+    path = storage.path_for("audio", "user_a.mp3")
+    storage.sweep()
+    assert not os.path.exists(stale) and os.path.isdir(fresh)
+    with open(os.path.join(fresh, "user_a.mp3.part"), "wb"):
+        pass  # a writer that made its directory just before the sweep still finds it
+    write_bytes(path, b"audio")  # paths handed out before a sweep stay writable
+    assert os.path.exists(path)
+
+def test_sweep_skips_cache_dir_given_relative_roots(temp_dirs, monkeypatch):
+    from core.transcript_cache import TranscriptCache
+    monkeypatch.chdir(temp_dirs["base"])
+    rel = {k: os.path.relpath(temp_dirs[k], temp_dirs["base"]) for k in ("audio", "transcripts", "reports")}
+    cache_dir = os.path.join(rel["transcripts"], "cache")  # as settings build TRANSCRIPT_CACHE_DIR
+    cache = TranscriptCache(cache_dir)
+    cache.put("abc-universal", "cached transcript")
+    old = time.time() - 86400
+    for d in (os.path.dirname(cache._path("abc-universal")), cache_dir):
+        os.utime(d, (old, old))
+    storage = StorageManager(rel["audio"], rel["transcripts"], rel["reports"], skip_dirs=(cache_dir,))
+    stats = storage.sweep()
+    assert stats.compressed == 0 and stats.files["transcript"] == 0
+    assert TranscriptCache(cache_dir).get("abc-universal") == "cached transcript"
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import pytest
+import core.langchain_pipeline as lp
+from core.report import SECTIONS, parse_report, strip_bullet
+from core.structured_output import JsonSectionProgress, StructuredOutputError, parse_structured_report
+from tests.conftest import FAKE_REPORT_TEXT, _Msg
+
+FAKE_JSON = json.dumps({
+    "symptoms": ["Cough", "Fever"],
+    "diagnosis": ["Upper respiratory infection"],
+    "treatment_plan": ["Paracetamol 500mg"],
+    "doctors_notes": ["patient name: SHOULD NOT APPEAR", "Follow up if no improvement."],
+    "assessment": ["- Mild severity"],
+    "plan": ["Rest", "Hydration"],
+    "red_flags": ["Persistent high fever"],
+    "disclaimer": ["For clinical use only; may contain transcription errors."],
+})
+
+class JsonLLM:
+    """Answers the JSON prompt with `json_reply`, the text prompt with FAKE_REPORT_TEXT."""
+    def __init__(self, json_reply):
+        self.json_reply, self.prompts = json_reply, []
+    def invoke(self, messages):
+        is_json = "JSON object" in messages[0].content
+        self.prompts.append("json" if is_json else "text")
+        return _Msg(self.json_reply if is_json else FAKE_REPORT_TEXT)
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+    async def astream(self, messages):
+        text = self.invoke(messages).content
+        for i in range(0, len(text), 5):
+            yield _Msg(text[i:i + 5])
+
+def _cells(report):
+    """What the renderer writes per section (bullets stripped)."""
+    return {s: [strip_bullet(ln) for ln in report.lines(s)] for s in SECTIONS}
+
+def test_parse_structured_report_maps_sections_and_censors():
+    report = parse_structured_report("```json\n" + FAKE_JSON + "\n```")
+    assert _cells(report) == _cells(parse_report(FAKE_REPORT_TEXT))
+    assert report.doctors_notes == ["- Follow up if no improvement."]
+    one_string = parse_structured_report('{"plan": "1. Rest\\n2. Fluids", "symptoms": null}')
+    assert one_string.plan == ["- Rest", "- Fluids"] and one_string.symptoms == []
+
+def test_parse_structured_report_keeps_decimal_doses_and_vitals():
+    report = parse_structured_report(
+        '{"plan": ["0.5 mg lorazepam at night", "1. 2.5 mg salbutamol", "2) Rest"],'
+        ' "symptoms": ["37.8 C fever", "- 1.5 kg weight loss"]}'
+    )
+    assert report.plan == ["- 0.5 mg lorazepam at night", "- 2.5 mg salbutamol", "- Rest"]
+    assert report.symptoms == ["- 37.8 C fever", "- 1.5 kg weight loss"]
+
+@pytest.mark.parametrize("raw", ["no json here", '{"plan": ["Rest",]}', '{"plan": {"a": 1}}', '{"plan": []}'])
+def test_parse_structured_report_rejects_unusable_output(raw):
+    with pytest.raises(StructuredOutputError):
+        parse_structured_report(raw)
+
+def test_json_progress_tracks_keys_across_chunks():
+    progress = JsonSectionProgress()
+    done = []
+    for i in range(0, len(FAKE_JSON), 3):
+        done.extend(progress.feed(FAKE_JSON[i:i + 3]))
+    assert done == progress.completed_sections
+    assert done == ["Symptoms", "Diagnosis", "Prescription / Treatment Plan",
+                    "Doctor's Notes", "Assessment", "Plan", "Red Flags"]
+
+def _use(monkeypatch, llm):
+    monkeypatch.setattr(lp, "LLM_OUTPUT_FORMAT", "json")
+    monkeypatch.setattr(lp, "REPORT_CACHE", None)
+    monkeypatch.setattr(lp, "get_router", lambda: llm)
+
+def test_json_mode_skips_text_post_processing(monkeypatch):
+    llm = JsonLLM(FAKE_JSON)
+    _use(monkeypatch, llm)
+    monkeypatch.setattr(lp, "parse_report", lambda raw: pytest.fail("text parser used"))
+    report = lp.generate_report("Patient says coughing and fever for 2 days.")
+    assert report == parse_structured_report(FAKE_JSON)
+    seen = []
+    async def on_progress(sections):
+        seen.append(list(sections))
+    streamed = asyncio.run(lp.astream_report("Patient says coughing.", on_progress=on_progress))
+    assert streamed == report and seen[0] == ["Symptoms"] and seen[-1][-1] == "Disclaimer"
+    assert llm.prompts == ["json", "json"]
+
+def test_json_mode_falls_back_to_text_prompt(monkeypatch):
+    llm = JsonLLM("Sure! Here is the report: Symptoms - cough")
+    _use(monkeypatch, llm)
+    report = asyncio.run(lp.agenerate_report("Patient says coughing."))
+    assert report == parse_report(FAKE_REPORT_TEXT)
+    assert asyncio.run(lp.astream_report("Patient says coughing.")) == report
+    assert llm.prompts == ["json", "text", "json", "text"]
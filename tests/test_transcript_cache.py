@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+import core.speech_to_text as stt
+from core.transcript_cache import TranscriptCache, hash_audio_file
+
+def test_hash_is_content_addressed(tmp_path):
+    a = tmp_path / "a.wav"; a.write_bytes(b"same-bytes")
+    b = tmp_path / "b.wav"; b.write_bytes(b"same-bytes")
+    c = tmp_path / "c.wav"; c.write_bytes(b"other-bytes")
+    assert hash_audio_file(str(a)) == hash_audio_file(str(b))
+    assert hash_audio_file(str(a)) != hash_audio_file(str(c))
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    root = str(tmp_path / "cache")
+    TranscriptCache(root).put("abc-universal", "hello")
+    fresh = TranscriptCache(root)
+    assert fresh.get("abc-universal") == "hello"
+    assert fresh.get("missing-universal") is None
+
+def test_prune_evicts_expired_and_oversized(tmp_path):
+    root = str(tmp_path / "cache")
+    cache = TranscriptCache(root, max_bytes=10, max_age_s=60)
+    cache.put("old-universal", "x")
+    old_path = cache._path("old-universal")
+    os.utime(old_path, (time.time() - 120, time.time() - 120))
+    cache.put("k1-universal", "12345")
+    time.sleep(0.01)
+    cache.put("k2-universal", "67890")
+    assert not os.path.exists(old_path)
+    cache.put("k3-universal", "abcde")
+    # hanya 2 entri (10 byte) yang muat, yang paling lama dibuang
+    assert TranscriptCache(root).get("k1-universal") is None
+    assert TranscriptCache(root).get("k3-universal") == "abcde"
+
+def test_put_walks_the_store_only_when_over_budget_or_due(tmp_path, monkeypatch):
+    cache = TranscriptCache(str(tmp_path / "cache"), max_bytes=20, prune_interval_s=3600)
+    walks = {"n": 0}
+    real_prune = cache.prune
+    def counting_prune():
+        walks["n"] += 1
+        return real_prune()
+    monkeypatch.setattr(cache, "prune", counting_prune)
+    for i in range(4):
+        cache.put(f"k{i}-universal", "12345")  # 20 bytes: within budget
+    assert walks["n"] == 1  # only the first put, to learn the store size
+    cache.put("k0-universal", "1234")  # replacing an entry is accounted, not re-walked
+    assert walks["n"] == 1
+    cache.put("k4-universal", "12345")  # over budget
+    assert walks["n"] == 2 and cache._disk_bytes <= 20
+    cache._last_prune -= 3600
+    cache.put("k5-universal", "x")
+    assert walks["n"] == 3
+
+def test_atranscribe_audio_skips_provider_on_cache_hit(tmp_path, monkeypatch):
+    audio = tmp_path / "a.wav"; audio.write_bytes(b"RIFF-audio")
+    cache = TranscriptCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(stt, "TRANSCRIPT_CACHE", cache)
+    calls = {"n": 0}
+
+    async def fake_remote(path):
+        calls["n"] += 1
+        return "transcribed once"
+
+    monkeypatch.setattr(stt, "_atranscribe_remote", fake_remote)
+    assert asyncio.run(stt.atranscribe_audio(str(audio))) == "transcribed once"
+    assert asyncio.run(stt.atranscribe_audio(str(audio))) == "transcribed once"
+    assert calls["n"] == 1
+
+def test_atranscribe_audio_uses_the_download_hash(tmp_path, monkeypatch):
+    audio = tmp_path / "a.wav"; audio.write_bytes(b"RIFF-audio")
+    cache = TranscriptCache(str(tmp_path / "cache"))
+    cache.put(TranscriptCache.make_key(hash_audio_file(str(audio)), stt.SPEECH_MODEL), "cached")
+    monkeypatch.setattr(stt, "TRANSCRIPT_CACHE", cache)
+    def no_rehash(path):
+        raise AssertionError("file re-read for hashing")
+    monkeypatch.setattr(stt, "hash_audio_file", no_rehash)
+    digest = hash_audio_file(str(audio))
+    assert asyncio.run(stt.atranscribe_audio(str(audio), audio_hash=digest)) == "cached"
+
+def test_memory_hits_expire_and_vanished_files_are_misses(tmp_path, monkeypatch):
+    cache = TranscriptCache(str(tmp_path / "cache"), max_age_s=60)
+    cache.put("abc-universal", "hello")
+    assert cache.get("abc-universal") == "hello"
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert cache.get("abc-universal") is None  # not served from memory after max_age_s
+    monkeypatch.undo()
+
+    cache.put("def-universal", "world")
+    fresh = TranscriptCache(str(tmp_path / "cache"))
+    real_open = open
+    def open_after_prune(path, *a, **kw):
+        os.remove(path)  # a concurrent prune wins the race after the stat
+        return real_open(path, *a, **kw)
+    monkeypatch.setattr("builtins.open", open_after_prune)
+    assert fresh.get("def-universal") is None
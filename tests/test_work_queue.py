@@ -0,0 +1,88 @@
+import asyncio
+import os
+import time
+import pytest
+from core.work_queue import SQLiteWorkQueue, JobFailed, CONSULTATION_JOB
+from launcher import shard_groups
+
+def test_claim_is_exclusive_across_processes_sharing_the_file(tmp_path):
+    path = str(tmp_path / "q.sqlite3")
+    shard, worker_a, worker_b = SQLiteWorkQueue(path), SQLiteWorkQueue(path), SQLiteWorkQueue(path)
+    ids = [shard.enqueue("echo", {"n": i}) for i in range(3)]
+    claimed = [worker_a.claim("a"), worker_b.claim("b"), worker_a.claim("a"), worker_b.claim("b")]
+    assert [j.id for j in claimed[:3]] == ids and claimed[3] is None
+    assert claimed[0].payload == {"n": 0}
+
+def test_wait_returns_result_or_raises(tmp_path):
+    q = SQLiteWorkQueue(str(tmp_path / "q.sqlite3"))
+    ok, bad = q.enqueue("echo", {}), q.enqueue("echo", {})
+    assert q.complete(q.claim("w").id, "w", {"report_path": "r.docx"})
+    assert q.fail(q.claim("w").id, "w", "boom")
+    assert asyncio.run(q.wait(ok, poll_s=0)) == {"report_path": "r.docx"}
+    with pytest.raises(JobFailed, match="boom"):
+        asyncio.run(q.wait(bad, poll_s=0))
+    pending = q.enqueue("echo", {})
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(q.wait(pending, poll_s=0.01, timeout_s=0.05))
+
+def test_expired_lease_is_requeued_then_fails_after_max_attempts(tmp_path, monkeypatch):
+    q = SQLiteWorkQueue(str(tmp_path / "q.sqlite3"), lease_s=10, max_attempts=2)
+    job_id = q.enqueue("echo", {})
+    assert q.claim("dead-worker").attempts == 1
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    again = q.claim("w2")
+    assert again.id == job_id and again.attempts == 2
+    monkeypatch.setattr(time, "time", lambda: now + 22)
+    assert q.claim("w3") is None
+    assert q.status(job_id)["status"] == "error"
+
+def test_only_the_lease_holder_can_finish_a_job(tmp_path, monkeypatch):
+    q = SQLiteWorkQueue(str(tmp_path / "q.sqlite3"), lease_s=10, max_attempts=3)
+    job_id = q.enqueue("echo", {})
+    q.claim("slow")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert q.claim("fresh").id == job_id  # slow worker's lease expired
+    assert not q.complete(job_id, "slow", {"stale": True})
+    assert not q.heartbeat(job_id, "slow") and q.heartbeat(job_id, "fresh")
+    assert q.complete(job_id, "fresh", {"ok": True})
+    assert not q.fail(job_id, "fresh", "late")
+    assert q.status(job_id)["result"] == {"ok": True}
+
+def test_cancelled_job_is_not_claimed_or_completed(tmp_path):
+    q = SQLiteWorkQueue(str(tmp_path / "q.sqlite3"))
+    running, queued = q.enqueue("echo", {}), q.enqueue("echo", {})
+    assert q.claim("w").id == running
+    assert q.cancel(running, "timed out") and q.cancel(queued, "timed out")
+    assert q.claim("w") is None
+    assert not q.complete(running, "w", {})
+    with pytest.raises(JobFailed, match="timed out"):
+        asyncio.run(q.wait(running, poll_s=0))
+    assert q.counts() == {"cancelled": 2}
+
+def test_worker_loop_runs_consultation_jobs(temp_dirs, fake_llm, monkeypatch):
+    import worker
+    import core.speech_to_text as stt
+    async def fake_transcribe(path, audio_hash=None):
+        return "Patient reports cough and fever."
+    monkeypatch.setattr(stt, "atranscribe_audio", fake_transcribe)
+
+    q = SQLiteWorkQueue(os.path.join(temp_dirs["base"], "q.sqlite3"))
+    report = os.path.join(temp_dirs["reports"], "user_20250101_120000_a.docx")
+    job_id = q.enqueue(CONSULTATION_JOB, {
+        "audio_path": os.path.join(temp_dirs["audio"], "user_20250101_120000_a.wav"),
+        "transcript_path": os.path.join(temp_dirs["transcripts"], "a.txt"),
+        "report_path": report,
+        "author_name": "dr", "patient_name": "Kusuma", "patient_id": "P-1",
+    })
+    failing = q.enqueue("nope", {})
+
+    handled = asyncio.run(worker.worker_loop(q, "w1", concurrency=2, poll_s=0.01, max_jobs=2))
+    assert handled == 2
+    assert q.status(job_id)["result"]["report_path"] == report and os.path.exists(report)
+    assert q.status(failing)["status"] == "error"
+
+def test_shard_groups_split_evenly():
+    assert shard_groups(5, 2) == [[0, 1, 2], [3, 4]]
+    assert shard_groups(2, 4) == [[0], [1]]
@@ -0,0 +1,175 @@
+"""
+Worker processes for the sharded deployment (PIPELINE_MODE=queue).
+
+    python worker.py --processes 4 --concurrency 2
+
+Each process claims "consultation" jobs from the local work queue
+(WORK_QUEUE_PATH) and runs transcribe → generate → render for them; the bot
+shard that enqueued the job waits for the result and uploads the DOCX.
+Jobs carry file paths, so shards and workers must share the data directories.
+"""
+import os
+import sys
+import socket
+import asyncio
+import argparse
+import multiprocessing
+from datetime import datetime
+
+from config.settings import (
+    TRANSCRIPT_DIR,
+    TRANSCRIPT_COMPRESSION_LEVEL,
+    WORK_QUEUE_PATH,
+    WORK_QUEUE_POLL_SECONDS,
+    WORK_QUEUE_LEASE_SECONDS,
+    WORK_QUEUE_MAX_ATTEMPTS,
+    WORKER_PROCESSES,
+    WORKER_CONCURRENCY,
+)
+from core.work_queue import CONSULTATION_JOB, Job, SQLiteWorkQueue
+from core.metrics import span
+from core.storage import write_text
+
+
+async def run_consultation_job(payload: dict) -> dict:
+    """
+    payload: audio_path, transcript_path, report_path, author_name, patient_name, patient_id,
+    consulted_at (ISO timestamp, optional), audio_hash (xxh3-128 of the audio, optional).
+    Returns {"report_path", "transcript_path", "timings"} (stage -> seconds).
+    """
+    from core.speech_to_text import atranscribe_audio
+    from core.langchain_pipeline import agenerate_report
+    from core.docx_renderer import save_tidy_docx
+
+    timings = {}
+    with span("stt") as timer:
+        transcript_text = await atranscribe_audio(payload["audio_path"], audio_hash=payload.get("audio_hash"))
+
+    transcript_path = payload.get("transcript_path") or os.path.join(
+        TRANSCRIPT_DIR, os.path.splitext(os.path.basename(payload["audio_path"]))[0] + ".txt"
+    )
+    timings["stt"] = timer.seconds
+    with span("transcript_write"):
+        write_text(transcript_path, transcript_text, TRANSCRIPT_COMPRESSION_LEVEL)
+
+    with span("llm") as timer:
+        report = await agenerate_report(transcript_text)
+    timings["llm"] = timer.seconds
+
+    consulted_at = payload.get("consulted_at")
+    with span("render") as timer:
+        await asyncio.to_thread(
+            save_tidy_docx,
+            report,
+            payload["report_path"],
+            payload.get("author_name", "Unknown"),
+            payload.get("patient_name", "Unknown"),
+            payload.get("patient_id", "Unknown"),
+            datetime.fromisoformat(consulted_at) if consulted_at else None,
+        )
+    timings["render"] = timer.seconds
+    return {"report_path": payload["report_path"], "transcript_path": transcript_path, "timings": timings}
+
+
+HANDLERS = {CONSULTATION_JOB: run_consultation_job}
+
+
+async def _heartbeat(queue: SQLiteWorkQueue, job_id: int, worker_id: str) -> None:
+    while True:
+        await asyncio.sleep(max(1.0, queue.lease_s / 3))
+        await asyncio.to_thread(queue.heartbeat, job_id, worker_id)
+
+
+async def _handle(queue: SQLiteWorkQueue, job: Job, worker_id: str) -> None:
+    beat = asyncio.create_task(_heartbeat(queue, job.id, worker_id))
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"unknown job kind: {job.kind}")
+        result = await handler(job.payload)
+    except Exception as e:
+        recorded = await asyncio.to_thread(queue.fail, job.id, worker_id, str(e) or type(e).__name__)
+    else:
+        recorded = await asyncio.to_thread(queue.complete, job.id, worker_id, result)
+    finally:
+        beat.cancel()
+    if not recorded:
+        print(f"[worker {worker_id}] job {job.id}: lease lost (re-leased or cancelled), outcome dropped")
+
+
+async def worker_loop(
+    queue: SQLiteWorkQueue,
+    worker_id: str,
+    concurrency: int = 2,
+    poll_s: float = 0.5,
+    stop: asyncio.Event = None,
+    max_jobs: int = 0,
+) -> int:
+    """Claim and run jobs until `stop` is set (or max_jobs were handled). Returns jobs handled."""
+    stop = stop or asyncio.Event()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    running = set()
+    handled = 0
+    while not stop.is_set() and not (max_jobs and handled >= max_jobs):
+        await slots.acquire()
+        job = await asyncio.to_thread(queue.claim, worker_id)
+        if job is None:
+            slots.release()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_s)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        handled += 1
+        task = asyncio.create_task(_handle(queue, job, worker_id))
+        running.add(task)
+        task.add_done_callback(lambda t: (running.discard(t), slots.release()))
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+    return handled
+
+
+def _process_main(index: int, queue_path: str, concurrency: int) -> None:
+    queue = SQLiteWorkQueue(queue_path, lease_s=WORK_QUEUE_LEASE_SECONDS, max_attempts=WORK_QUEUE_MAX_ATTEMPTS)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    print(f"[worker {index}] pid {os.getpid()} consuming {queue_path}", flush=True)
+    try:
+        asyncio.run(worker_loop(queue, worker_id, concurrency, WORK_QUEUE_POLL_SECONDS))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.close()
+
+
+def start_workers(processes: int, queue_path: str = WORK_QUEUE_PATH, concurrency: int = WORKER_CONCURRENCY):
+    """Spawn worker processes; returns them (already started)."""
+    ctx = multiprocessing.get_context("spawn")
+    procs = []
+    for i in range(max(1, processes)):
+        p = ctx.Process(target=_process_main, args=(i, queue_path, concurrency), name=f"medbot-worker-{i}")
+        p.start()
+        procs.append(p)
+    return procs
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Consultation worker processes (PIPELINE_MODE=queue).")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs in flight per process")
+    parser.add_argument("--queue", default=WORK_QUEUE_PATH)
+    args = parser.parse_args(argv)
+
+    procs = start_workers(args.processes, args.queue, args.concurrency)
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join(timeout=10)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())